@@ -0,0 +1,49 @@
+"""
+Microbenchmarks of the protocol codec (hardware.codec): cost per command of each encoder and parser.
+
+Run from the repository root:
+    python benchmarks/bench_codec.py [--number N]
+
+Prints the time per call in microseconds, the best of 5 repeats, so that the figures can be compared between
+revisions.
+"""
+import argparse
+import timeit
+
+from pymodaq_plugins_optosigma.hardware.codec import GSCCodec, RMCCodec, SBIS26Codec, SHRC203Codec, \
+    decode_shrc_status, parse_q_reply
+
+shrc = SHRC203Codec('P')
+gsc = GSCCodec()
+rmc = RMCCodec()
+sbis = SBIS26Codec()
+
+CASES = {
+    'SHRC203 move': lambda: shrc.move(1, -12500),
+    'SHRC203 move_axes (3 axes)': lambda: shrc.move_axes({1: 1000, 2: -2000, 3: 3000}),
+    'SHRC203 speed': lambda: shrc.speed(2, 500, 5000, 100),
+    'GSC move': lambda: gsc.move(2, 10000, relative=True),
+    'RMC move': lambda: rmc.move(1, 250.5),
+    'SBIS26 move': lambda: sbis.move(3, -400),
+    'encode frame (4 commands)': lambda: shrc.encode(['A:1+P1000', 'A:2-P2000', 'A:3+P3000', 'G:']),
+    'parse Q: (3 axes)': lambda: parse_q_reply('+      1000,-      2000,+      3000,K,K,R', 3),
+    'parse ?:D': lambda: shrc.parse_speed('S500F5000R100'),
+    'parse !: (RMC)': lambda: rmc.parse_ready('R,B'),
+    'parse SRQ (SBIS26)': lambda: sbis.parse_status('D,1,+12345,K,R'),
+    'decode SHRC status': lambda: decode_shrc_status('8003'),
+}
+
+
+def run(number=100000):
+    results = {}
+    for name, case in CASES.items():
+        results[name] = min(timeit.repeat(case, number=number, repeat=5)) / number
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--number', type=int, default=100000, help='calls per repeat')
+    args = parser.parse_args()
+    for name, duration in run(args.number).items():
+        print(f'{name:<30} {duration * 1e6:8.3f} us')
@@ -0,0 +1,56 @@
+"""
+Import time of the plugin modules, as paid by PyMoDAQ when it discovers the plugins at the start of a dashboard.
+
+Run from the repository root:
+    python benchmarks/bench_import.py [--repeat N]
+
+Each plugin module is imported in a fresh interpreter where PyMoDAQ itself has already been imported, and the time
+of its own import is printed (best of the repeats), with the modules that should only be loaded once a plugin is
+initialized (the drivers and pyvisa) if some of them have been imported.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+PACKAGE = 'pymodaq_plugins_optosigma'
+PLUGINS = [f'{PACKAGE}.daq_move_plugins.daq_move_{model}' for model in ('GSC', 'RMC', 'SHRC203', 'SBIS26')] + \
+          [f'{PACKAGE}.daq_viewer_plugins.plugins_0D.daq_0Dviewer_{model}'
+           for model in ('GSC', 'RMC', 'SHRC203', 'SBIS26')]
+# modules left to the initialization of the plugins
+DEFERRED = ['pyvisa'] + [f'{PACKAGE}.hardware.{name}' for name in
+                         ('gsc_VISADriver', 'rmc_VISADriver', 'shrc203_VISADriver', 'sbis26_VISADriver', 'transport',
+                          'line')]
+
+SCRIPT = """
+import importlib, json, sys, time
+import pymodaq.control_modules.move_utility_classes, pymodaq.control_modules.viewer_utility_classes
+time0 = time.perf_counter()
+importlib.import_module({module!r})
+duration = time.perf_counter() - time0
+print(json.dumps([duration, [name for name in {deferred!r} if name in sys.modules]]))
+"""
+
+
+def measure(module: str):
+    """Time of the import of module (s) in a fresh interpreter and the deferred modules it imported."""
+    output = subprocess.run([sys.executable, '-c', SCRIPT.format(module=module, deferred=DEFERRED)],
+                            capture_output=True, text=True, check=True).stdout
+    duration, loaded = json.loads(output.strip().splitlines()[-1])
+    return duration, loaded
+
+
+def run(repeat=3):
+    results = {}
+    for module in PLUGINS:
+        measures = [measure(module) for _ in range(repeat)]
+        results[module] = min(duration for duration, _ in measures), measures[0][1]
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=3, help='imports of each module')
+    args = parser.parse_args()
+    for module, (duration, loaded) in run(args.repeat).items():
+        print(f"{module.split('.')[-1]:<22} {duration * 1e3:8.1f} ms {' '.join(loaded)}")
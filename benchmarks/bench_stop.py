@@ -0,0 +1,64 @@
+"""
+Stop latency of the drivers: time between a stop request and the writing of the stop command, between the request
+and the release of a blocking move waiting in another thread, and between the request and the standstill of the axis.
+
+Run from the repository root:
+    python benchmarks/bench_stop.py [--repeat N]
+
+Each stop interrupts a long move of axis 1 of a simulated controller on the real clock, made with move(wait=True) in
+a thread while a status poll may be in progress. Prints the mean and the worst latencies in milliseconds.
+"""
+import argparse
+import threading
+import time
+
+from pymodaq_plugins_optosigma.hardware import simulator
+from pymodaq_plugins_optosigma.hardware.rmc_VISADriver import RMCVISADriver
+from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver
+
+DRIVERS = {
+    'SHRC203': (SHRC203VISADriver, 'SIM::SHRC203::clock=real', 'open_connection', 50000),
+    'RMC': (RMCVISADriver, 'SIM::RMC::clock=real', 'connect', 5000),
+}
+
+
+def measure(driver, target):
+    """Latencies (s) of the writing of the stop command, of the release of the moving thread and of the standstill."""
+    released = []
+
+    def move():
+        if not driver.move(target, 1):
+            released.append(time.perf_counter())
+
+    thread = threading.Thread(target=move)
+    thread.start()
+    time.sleep(0.15)
+    time0 = time.perf_counter()
+    written = driver.stop(1)
+    thread.join()
+    standstill = driver.wait_stopped(1)
+    driver.home(1)
+    return written, (released[0] - time0) if released else float('nan'), standstill
+
+
+def run(repeat=10):
+    results = {}
+    for name, (driver_class, rsrc_name, connect, target) in DRIVERS.items():
+        simulator.clear_simulators()
+        driver = driver_class(rsrc_name)
+        getattr(driver, connect)()
+        results[name] = [measure(driver, target) for _ in range(repeat)]
+        driver.close()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=10, help='stops per driver')
+    args = parser.parse_args()
+    for name, measures in run(args.repeat).items():
+        written, released, standstill = zip(*measures)
+        print(f'{name:<8} stop written: mean {sum(written) / len(written) * 1e3:6.2f} ms max {max(written) * 1e3:6.2f} ms'
+              f' | move released: mean {sum(released) / len(released) * 1e3:6.2f} ms '
+              f'max {max(released) * 1e3:6.2f} ms'
+              f' | standstill: mean {sum(standstill) / len(standstill) * 1e3:6.2f} ms')
@@ -1,10 +1,18 @@
-from typing import Union, List, Dict
+from typing import Union, List, Dict, TYPE_CHECKING
+
+import numpy as np
 
 from pymodaq.control_modules.move_utility_classes import DAQ_Move_base, comon_parameters_fun, main, DataActuatorType, \
     DataActuator  # common set of parameters for all actuators
 from pymodaq.utils.daq_utils import ThreadCommand  # object used to send info back to the main thread
 from pymodaq.utils.parameter import Parameter
-from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC # DK import the main class (the name was wrong)
+from pymodaq_plugins_optosigma.hardware import connections
+from pymodaq_plugins_optosigma.utils import polling_params, polling_settings, multi_move_params, status_params, \
+    scale_waypoints, move_mode_params, stats_params, update_stats, commit_stats, line_params, \
+    warm_start_message, home_all_params, homing_required_params, show_homing_required, show_driver_settings
+
+if TYPE_CHECKING:
+    from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
 
 
 class DAQ_Move_GSC(DAQ_Move_base):
@@ -30,15 +38,25 @@ class DAQ_Move_GSC(DAQ_Move_base):
 
     params = [
                  {"title": "Instrument Address", "name": "visa_name", "type": "str", "value": "ASRL4::INSTR"},
+                 line_params(),
                  {"title": "Speed_ini", "name": "speed_ini", "type": "int", "value": 10000},
                  {"title": "Speed_fin", "name": "speed_fin", "type": "int", "value": 10000},
                  {"title": "Acceleration time", "name": "acceleration_time", "type": "int", "value": 100},
-                 {"title": "Unit", "name": "unit", "type": "list", "limits": ["pulse", "um"], "value": " "},
-                 {"title": "Coeff", "name": "coeff", "type": "float", "value": 2.0},  #(pulse/um)
+                 {"title": "Unit", "name": "unit", "type": "list", "limits": ["pulse", "nm", "um", "mm", "deg"],
+                  "value": "pulse"},
+                 {"title": "Coeff", "name": "coeff", "type": "float", "value": 2.0, "min": 0.,
+                  "tip": "Resolution of the axis in pulses per um (per degree for a rotation stage)"},
+                 polling_params(),
+                 status_params(),
+                 move_mode_params(),
+                 stats_params(),
+                 multi_move_params(_axis_names),
+                 home_all_params(),
+                 homing_required_params(),
              ] + comon_parameters_fun(is_multiaxes, axis_names=_axis_names, epsilon=_epsilon)
 
     def ini_attributes(self):
-        self.controller: GSC = None
+        self.controller: "GSC" = None
 
     def get_actuator_value(self):
         """Get the current value from the hardware with scaling conversion.
@@ -47,13 +65,16 @@ class DAQ_Move_GSC(DAQ_Move_base):
         -------
         float: The position obtained after scaling conversion.
         """
-        pos = DataActuator(data=self.controller.get_position(self.axis_value))  
+        position = self.controller.units.from_native(self.controller.read_position(self.axis_value), self.axis_value)
+        pos = DataActuator(data=position)
         pos = self.get_position_with_scaling(pos)
         return pos
 
     def close(self):
         """Terminate the communication protocol"""
-        self.controller.close() 
+        if self.controller is not None:  # None if the connection failed
+            self.controller.health.unsubscribe(self.health_event)
+        connections.release(self.controller)
 
     def commit_settings(self, param: Parameter):
         """Apply the consequences of a change of value in the detector settings
@@ -70,8 +91,20 @@ class DAQ_Move_GSC(DAQ_Move_base):
         if param.name() == "speed_ini" or param.name() == "speed_fin" or param.name() == "acceleration_time":
             self.controller.set_speed(self.settings["speed_ini"], self.settings["speed_fin"],
                                       self.settings["acceleration_time"], self.axis_value)
-        if param.name() == "unit":
-            self.axis_unit = self.controller.set_unit(self.settings['unit'])      
+        if param.name() == "unit" or param.name() == "coeff":
+            self.axis_unit = self.controller.set_unit(self.settings['unit'], self.axis_value, self.settings['coeff'])
+        if param.parent().name() == "polling":
+            self.controller.polling.update(**{param.name(): param.value()})
+        if param.name() == "status_ttl":
+            self.controller.status_cache.ttl = param.value()
+        if param.parent().name() == 'stats':
+            commit_stats(self.settings, param, self.controller.instrumentation)
+        if param.name() == "move_axes" and param.value():
+            self.move_axes({name: self.settings['multi_move', name] for name in self.axis_names})
+            param.setValue(False)
+        if param.name() == "home_all" and param.value():
+            self.home_all()
+            param.setValue(False)
 
     def ini_stage(self, controller=None):
         """Actuator communication initialization
@@ -91,8 +124,28 @@ class DAQ_Move_GSC(DAQ_Move_base):
         self.ini_stage_init(slave_controller=controller)
 
         if self.is_master: 
-            self.controller = GSC(self.settings["visa_name"]) 
-            self.controller.connect()
+            from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+            try:
+                self.controller = connections.acquire(GSC, self.settings["visa_name"],
+                                                      lambda driver: driver.connect(self.settings["line", "negotiate"]))
+            except Exception as e:
+                return f"Connection to {self.settings['visa_name']} failed: {e}", False
+            if connections.users(self.settings["visa_name"]) == 1:  # first plugin on this controller
+                self.emit_status(ThreadCommand("Update_Status", [warm_start_message(self.controller)]))
+        else:
+            connections.retain(self.controller)
+        channel = self.axis_value
+        if self.controller.speed_fin[channel - 1] > 0:  # set in this session or restored by the warm start
+            show_driver_settings(self.settings, {'speed_ini': self.controller.speed_ini[channel - 1],
+                                                 'speed_fin': self.controller.speed_fin[channel - 1],
+                                                 'acceleration_time': self.controller.accel_t[channel - 1]})
+        show_homing_required(self.settings, self.controller)
+        self.controller.polling.update(**polling_settings(self.settings))
+        self.controller.status_cache.ttl = self.settings['status_ttl']
+        self.controller.instrumentation.enable(self.settings['stats', 'stats_enabled'])
+        self.axis_unit = self.controller.set_unit(self.settings['unit'], self.axis_value, self.settings['coeff'])
+        self.controller.health.subscribe(self.health_event)
+        self.settings.child('line', 'baud_rate').setValue(self.controller._actuator.baud_rate)
 
         info = "GSC Actuator initialized" 
         initialized = True 
@@ -109,17 +162,10 @@ class DAQ_Move_GSC(DAQ_Move_base):
         value = self.check_bound(value) 
         self.target_value = value
 
-        value = self.controller.convert_units(self.settings.child('unit').value(), value.value(), self.settings.child('coeff').value())
-        
-        print("value = self.controller.convert_units(self.settings.child('unit').value(), value.value(), self.settings.child('coeff').value())", type(value))
-        print("self.settings.child('unit').value()", type(self.settings.child('unit').value()))
-
-        value = DataActuator(data=value)
-
         value = self.set_position_with_scaling(value)
 
-        self.controller.move(int(value.value()), self.axis_value) 
-        self.controller.get_unit_position(self.settings['unit'], self.axis_value)
+        self.controller.move(self.controller.units.to_native(value.value(), self.axis_value), self.axis_value,
+                             wait=not self.settings['non_blocking'])
 
     def move_rel(self, value: DataActuator):
         """ Move the actuator to the relative target actuator value defined by value
@@ -128,27 +174,98 @@ class DAQ_Move_GSC(DAQ_Move_base):
         ----------
         value: (float) value of the relative target positioning
         """
-        # self.controller.get_unit_position(self.settings['unit'], self.axis_value)
         value = self.check_bound(self.current_position + value) - self.current_position
-        value = self.controller.convert_units(self.settings.child('unit').value(), value.value(), self.settings.child('coeff').value())
-        value = DataActuator(data=value)
         self.target_value = value + self.current_position
- 
+
         value = self.set_position_relative_with_scaling(value)
 
-        self.controller.move_rel(int(value.value()), self.axis_value)
-        self.controller.get_unit_position(self.settings['unit'], self.axis_value)
+        self.controller.move_rel(self.controller.units.to_native(value.value(), self.axis_value), self.axis_value,
+                                 wait=not self.settings['non_blocking'])
+
+    def move_axes(self, positions: Dict[str, float]):
+        """ Move both axes at once to their absolute targets, with a single drive command
+
+        Parameters
+        ----------
+        positions: dict
+            absolute targets indexed by axis name, for instance {'Axis1': 100, 'Axis2': 200}
+        """
+        channels = [self.axis_names[name] for name in positions]
+        values = [self.set_position_with_scaling(self.check_bound(DataActuator(data=value))).value()
+                  for value in positions.values()]
+        self.controller.move_axes(dict(zip(channels, self.controller.units.to_native(values, channels).tolist())))
+        self.emit_value(self.get_actuator_value())
+        self.emit_status(ThreadCommand('Update_Status', [f'GSC axes {list(positions)} moved']))
+
+    def move_waypoints(self, waypoints, axes=None, callback=None):
+        """ Run a list of absolute targets (raster scan) as a streamed sequence of moves, without any signal emitted
+        between the points
+
+        Parameters
+        ----------
+        waypoints: ndarray
+            N x len(axes) absolute targets, for instance np.array([[0, 0], [1000, 0], [1000, 1000]])
+        axes: list of str
+            names of the axes of the columns, all the axes by default
+        callback: callable
+            called as callback(index, waypoint) once each waypoint is reached, for instance to trigger an acquisition.
+            Returning False stops the sequence
+
+        Returns
+        -------
+        int: the number of waypoints reached
+        """
+        axes = list(self.axis_names) if axes is None else list(axes)
+        waypoints = np.asarray(waypoints)
+        targets, clipped = scale_waypoints(self.settings, waypoints.reshape((len(waypoints), -1)))
+        if clipped:
+            self.emit_status(ThreadCommand('outofbounds', []))
+        channels = [self.axis_names[name] for name in axes]
+        targets = self.controller.units.to_native(targets, channels)
+        done = self.controller.run_waypoints(
+            targets, channels,
+            None if callback is None else lambda index, _: callback(index, waypoints[index]))
+        self.emit_value(self.get_actuator_value())
+        self.emit_status(ThreadCommand('Update_Status', [f'GSC {done}/{len(waypoints)} waypoints reached']))
+        return done
 
     def move_home(self):
         """Call the reference method of the controller"""
 
         self.controller.home(self.axis_value)
+        show_homing_required(self.settings, self.controller)
         self.emit_status(ThreadCommand('Update_Status', ['GSC has moved to home position']))
 
+    def home_all(self):
+        """Home both axes of the controller at once"""
+        self.controller.home_all()
+        show_homing_required(self.settings, self.controller)
+        self.emit_value(self.get_actuator_value())
+        self.emit_status(ThreadCommand('Update_Status', ['GSC axes have moved to home position']))
+
+    def move_done(self, position=None):
+        """Emit the move_done signal, check the errors of the controller (rate-limited, see the [health] section of
+        the configuration) and refresh the command statistics if enabled"""
+        super().move_done(position)
+        self.controller.health.check()
+        if self.settings['stats', 'stats_enabled']:
+            update_stats(self.settings, self.controller.instrumentation)
+
+    def health_event(self, event):
+        """Show the errors and warnings found by the health monitor of the controller for this axis"""
+        if event.channel in (None, self.axis_value):
+            self.emit_status(ThreadCommand('Update_Status', [str(event)]))
+
+    def user_condition_to_reach_target(self) -> bool:
+        """The target is reached once the controller reports the axes as ready (cached status, see status_ttl)"""
+        return self.controller.get_status().is_ready(self.axis_value)
+
     def stop_motion(self):
         """Stop the actuator and emits move_done signal"""
 
         self.controller.stop(self.axis_value) 
+        self.poll_timer.stop()
+        self.move_done()
         self.emit_status(ThreadCommand('Update_Status', ['GSC Actuator has stopped']))
 
 
@@ -1,11 +1,19 @@
-from typing import Union, List, Dict
+from typing import Union, List, Dict, TYPE_CHECKING
+
+import numpy as np
 from pymodaq.control_modules.move_utility_classes import DAQ_Move_base, comon_parameters_fun, main, DataActuatorType, \
     DataActuator
 from pymodaq.utils.daq_utils import ThreadCommand
 from pymodaq.utils.parameter import Parameter
-from pymodaq_plugins_optosigma.hardware.rmc_VISADriver import RMCVISADriver
+from pymodaq_plugins_optosigma.hardware import connections
+from pymodaq_plugins_optosigma.utils import polling_params, polling_settings, multi_move_params, status_params, \
+    scale_waypoints, move_mode_params, stats_params, update_stats, commit_stats, line_params, \
+    warm_start_message, home_all_params, homing_required_params, show_homing_required, show_driver_settings
 from pymodaq.utils import logger
 
+if TYPE_CHECKING:
+    from pymodaq_plugins_optosigma.hardware.rmc_VISADriver import RMCVISADriver
+
 
 class DAQ_Move_RMC(DAQ_Move_base):
     """ RMC-02C 2 Axis Controller plugin class
@@ -22,17 +30,25 @@ class DAQ_Move_RMC(DAQ_Move_base):
     """
     is_multiaxes = True
     _axis_names: Union[List[str], Dict[str, int]] = {"X": 1, "Y": 2}
-    _controller_units: Union[str, List[str]] = RMCVISADriver.default_units
+    _controller_units: Union[str, List[str]] = "um"
     _epsilon: Union[float, List[float]] = 0.9
     data_actuator_type = DataActuatorType.DataActuator
 
     params = [
                  {"title": "Instrument Address", "name": "visa_name", "type": "str", "value": "ASRL7::INSTR"},
-                 {"title": "Speed", "name": "speed", "type": "int", "value": 8}
+                 line_params(),
+                 {"title": "Speed", "name": "speed", "type": "int", "value": 8},
+                 polling_params(),
+                 status_params(),
+                 move_mode_params(),
+                 stats_params(),
+                 multi_move_params(_axis_names),
+                 home_all_params(),
+                 homing_required_params(),
              ] + comon_parameters_fun(is_multiaxes, axis_names=_axis_names, epsilon=_epsilon)
 
     def ini_attributes(self):
-        self.controller: RMCVISADriver = None
+        self.controller: "RMCVISADriver" = None
 
     def get_actuator_value(self):
         """Get the current value from the hardware with scaling conversion.
@@ -42,14 +58,16 @@ class DAQ_Move_RMC(DAQ_Move_base):
         float: The position obtained after scaling conversion.
         """
         pos = DataActuator(
-            data=self.controller.get_position(self.axis_value),
+            data=self.controller.units.from_native(self.controller.read_position(self.axis_value), self.axis_value),
             unit=self._controller_units)
         pos = self.get_position_with_scaling(pos)
         return pos
 
     def close(self):
         """Terminate the communication protocol"""
-        self.controller.close()
+        if self.controller is not None:  # None if the connection failed
+            self.controller.health.unsubscribe(self.health_event)
+        connections.release(self.controller)
 
     def commit_settings(self, param: Parameter):
         """Apply the consequences of a change of value in the detector settings
@@ -62,15 +80,31 @@ class DAQ_Move_RMC(DAQ_Move_base):
 
         if param.name() == 'speed':
             self.controller.set_speed(self.settings["speed"], self.axis_value)
+        elif param.parent().name() == 'polling':
+            self.controller.polling.update(**{param.name(): param.value()})
+        elif param.name() == 'status_ttl':
+            self.controller.status_cache.ttl = param.value()
+        elif param.parent().name() == 'stats':
+            commit_stats(self.settings, param, self.controller.instrumentation)
+        elif param.name() == 'move_axes':
+            if param.value():
+                self.move_axes({name: self.settings['multi_move', name] for name in self.axis_names})
+                param.setValue(False)
+        elif param.name() == 'home_all':
+            if param.value():
+                self.home_all()
+                param.setValue(False)
         else:
             pass
 
     def set_initial_conditions(self):
+        """Set the speed of both axes and home those whose position could not be restored (see hardware.state)"""
         speed = 8
         channels = [1, 2]
         for channel in channels:
             self.controller.set_speed(speed, channel)
-            self.controller.home(channel)
+        if self.controller.persisted.homing_required:
+            self.controller.home_axes(self.controller.persisted.homing_required)
 
     def ini_stage(self, controller=None):
         """Actuator communication initialization
@@ -89,8 +123,23 @@ class DAQ_Move_RMC(DAQ_Move_base):
         self.ini_stage_init(slave_controller=controller)
 
         if self.is_master:
-            self.controller = RMCVISADriver(self.settings["visa_name"])
-            self.controller.connect()
+            from pymodaq_plugins_optosigma.hardware.rmc_VISADriver import RMCVISADriver
+            try:
+                self.controller = connections.acquire(RMCVISADriver, self.settings["visa_name"],
+                                                      lambda driver: driver.connect(self.settings["line", "negotiate"]))
+            except Exception as e:
+                return f"Connection to {self.settings['visa_name']} failed: {e}", False
+            if connections.users(self.settings["visa_name"]) == 1:  # first plugin on this controller
+                self.emit_status(ThreadCommand("Update_Status", [warm_start_message(self.controller)]))
+        else:
+            connections.retain(self.controller)
+        show_driver_settings(self.settings, {'speed': self.controller.speed[self.axis_value - 1]})
+        show_homing_required(self.settings, self.controller)
+        self.controller.polling.update(**polling_settings(self.settings))
+        self.controller.status_cache.ttl = self.settings['status_ttl']
+        self.controller.instrumentation.enable(self.settings['stats', 'stats_enabled'])
+        self.controller.health.subscribe(self.health_event)
+        self.settings.child('line', 'baud_rate').setValue(self.controller._actuator.baud_rate)
 
         info = "RMC Actuator initialized"
         initialized = True
@@ -108,7 +157,8 @@ class DAQ_Move_RMC(DAQ_Move_base):
         self.target_value = value
         value = self.set_position_with_scaling(value)
 
-        self.controller.move(value.value(), self.axis_value)
+        self.controller.move(self.controller.units.to_native(value.value(), self.axis_value), self.axis_value,
+                             wait=not self.settings['non_blocking'])
 
     def move_rel(self, value: DataActuator):
         """ Move the actuator to the relative target actuator value defined by value
@@ -121,16 +171,92 @@ class DAQ_Move_RMC(DAQ_Move_base):
         self.target_value = value + self.current_position
         value = self.set_position_relative_with_scaling(value)
 
-        self.controller.move_relative(value.value(), self.axis_value)
+        self.controller.move_relative(self.controller.units.to_native(value.value(), self.axis_value), self.axis_value,
+                                      wait=not self.settings['non_blocking'])
+
+    def move_axes(self, positions: Dict[str, float]):
+        """ Move both axes at once to their absolute targets, with a single drive command
+
+        Parameters
+        ----------
+        positions: dict
+            absolute targets indexed by axis name, for instance {"X": 100., "Y": 200.}
+        """
+        channels = [self.axis_names[name] for name in positions]
+        values = [self.set_position_with_scaling(self.check_bound(DataActuator(data=value))).value()
+                  for value in positions.values()]
+        self.controller.move_axes(dict(zip(channels, self.controller.units.to_native(values, channels).tolist())))
+        self.emit_value(self.get_actuator_value())
+        self.emit_status(ThreadCommand('Update_Status', [f'RMC axes {list(positions)} moved']))
+
+    def move_waypoints(self, waypoints, axes=None, callback=None):
+        """ Run a list of absolute targets (raster scan) as a streamed sequence of moves, without any signal emitted
+        between the points
+
+        Parameters
+        ----------
+        waypoints: ndarray
+            N x len(axes) absolute targets, for instance np.array([[0., 0.], [100., 0.], [100., 100.]])
+        axes: list of str
+            names of the axes of the columns, all the axes by default
+        callback: callable
+            called as callback(index, waypoint) once each waypoint is reached, for instance to trigger an acquisition.
+            Returning False stops the sequence
+
+        Returns
+        -------
+        int: the number of waypoints reached
+        """
+        axes = list(self.axis_names) if axes is None else list(axes)
+        waypoints = np.asarray(waypoints)
+        targets, clipped = scale_waypoints(self.settings, waypoints.reshape((len(waypoints), -1)))
+        if clipped:
+            self.emit_status(ThreadCommand('outofbounds', []))
+        channels = [self.axis_names[name] for name in axes]
+        targets = self.controller.units.to_native(targets, channels)
+        done = self.controller.run_waypoints(
+            targets, channels,
+            None if callback is None else lambda index, _: callback(index, waypoints[index]))
+        self.emit_value(self.get_actuator_value())
+        self.emit_status(ThreadCommand('Update_Status', [f'RMC {done}/{len(waypoints)} waypoints reached']))
+        return done
 
     def move_home(self):
         """Call the reference method of the controller"""
 
         self.controller.home(self.axis_value)
+        show_homing_required(self.settings, self.controller)
+
+    def home_all(self):
+        """Home both axes of the controller at once"""
+        self.controller.home_all()
+        show_homing_required(self.settings, self.controller)
+        self.emit_value(self.get_actuator_value())
+        self.emit_status(ThreadCommand('Update_Status', ['RMC axes have moved to home position']))
+
+    def move_done(self, position=None):
+        """Emit the move_done signal, check the errors of the controller (rate-limited, see the [health] section of
+        the configuration) and refresh the command statistics if enabled"""
+        super().move_done(position)
+        self.controller.health.check()
+        if self.settings['stats', 'stats_enabled']:
+            update_stats(self.settings, self.controller.instrumentation)
+
+    def health_event(self, event):
+        """Show the errors and warnings found by the health monitor of the controller for this axis"""
+        if event.channel in (None, self.axis_value):
+            self.emit_status(ThreadCommand('Update_Status', [str(event)]))
+
+    def user_condition_to_reach_target(self) -> bool:
+        """The target is reached once the controller reports the axis as ready (cached status, see status_ttl)"""
+        return self.controller.get_status().is_ready(self.axis_value)
+
     def stop_motion(self):
         """Stop the actuator and emits move_done signal"""
 
         self.controller.stop(self.axis_value)
+        self.poll_timer.stop()
+        self.move_done()
 
 if __name__ == '__main__':
     main(__file__)
\ No newline at end of file
@@ -1,11 +1,18 @@
-from typing import Union, List, Dict
+from typing import Union, List, Dict, TYPE_CHECKING
+
+import numpy as np
 import logging
 from pymodaq.control_modules.move_utility_classes import DAQ_Move_base, comon_parameters_fun, main, DataActuatorType, \
     DataActuator
 from pymodaq.utils.daq_utils import ThreadCommand
 from pymodaq.utils.parameter import Parameter
-from pymodaq_plugins_optosigma.hardware.sbis26_VISADriver import SBIS26VISADriver
-from pymodaq_plugins_optosigma.hardware.sbis26_VISADriver import SBIS26VISADriver
+from pymodaq_plugins_optosigma.hardware import connections
+from pymodaq_plugins_optosigma.utils import polling_params, polling_settings, status_params, scale_waypoints, \
+    move_mode_params, stats_params, update_stats, commit_stats, line_params, warm_start_message, \
+    home_all_params, homing_required_params, show_homing_required, show_driver_settings
+
+if TYPE_CHECKING:
+    from pymodaq_plugins_optosigma.hardware.sbis26_VISADriver import SBIS26VISADriver
 
 logger = logging.getLogger(__name__)
 
@@ -37,13 +44,24 @@ class DAQ_Move_SBIS26(DAQ_Move_base):
                      "type": "str",
                      "value": "ASRL4::INSTR",
                  },
+                 line_params(),
                  {"title": "Speed Initial:", "name": "speed_ini", "type": "float", "value": 1000},
                  {"title": "Acceleration Time:", "name": "accel_t", "type": "float", "value": 100},
                  {"title": "Speed Final:", "name": "speed_fin", "type": "float", "value": 1000},
+                 {"title": "Unit:", "name": "unit", "type": "list", "limits": ["pulse", "nm", "um", "mm", "deg"],
+                  "value": "pulse"},
+                 {"title": "Coeff:", "name": "coeff", "type": "float", "value": 1.0, "min": 0.,
+                  "tip": "Resolution of the stage in pulses per um (per degree for a rotation stage)"},
+                 polling_params(),
+                 status_params(),
+                 move_mode_params(),
+                 stats_params(),
+                 home_all_params(),
+                 homing_required_params(),
              ] + comon_parameters_fun(is_multiaxes, axis_names=_axis_names, epsilon=_epsilon)
 
     def ini_attributes(self):
-        self.controller: SBIS26VISADriver = None
+        self.controller: "SBIS26VISADriver" = None
 
     def get_actuator_value(self):
         """Get the current value from the hardware with scaling conversion.
@@ -53,13 +71,16 @@ class DAQ_Move_SBIS26(DAQ_Move_base):
         float: The position obtained after scaling conversion.
         """
 
-        pos = DataActuator(data=self.controller.get_position(self.axis_value))
+        position = self.controller.units.from_native(self.controller.read_position(self.axis_value), self.axis_value)
+        pos = DataActuator(data=position)
         pos = self.get_position_with_scaling(pos)
         return pos
 
     def close(self):
         """Terminate the communication protocol"""
-        self.controller.close()
+        if self.controller is not None:  # None if the connection failed
+            self.controller.health.unsubscribe(self.health_event)
+        connections.release(self.controller)
 
     def commit_settings(self, param: Parameter):
         """Apply the consequences of a change of value in the detector settings
@@ -72,6 +93,18 @@ class DAQ_Move_SBIS26(DAQ_Move_base):
         if param.name() == "speed_ini" or param.name() == "speed_fin" or param.name() == "accel_t":
             self.controller.set_speed(self.settings["speed_ini"], self.settings["speed_fin"], self.settings["accel_t"],
                                       self.axis_value)
+        elif param.name() == "unit" or param.name() == "coeff":
+            self.axis_unit = self.controller.set_unit(self.settings["unit"], self.axis_value, self.settings["coeff"])
+        elif param.parent().name() == "polling":
+            self.controller.polling.update(**{param.name(): param.value()})
+        elif param.name() == "status_ttl":
+            self.controller.status_cache.ttl = param.value()
+        elif param.parent().name() == "stats":
+            commit_stats(self.settings, param, self.controller.instrumentation)
+        elif param.name() == "home_all":
+            if param.value():
+                self.home_all()
+                param.setValue(False)
         else:
             pass
         
@@ -93,10 +126,27 @@ class DAQ_Move_SBIS26(DAQ_Move_base):
 
         self.ini_stage_init(slave_controller=controller)
         if self.is_master:
-            self.controller = SBIS26VISADriver(self.settings["visa_name"])
-            self.controller.connect()
+            from pymodaq_plugins_optosigma.hardware.sbis26_VISADriver import SBIS26VISADriver
+            try:
+                self.controller = connections.acquire(SBIS26VISADriver, self.settings["visa_name"],
+                                                      lambda driver: driver.connect(self.settings["line", "negotiate"]))
+            except Exception as e:
+                return f"Connection to {self.settings['visa_name']} failed: {e}", False
+            if connections.users(self.settings["visa_name"]) == 1:  # first plugin on this controller
+                self.emit_status(ThreadCommand("Update_Status", [warm_start_message(self.controller)]))
         else:
-            logger.error("This plugin is not initialized")
+            connections.retain(self.controller)
+        channel = self.axis_value
+        show_driver_settings(self.settings, {"speed_ini": self.controller.speed_ini[channel - 1],
+                                             "speed_fin": self.controller.speed_fin[channel - 1],
+                                             "accel_t": self.controller.accel_t[channel - 1]})
+        show_homing_required(self.settings, self.controller)
+        self.controller.polling.update(**polling_settings(self.settings))
+        self.controller.status_cache.ttl = self.settings["status_ttl"]
+        self.controller.instrumentation.enable(self.settings["stats", "stats_enabled"])
+        self.axis_unit = self.controller.set_unit(self.settings["unit"], self.axis_value, self.settings["coeff"])
+        self.controller.health.subscribe(self.health_event)
+        self.settings.child("line", "baud_rate").setValue(self.controller._stage.baud_rate)
 
         info = "SBIS26 is initialized"
         initialized = True
@@ -114,7 +164,8 @@ class DAQ_Move_SBIS26(DAQ_Move_base):
 
         value = self.set_position_with_scaling(value)
 
-        self.controller.move(value.value(), self.axis_value)
+        self.controller.move(self.controller.units.to_native(value.value(), self.axis_value), self.axis_value,
+                             wait=not self.settings["non_blocking"])
 
     def move_rel(self, value: DataActuator):
         """ Move the actuator to the relative target actuator value defined by value
@@ -127,15 +178,75 @@ class DAQ_Move_SBIS26(DAQ_Move_base):
         self.target_value = value + self.current_position
         value = self.set_position_relative_with_scaling(value)
 
-        self.controller.move_relative(value.value(), self.axis_value)
+        self.controller.move_relative(self.controller.units.to_native(value.value(), self.axis_value), self.axis_value,
+                                      wait=not self.settings["non_blocking"])
+
+    def move_waypoints(self, waypoints, axes=None, callback=None):
+        """ Run a list of absolute targets (raster scan) as a streamed sequence of moves, without any signal emitted
+        between the points
+
+        Parameters
+        ----------
+        waypoints: ndarray
+            N x len(axes) absolute targets, for instance np.array([[0., 0.], [1000., 0.], [1000., 1000.]])
+        axes: list of str
+            names of the axes of the columns, all the axes by default
+        callback: callable
+            called as callback(index, waypoint) once each waypoint is reached, for instance to trigger an acquisition.
+            Returning False stops the sequence
+
+        Returns
+        -------
+        int: the number of waypoints reached
+        """
+        axes = list(self.axis_names) if axes is None else list(axes)
+        waypoints = np.asarray(waypoints)
+        targets, clipped = scale_waypoints(self.settings, waypoints.reshape((len(waypoints), -1)))
+        if clipped:
+            self.emit_status(ThreadCommand("outofbounds", []))
+        channels = [self.axis_names[name] for name in axes]
+        targets = self.controller.units.to_native(targets, channels)
+        done = self.controller.run_waypoints(
+            targets, channels,
+            None if callback is None else lambda index, _: callback(index, waypoints[index]))
+        self.emit_value(self.get_actuator_value())
+        self.emit_status(ThreadCommand("Update_Status", [f"SBIS26 {done}/{len(waypoints)} waypoints reached"]))
+        return done
 
     def move_home(self):
         """Call the reference method of the controller"""
         self.controller.home(self.axis_value)
+        show_homing_required(self.settings, self.controller)
+
+    def home_all(self):
+        """Home all the stages of the link at once"""
+        self.controller.home_all()
+        show_homing_required(self.settings, self.controller)
+        self.emit_value(self.get_actuator_value())
+        self.emit_status(ThreadCommand("Update_Status", ["SBIS26 stages have moved to home position"]))
+
+    def move_done(self, position=None):
+        """Emit the move_done signal, check the errors of the controller (rate-limited, see the [health] section of
+        the configuration) and refresh the command statistics if enabled"""
+        super().move_done(position)
+        self.controller.health.check(self.axis_value)
+        if self.settings["stats", "stats_enabled"]:
+            update_stats(self.settings, self.controller.instrumentation)
+
+    def health_event(self, event):
+        """Show the errors and warnings found by the health monitor of the controller for this axis"""
+        if event.channel in (None, self.axis_value):
+            self.emit_status(ThreadCommand("Update_Status", [str(event)]))
+
+    def user_condition_to_reach_target(self) -> bool:
+        """The target is reached once the controller reports the axis as ready (cached status, see status_ttl)"""
+        return self.controller.get_status().is_ready(self.axis_value)
 
     def stop_motion(self):
         """Stop the actuator and emits move_done signal"""
-        self.controller.stop()
+        self.controller.stop(self.axis_value)
+        self.poll_timer.stop()
+        self.move_done()
         self.emit_status(ThreadCommand('Update_Status', ['SBIS26 has stopped moving']))
 
 
@@ -1,11 +1,20 @@
-from typing import Union, List, Dict
+from typing import Union, List, Dict, TYPE_CHECKING
+
+import numpy as np
 
 from pymodaq.control_modules.move_utility_classes import (DAQ_Move_base, comon_parameters_fun, main, DataActuatorType, DataActuator,) 
 from pymodaq.utils.daq_utils import (ThreadCommand) 
 from pymodaq.utils.parameter import Parameter
-from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import ( SHRC203VISADriver as SHRC203)
+from pymodaq_plugins_optosigma.hardware import connections
+from pymodaq_plugins_optosigma.hardware.units import display_unit, unit_name
+from pymodaq_plugins_optosigma.utils import polling_params, polling_settings, multi_move_params, status_params, \
+    scale_waypoints, move_mode_params, stats_params, update_stats, commit_stats, line_params, \
+    warm_start_message, home_all_params, homing_required_params, show_homing_required, show_driver_settings
 from pymodaq.utils.logger import set_logger, get_module_name
 
+if TYPE_CHECKING:
+    from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver as SHRC203
+
 logger = set_logger(get_module_name(__file__))
 
 class DAQ_Move_SHRC203(DAQ_Move_base):
@@ -24,7 +33,7 @@ class DAQ_Move_SHRC203(DAQ_Move_base):
     
     is_multiaxes = True 
     _axis_names: Union[List[str], Dict[str, int]] = {"X": 1, "Y": 2, "Z": 3}
-    _controller_units: Union[str, List[str]] = SHRC203.default_units 
+    _controller_units: Union[str, List[str]] = "um" 
     _epsilon: Union[float, List[float]] = 0.040 # < 50 nm
     data_actuator_type = (DataActuatorType.DataActuator) 
 
@@ -35,6 +44,7 @@ class DAQ_Move_SHRC203(DAQ_Move_base):
             "type": "str",
             "value": "ASRL3::INSTR",
         },
+        line_params(),
         {
             "title": "Unit:",
             "name": "unit",
@@ -46,10 +56,17 @@ class DAQ_Move_SHRC203(DAQ_Move_base):
         {"title": "Speed Initial:", "name": "speed_ini", "type": "float", "value": 0},
         {"title": "Acceleration Time:", "name": "accel_t", "type": "float", "value": 1},
         {"title": "Speed Final:", "name": "speed_fin", "type": "float", "value": 1.2},
+        polling_params(),
+        status_params(),
+        move_mode_params(),
+        stats_params(),
+        multi_move_params(_axis_names),
+        home_all_params(),
+        homing_required_params(),
     ] + comon_parameters_fun(is_multiaxes, axis_names=_axis_names, epsilon=_epsilon)
 
     def ini_attributes(self):
-        self.stage: SHRC203 = None
+        self.stage: "SHRC203" = None
 
     def get_actuator_value(self):
         """Get the current value from the hardware with scaling conversion.
@@ -59,15 +76,17 @@ class DAQ_Move_SHRC203(DAQ_Move_base):
         float: The position obtained after scaling conversion.
         """
         pos = DataActuator(
-            data=self.stage.get_position(self.axis_value),
-            unit=self._controller_units
+            data=self.stage.units.from_native(self.stage.read_position(self.axis_value), self.axis_value),
+            unit=self.axis_unit
         )
         pos = self.get_position_with_scaling(pos)
         return pos
 
     def close(self):
         """Terminate the communication protocol"""
-        return self.stage.close()
+        if self.stage is not None:  # None if the connection failed
+            self.stage.health.unsubscribe(self.health_event)
+        connections.release(self.stage)
 
     def commit_settings(self, param: Parameter):
         """Apply the consequences of a change of value in the detector settings
@@ -88,9 +107,22 @@ class DAQ_Move_SHRC203(DAQ_Move_base):
         elif param.name() == "loop":
             self.stage.set_loop(self.settings.child('loop').value(), self.axis_value)
         elif param.name() == "unit":
-            unit_dict = {"um": "U", "mm": "M", "nm": "N", "deg": "D", "pulse": "P"}
-            self.stage.set_unit(unit_dict[self.settings.child('unit').value()])
-            self._controller_units = self.settings.child('unit').value()
+            self.stage.set_unit(self.settings["unit"])
+            self.axis_unit = display_unit(self.settings["unit"])
+        elif param.parent().name() == "polling":
+            self.stage.polling.update(**{param.name(): param.value()})
+        elif param.name() == "status_ttl":
+            self.stage.status_cache.ttl = param.value()
+        elif param.parent().name() == "stats":
+            commit_stats(self.settings, param, self.stage.instrumentation)
+        elif param.name() == "move_axes":
+            if param.value():
+                self.move_axes({name: self.settings['multi_move', name] for name in self.axis_names})
+                param.setValue(False)
+        elif param.name() == "home_all":
+            if param.value():
+                self.home_all()
+                param.setValue(False)
         else:
             pass
 
@@ -108,18 +140,40 @@ class DAQ_Move_SHRC203(DAQ_Move_base):
         initialized: bool
             False if initialization failed otherwise True
         """
-        self.ini_stage_init(
-            slave_controller=self.stage
+        self.stage = self.ini_stage_init(
+            slave_controller=controller
         )
 
         if self.is_master:
-            self.stage = SHRC203(self.settings["visa_name"])
-            self.stage.open_connection()
+            from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver as SHRC203
+            try:
+                self.stage = connections.acquire(
+                    SHRC203, self.settings["visa_name"],
+                    lambda driver: driver.open_connection(self.settings["line", "negotiate"]))
+            except Exception as e:
+                return f"Connection to {self.settings['visa_name']} failed: {e}", False
+            self.controller = self.stage
         else:
-            logger.warning("No controller has been defined. Please define one")
+            connections.retain(self.stage)
 
         info = "SHRC203 is Initialized"
         self.stage.set_mode()
+        if self.is_master and connections.users(self.settings["visa_name"]) == 1:  # first plugin on this controller
+            # the unit of the settings is replaced by the saved one if the warm start restores the state
+            self.stage.set_unit(self.settings["unit"])
+            self.emit_status(ThreadCommand("Update_Status", [warm_start_message(self.stage)]))
+        channel = self.axis_value
+        show_driver_settings(self.settings, {"unit": unit_name(self.stage.unit), "loop": self.stage.loop[channel - 1],
+                                             "speed_ini": self.stage.speed_ini[channel - 1],
+                                             "speed_fin": self.stage.speed_fin[channel - 1],
+                                             "accel_t": self.stage.accel_t[channel - 1]})
+        show_homing_required(self.settings, self.stage)
+        self.axis_unit = display_unit(self.settings["unit"])
+        self.stage.polling.update(**polling_settings(self.settings))
+        self.stage.status_cache.ttl = self.settings["status_ttl"]
+        self.stage.instrumentation.enable(self.settings["stats", "stats_enabled"])
+        self.stage.health.subscribe(self.health_event)
+        self.settings.child("line", "baud_rate").setValue(self.stage._instr.baud_rate)
         initialized = True
         return info, initialized
 
@@ -135,7 +189,8 @@ class DAQ_Move_SHRC203(DAQ_Move_base):
         self.target_value = value
         value = self.set_position_with_scaling(value)  # apply scaling if the user specified one
 
-        self.stage.move(value.value(), self.axis_value)
+        self.stage.move(self.stage.units.to_native(value.value(), self.axis_value), self.axis_value,
+                        wait=not self.settings["non_blocking"])
 
     def move_rel(self, value: DataActuator):
         """Move the actuator to the relative target actuator value defined by value
@@ -148,16 +203,91 @@ class DAQ_Move_SHRC203(DAQ_Move_base):
         self.target_value = value + self.current_position
         value = self.set_position_relative_with_scaling(value)
 
-        self.stage.move_relative(value.value(), self.axis_value)
+        self.stage.move_relative(self.stage.units.to_native(value.value(), self.axis_value), self.axis_value,
+                                 wait=not self.settings["non_blocking"])
+
+    def move_axes(self, positions: Dict[str, float]):
+        """Move several axes at once to their absolute targets, with a single drive command
+
+        Parameters
+        ----------
+        positions: dict
+            absolute targets indexed by axis name, for instance {"X": 10., "Y": 20.}
+        """
+        channels = [self.axis_names[name] for name in positions]
+        values = [self.set_position_with_scaling(self.check_bound(DataActuator(data=value))).value()
+                  for value in positions.values()]
+        self.stage.move_axes(dict(zip(channels, self.stage.units.to_native(values, channels).tolist())))
+        self.emit_value(self.get_actuator_value())
+        self.emit_status(ThreadCommand("Update_Status", [f"Axes {list(positions)} moved"]))
+
+    def move_waypoints(self, waypoints, axes=None, callback=None):
+        """ Run a list of absolute targets (raster scan) as a streamed sequence of moves, without any signal emitted
+        between the points
+
+        Parameters
+        ----------
+        waypoints: ndarray
+            N x len(axes) absolute targets, for instance np.array([[0., 0.], [10., 0.], [10., 10.]])
+        axes: list of str
+            names of the axes of the columns, all the axes by default
+        callback: callable
+            called as callback(index, waypoint) once each waypoint is reached, for instance to trigger an acquisition.
+            Returning False stops the sequence
+
+        Returns
+        -------
+        int: the number of waypoints reached
+        """
+        axes = list(self.axis_names) if axes is None else list(axes)
+        waypoints = np.asarray(waypoints)
+        targets, clipped = scale_waypoints(self.settings, waypoints.reshape((len(waypoints), -1)))
+        if clipped:
+            self.emit_status(ThreadCommand("outofbounds", []))
+        channels = [self.axis_names[name] for name in axes]
+        targets = self.stage.units.to_native(targets, channels)
+        done = self.stage.run_waypoints(
+            targets, channels,
+            None if callback is None else lambda index, _: callback(index, waypoints[index]))
+        self.emit_value(self.get_actuator_value())
+        self.emit_status(ThreadCommand("Update_Status", [f"SHRC203 {done}/{len(waypoints)} waypoints reached"]))
+        return done
 
     def move_home(self):
         """Call the reference method of the controller"""
         self.stage.home(self.axis_value)
+        show_homing_required(self.settings, self.stage)
+
+    def home_all(self):
+        """Home all the axes of the controller at once"""
+        self.stage.home_all()
+        show_homing_required(self.settings, self.stage)
+        self.emit_value(self.get_actuator_value())
+        self.emit_status(ThreadCommand("Update_Status", ["Axes have moved to home position"]))
+
+
+    def move_done(self, position=None):
+        """Emit the move_done signal, check the errors of the controller (rate-limited, see the [health] section of
+        the configuration) and refresh the command statistics if enabled"""
+        super().move_done(position)
+        self.stage.health.check(self.axis_value)
+        if self.settings["stats", "stats_enabled"]:
+            update_stats(self.settings, self.stage.instrumentation)
+
+    def health_event(self, event):
+        """Show the errors and warnings found by the health monitor of the controller for this axis"""
+        if event.channel in (None, self.axis_value):
+            self.emit_status(ThreadCommand("Update_Status", [str(event)]))
 
+    def user_condition_to_reach_target(self) -> bool:
+        """The target is reached once the controller reports the axis as ready (cached status, see status_ttl)"""
+        return self.stage.get_status().is_ready(self.axis_value)
 
     def stop_motion(self):
         """Stop the actuator and emits move_done signal"""
         self.stage.stop(self.axis_value)
+        self.poll_timer.stop()
+        self.move_done()
         self.emit_status(ThreadCommand("Update_Status", ["Instrument stopped"])) 
 
     if __name__ == "__main__":
@@ -0,0 +1,77 @@
+from typing import TYPE_CHECKING
+
+from pymodaq.control_modules.viewer_utility_classes import DAQ_Viewer_base, comon_parameters, main
+from pymodaq.utils.parameter import Parameter
+from pymodaq_plugins_optosigma.hardware import connections
+from pymodaq_plugins_optosigma.utils import line_params, status_params, status_data
+
+if TYPE_CHECKING:
+    from pymodaq_plugins_optosigma.hardware.rmc_VISADriver import RMCVISADriver
+
+
+class DAQ_0DViewer_RMC(DAQ_Viewer_base):
+    """ Positions (um) and states of both axes of a RMC-102 controller, as 0D data.
+
+    Each grab reads the whole controller with the Q: and !: queries sent in a single transfer (or takes the status
+    cached by the actuators, see status_ttl). The connection is shared with the DAQ_Move_RMC plugins using the same
+    Instrument Address.
+    """
+    axis_names = ["X", "Y"]
+    params = comon_parameters + [
+        {"title": "Instrument Address", "name": "visa_name", "type": "str", "value": "ASRL7::INSTR"},
+        line_params(),
+        status_params(),
+    ]
+
+    def ini_attributes(self):
+        self.controller: "RMCVISADriver" = None
+
+    def commit_settings(self, param: Parameter):
+        """Apply the consequences of a change of value in the detector settings"""
+        if param.name() == "status_ttl":
+            self.controller.status_cache.ttl = param.value()
+
+    def ini_detector(self, controller=None):
+        """Detector communication initialization
+
+        Parameters
+        ----------
+        controller: (object)
+            custom object of a PyMoDAQ plugin (Slave case). None if only one actuator/detector by controller
+            (Master case)
+
+        Returns
+        -------
+        info: str
+        initialized: bool
+            False if initialization failed otherwise True
+        """
+        self.ini_detector_init(slave_controller=controller)
+        if self.is_master:
+            from pymodaq_plugins_optosigma.hardware.rmc_VISADriver import RMCVISADriver
+            try:
+                self.controller = connections.acquire(RMCVISADriver, self.settings["visa_name"],
+                                                      lambda driver: driver.connect(self.settings["line", "negotiate"]))
+            except Exception as e:
+                return f"Connection to {self.settings['visa_name']} failed: {e}", False
+        else:
+            connections.retain(self.controller)
+        self.controller.status_cache.ttl = self.settings["status_ttl"]
+        self.settings.child("line", "baud_rate").setValue(self.controller._actuator.baud_rate)
+        self.dte_signal_temp.emit(status_data("RMC", self.controller.get_status(), self.axis_names))
+        return "RMC status viewer initialized", True
+
+    def close(self):
+        """Terminate the communication protocol"""
+        connections.release(self.controller)
+
+    def grab_data(self, Naverage=1, **kwargs):
+        """Read the positions and states of both axes and send them as a DataToExport"""
+        self.dte_signal.emit(status_data("RMC", self.controller.get_status(), self.axis_names))
+
+    def stop(self):
+        return ""
+
+
+if __name__ == "__main__":
+    main(__file__)
@@ -0,0 +1,84 @@
+from typing import TYPE_CHECKING
+
+from pymodaq.control_modules.viewer_utility_classes import DAQ_Viewer_base, comon_parameters, main
+from pymodaq.utils.parameter import Parameter
+from pymodaq_plugins_optosigma.hardware import connections
+from pymodaq_plugins_optosigma.utils import line_params, status_params, status_data
+
+if TYPE_CHECKING:
+    from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver as SHRC203
+
+
+class DAQ_0DViewer_SHRC203(DAQ_Viewer_base):
+    """SHRC203 3 Axis Stage Controller status viewer
+
+    Positions (in the unit of the controller) and states of the three axes as 0D data. Each grab reads the whole
+    controller with the Q: and !: queries sent in a single transfer (or takes the status cached by the actuators,
+    see status_ttl). The connection is shared with the DAQ_Move_SHRC203 plugins using the same Instrument Address.
+    """
+    axis_names = ["X", "Y", "Z"]
+    params = comon_parameters + [
+        {
+            "title": "Instrument Address:",
+            "name": "visa_name",
+            "type": "str",
+            "value": "ASRL3::INSTR",
+        },
+        line_params(),
+        status_params(),
+    ]
+
+    def ini_attributes(self):
+        self.controller: "SHRC203" = None
+
+    def commit_settings(self, param: Parameter):
+        """Apply the consequences of a change of value in the detector settings"""
+        if param.name() == "status_ttl":
+            self.controller.status_cache.ttl = param.value()
+
+    def ini_detector(self, controller=None):
+        """Detector communication initialization
+
+        Parameters
+        ----------
+        controller: (object)
+            custom object of a PyMoDAQ plugin (Slave case). None if only one actuator/detector by controller
+            (Master case)
+
+        Returns
+        -------
+        info: str
+        initialized: bool
+            False if initialization failed otherwise True
+        """
+        self.ini_detector_init(slave_controller=controller)
+        if self.is_master:
+            from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver as SHRC203
+            try:
+                self.controller = connections.acquire(SHRC203, self.settings["visa_name"],
+                                                      lambda driver: driver.open_connection(
+                                                          self.settings["line", "negotiate"]))
+            except Exception as e:
+                return f"Connection to {self.settings['visa_name']} failed: {e}", False
+            self.controller.set_mode()
+        else:
+            connections.retain(self.controller)
+        self.controller.status_cache.ttl = self.settings["status_ttl"]
+        self.settings.child("line", "baud_rate").setValue(self.controller._instr.baud_rate)
+        self.dte_signal_temp.emit(status_data("SHRC203", self.controller.get_status(), self.axis_names))
+        return "SHRC203 status viewer initialized", True
+
+    def close(self):
+        """Terminate the communication protocol"""
+        connections.release(self.controller)
+
+    def grab_data(self, Naverage=1, **kwargs):
+        """Read the positions and states of the three axes and send them as a DataToExport"""
+        self.dte_signal.emit(status_data("SHRC203", self.controller.get_status(), self.axis_names))
+
+    def stop(self):
+        return ""
+
+
+if __name__ == "__main__":
+    main(__file__)
@@ -1,13 +1,12 @@
 import importlib
 from pathlib import Path
-from ... import set_logger
-logger = set_logger('viewer1D_plugins', add_to_console=False)
 
-for path in Path(__file__).parent.iterdir():
-    try:
-        if '__init__' not in str(path):
-            importlib.import_module('.' + path.stem, __package__)
-    except Exception as e:
-        logger.warning("{:} plugin couldn't be loaded due to some missing packages or errors: {:}".format(path.stem, str(e)))
-        pass
+# PyMoDAQ lists the plugin modules found in the folder of path and imports them one by one: they are not imported
+# here, but on first access as attributes of the package
+path = Path(__file__)
 
+
+def __getattr__(name):
+    if path.with_name(f'{name}.py').is_file():
+        return importlib.import_module(f'.{name}', __package__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,224 @@
+"""
+Asyncio layer on top of the OptoSigma VISA drivers.
+
+Each driver keeps its blocking API. An AsyncDriver runs the driver calls of one controller in a dedicated worker
+thread (the serial line only carries one command at a time anyway) and waits for the end of the motions with
+asyncio.sleep, so that a single event loop can drive several controllers and axes at once.
+
+Example:
+    loop = EventLoopThread()
+    xy = AsyncDriver(GSC('ASRL4::INSTR'))
+    z = AsyncDriver(SHRC203VISADriver('ASRL3::INSTR'))
+    loop.run(asyncio.gather(xy.move(1000, 1), xy.move(2000, 2), z.move(10, 1)))
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pymodaq.utils.logger import set_logger, get_module_name
+
+logger = set_logger(get_module_name(__file__))
+
+
+class AsyncTransport:
+    """Serialize the blocking calls made to one controller in a single worker thread."""
+
+    def __init__(self, name=''):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'optosigma-{name}')
+
+    async def run(self, func, *args):
+        """Run func(*args) in the worker thread and return its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class AsyncDriver:
+    """Awaitable interface to one of the OptoSigma VISA drivers.
+
+    The wrapped driver must implement start_move, start_move_relative, start_home, read_state, is_ready, stop,
+    expected_duration and hold a PollingStrategy in its polling attribute.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.transport = AsyncTransport(driver.rsrc_name)
+        self._axis_locks = {}
+
+    def _axis_lock(self, channel):
+        if channel not in self._axis_locks:
+            self._axis_locks[channel] = asyncio.Lock()
+        return self._axis_locks[channel]
+
+    async def read_state(self, channel):
+        """Read the state of the specified channel. R: Ready, B: Busy"""
+        return await self.transport.run(self.driver.read_state, channel)
+
+    async def is_ready(self, channel):
+        return await self.transport.run(self.driver.is_ready, channel)
+
+    async def wait_for_ready(self, channel, expected=None, timeout=None):
+        """Wait for the specified channel to stop moving without blocking the event loop.
+
+        The status is polled following the PollingStrategy of the driver. With the virtual clock of a simulated
+        controller, the waiting advances the clock instead of sleeping.
+
+        Returns
+        -------
+        bool: False if the timeout has been reached
+        """
+        if not await self._wait(lambda: self.driver.is_ready(channel), expected, timeout):
+            logger.error(f"Timeout while waiting for channel {channel} of {self.driver.rsrc_name}")
+            return False
+        return True
+
+    async def _wait(self, is_ready, expected=None, timeout=None):
+        polling = self.driver.polling
+        clock = polling.clock
+        timeout = polling.timeout(expected) if timeout is None else timeout
+        time0 = clock.time()
+        interval = None
+        while not await self.transport.run(is_ready):
+            elapsed = clock.time() - time0
+            if elapsed >= timeout:
+                return False
+            interval = polling.next_interval(elapsed, expected, interval)
+            if clock is time:
+                await asyncio.sleep(min(interval, timeout - elapsed))
+            else:
+                clock.sleep(min(interval, timeout - elapsed))
+                await asyncio.sleep(0)
+        return True
+
+    async def move(self, position, channel):
+        """Move the specified channel to the absolute position."""
+        async with self._axis_lock(channel):
+            expected = self.driver.expected_duration(position - self.driver.position[channel - 1], channel)
+            await self.transport.run(self.driver.start_move, position, channel)
+            await self.wait_for_ready(channel, expected)
+            self.driver.position[channel - 1] = position
+
+    async def move_axes(self, positions: dict):
+        """Move several channels of the controller at once, positions being a dict {channel: position}.
+        Only for the drivers implementing start_move_axes and axes_ready."""
+        locks = [self._axis_lock(channel) for channel in sorted(positions)]
+        for lock in locks:
+            await lock.acquire()
+        try:
+            durations = [self.driver.expected_duration(position - self.driver.position[channel - 1], channel)
+                         for channel, position in positions.items()]
+            await self.transport.run(self.driver.start_move_axes, positions)
+            await self._wait(lambda: self.driver.axes_ready(list(positions)),
+                             None if None in durations else max(durations))
+            for channel, position in positions.items():
+                self.driver.position[channel - 1] = position
+        finally:
+            for lock in locks:
+                lock.release()
+
+    async def start_move_axes(self, positions: dict, barrier: threading.Barrier = None):
+        """Send the moves of several channels without waiting for their end, positions being a dict
+        {channel: position}. If a barrier is given, the commands are sent once all its parties reach it, for a
+        synchronised start of several controllers."""
+        def start():
+            if barrier is not None:
+                barrier.wait()
+            self.driver.start_move_axes(positions)
+        await self.transport.run(start)
+
+    async def wait_for_axes(self, channels, expected=None, timeout=None):
+        """Wait for the channels to stop moving, see wait_for_ready. Returns False if the timeout has been reached."""
+        channels = list(channels)
+        return await self._wait(lambda: self.driver.axes_ready(channels), expected, timeout)
+
+    async def move_relative(self, position, channel):
+        """Move the specified channel by the relative position."""
+        async with self._axis_lock(channel):
+            await self.transport.run(self.driver.start_move_relative, position, channel)
+            await self.wait_for_ready(channel, self.driver.expected_duration(position, channel))
+            self.driver.position[channel - 1] = self.driver.position[channel - 1] + position
+
+    async def home(self, channel):
+        """Move the specified channel to the home position."""
+        async with self._axis_lock(channel):
+            await self.transport.run(self.driver.start_home, channel)
+            await self.wait_for_ready(channel)
+            self.driver.position[channel - 1] = 0
+
+    async def stop(self, channel):
+        """Stop the specified channel."""
+        await self.transport.run(self.driver.stop, channel)
+
+    def close(self):
+        self.transport.close()
+
+
+class EventLoopThread:
+    """An asyncio event loop running in a background thread, to be used from synchronous (Qt) code."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='optosigma-asyncio', daemon=True)
+        self._thread.start()
+
+    def submit(self, coro):
+        """Schedule the coroutine in the loop and return a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Run the coroutine in the loop and block until it is done."""
+        return self.submit(coro).result(timeout)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+_default_loop = None
+_default_loop_lock = threading.Lock()
+
+
+def get_event_loop_thread():
+    """Return the event loop thread shared by all the SyncDriver of the process."""
+    global _default_loop
+    with _default_loop_lock:
+        if _default_loop is None:
+            _default_loop = EventLoopThread()
+    return _default_loop
+
+
+def run_concurrently(*coros, timeout=None):
+    """Run several coroutines at once in the shared event loop and block until they are all done."""
+    async def gather():
+        return await asyncio.gather(*coros)
+    return get_event_loop_thread().run(gather(), timeout)
+
+
+class SyncDriver:
+    """Thin blocking wrapper around an AsyncDriver, running it in the shared event loop."""
+
+    def __init__(self, driver, loop_thread: EventLoopThread = None):
+        self.async_driver = driver if isinstance(driver, AsyncDriver) else AsyncDriver(driver)
+        self.loop_thread = get_event_loop_thread() if loop_thread is None else loop_thread
+
+    def move(self, position, channel):
+        return self.loop_thread.run(self.async_driver.move(position, channel))
+
+    def move_relative(self, position, channel):
+        return self.loop_thread.run(self.async_driver.move_relative(position, channel))
+
+    def home(self, channel):
+        return self.loop_thread.run(self.async_driver.home(channel))
+
+    def read_state(self, channel):
+        return self.loop_thread.run(self.async_driver.read_state(channel))
+
+    def wait_for_ready(self, channel, expected=None, timeout=None):
+        return self.loop_thread.run(self.async_driver.wait_for_ready(channel, expected, timeout))
+
+    def stop(self, channel):
+        return self.loop_thread.run(self.async_driver.stop(channel))
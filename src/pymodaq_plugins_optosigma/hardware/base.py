@@ -0,0 +1,291 @@
+"""
+Plumbing shared by the OptoSigma drivers.
+
+OptoSigmaDriver holds the helpers wired around the serial line of a controller: the PipelinedTransport (transport),
+the adaptive polling (polling), the cached status (status), the command statistics (instrumentation), the
+motion-time models (motion), the state kept between the sessions (state), the health monitor (health) and the
+background position sampler (sampler), and the conversion of the positions into the unit the controller moves in
+(units). It implements the moves, the origin returns and the waits on top of them.
+A blocking move stopped from another thread (see the stop of the drivers) returns False instead of reaching its
+target, the positions of its channels following the controller through get_status once they are ready.
+
+A driver derives from it and only implements the protocol of its controller: the codec, the reading of the status
+(read_status, is_ready, axes_ready), of the errors (read_health, check_error) and the speed settings.
+"""
+from functools import partial
+
+from pymodaq.utils.logger import set_logger, get_module_name
+
+from pymodaq_plugins_optosigma.hardware.health import HealthMonitor
+from pymodaq_plugins_optosigma.hardware.instrumentation import Instrumentation
+from pymodaq_plugins_optosigma.hardware.line import open_line
+from pymodaq_plugins_optosigma.hardware.motion import MotionModels
+from pymodaq_plugins_optosigma.hardware.polling import MotionCancelled, PollingStrategy
+from pymodaq_plugins_optosigma.hardware.sampler import autostart_sampler, start_sampler
+from pymodaq_plugins_optosigma.hardware.simulator import is_simulated
+from pymodaq_plugins_optosigma.hardware.state import PersistedState
+from pymodaq_plugins_optosigma.hardware.status import StatusCache
+from pymodaq_plugins_optosigma.hardware.transport import PipelinedTransport
+from pymodaq_plugins_optosigma.hardware.units import UnitConverter, display_unit
+from pymodaq_plugins_optosigma.hardware.waypoints import run_waypoints
+
+logger = set_logger(get_module_name(__file__))
+
+
+class OptoSigmaDriver:
+    """Base class of the OptoSigma drivers, see the module docstring.
+
+    The subclasses set codec and position (one entry per axis) before calling __init__, and the class attributes:
+
+    Attributes:
+        model (str): Section of the line settings of the controller in the configuration ([line.<model>]).
+        n_axes (int): Number of axes of the controller.
+        triggers (tuple of str): Commands sent at once by the transport, the others being batched with them.
+        persisted_attributes (tuple of str): Attributes saved along the positions, see state.PersistedState.
+        wait_before_move (bool): Wait for a channel to be ready before sending it a motion command.
+        native_unit (str): Unit the controller moves in, see units.UnitConverter.
+    """
+
+    model = ''
+    n_axes = 2
+    triggers = ('G:', 'H:', 'L:')
+    persisted_attributes = ()
+    wait_before_move = False
+    native_unit = 'pulse'
+
+    def __init__(self, rsrc_name):
+        self.transport = None
+        self.rsrc_name = rsrc_name
+        persist = not is_simulated(rsrc_name)
+        self.polling = PollingStrategy()
+        self.status_cache = StatusCache(self.read_status)
+        self.instrumentation = Instrumentation()
+        self.motion = MotionModels(rsrc_name, self.speeds, persist=persist)
+        self.persisted = PersistedState(self, self.persisted_attributes, persist=persist)
+        self.health = HealthMonitor(rsrc_name, self.read_health)
+        self.sampler = None
+        self.units = UnitConverter(self.n_axes, self.native_unit, native=self.native_unit)
+        self._stop_times = {}
+
+    @property
+    def channels(self) -> list:
+        """Channels of all the axes of the controller."""
+        return list(range(1, self.n_axes + 1))
+
+    def open_transport(self, probe, negotiate=None, handshake=None):
+        """Open the serial line with the settings of the model (see line.open_line, probe being the query the
+        controller must answer after the handshake command if any) and attach the clock, the status cache, the
+        instrumentation and the sampler to it."""
+        try:
+            resource = open_line(self.rsrc_name, self.model, probe, self.codec.parse_status, negotiate, handshake)
+        except Exception as e:
+            logger.error(f"Error connecting to {self.rsrc_name}: {e}")
+            raise
+        self.transport = PipelinedTransport(resource, triggers=self.triggers)
+        self.polling.clock = self.transport.clock
+        self.motion.clock = self.transport.clock
+        self.health.clock = self.transport.clock
+        self.status_cache.attach(self.transport)
+        self.instrumentation.attach(self.transport, self.polling)
+        autostart_sampler(self)
+
+    def connect(self, negotiate=None):
+        """Open the connection, probing the baud rate at the first connection if negotiate (see line.open_line)."""
+        self.open_transport(self.codec.status(), negotiate)
+
+    def set_unit(self, unit, channel=None, resolution=None):
+        """Set the unit of the positions of the specified channel (of all of them if None) and its resolution in
+        pulses per um or per degree (see units.UnitConverter). Returns the unit to display."""
+        for axis in self.channels if channel is None else [channel]:
+            self.units.set_axis(axis, unit, resolution)
+        return display_unit(unit)
+
+    def speeds(self, channel):
+        """Speed settings (pulses/s, pulses/s, ms) of the specified channel, None if they cannot give the duration of
+        a move."""
+        return None
+
+    def expected_duration(self, distance, channel):
+        """Expected duration (s) of a move of the given distance from the motion model learned on the previous
+        moves, None if it cannot be predicted."""
+        return self.motion.estimate(channel, distance)
+
+    def get_position(self, channel):
+        """Position of the specified channel kept by the driver (last target, or position read once ready)."""
+        if self.position[channel - 1] is None:
+            return logger.error("Position is None")
+        return self.position[channel - 1]
+
+    def start_move(self, position, channel):
+        """Send the absolute move command without waiting for the end of the motion."""
+        self.motion.started(channel, position - self.position[channel - 1])
+        for command in self.codec.move_commands(channel, position):
+            self.transport.write(command)
+
+    def start_move_relative(self, position, channel):
+        """Send the relative move command without waiting for the end of the motion."""
+        self.motion.started(channel, position)
+        for command in self.codec.move_commands(channel, position, relative=True):
+            self.transport.write(command)
+
+    def move_axes_commands(self, positions: dict):
+        """Commands moving several channels to their absolute positions, positions being a dict
+        {channel: position}: the targets then a single drive command when the controller has one."""
+        return self.codec.move_axes(positions)
+
+    def start_move_axes(self, positions: dict):
+        """Start the absolute moves of several channels {channel: position} without waiting for their end."""
+        for channel, position in positions.items():
+            self.motion.started(channel, position - self.position[channel - 1])
+        for command in self.move_axes_commands(positions):
+            self.transport.write(command)
+
+    def run_waypoints(self, waypoints, channels, callback=None):
+        """Move the channels through the waypoints (N x len(channels) array), see waypoints.run_waypoints.
+        Returns the number of waypoints reached."""
+        return run_waypoints(self, waypoints, channels, callback)
+
+    def move(self, position, channel, wait=True):
+        """Move the channel to the absolute position. If wait is False, return as soon as the command is sent (see
+        is_ready). Returns False if the motion was stopped or has not ended in time."""
+        if self.wait_before_move:
+            self.wait_for_ready(channel)
+        expected = self.expected_duration(position - self.position[channel - 1], channel)
+        self.start_move(position, channel)
+        self.position[channel - 1] = position
+        return not wait or self.wait_for_ready(channel, expected)
+
+    def move_relative(self, position, channel, wait=True):
+        """Move the channel by position, see move."""
+        if self.wait_before_move:
+            self.wait_for_ready(channel)
+        self.start_move_relative(position, channel)
+        self.position[channel - 1] = self.position[channel - 1] + position
+        return not wait or self.wait_for_ready(channel, self.expected_duration(position, channel))
+
+    def move_axes(self, positions: dict):
+        """Move several channels at once to their absolute positions {channel: position} and wait for all of them.
+        Returns False if the motion was stopped or has not ended in time."""
+        channels = list(positions)
+        if self.wait_before_move:
+            self.wait_axes(channels)
+        durations = [self.expected_duration(position - self.position[channel - 1], channel)
+                     for channel, position in positions.items()]
+        self.start_move_axes(positions)
+        for channel, position in positions.items():
+            self.position[channel - 1] = position
+        return self.wait_axes(channels, None if None in durations else max(durations))
+
+    def start_home(self, channel):
+        """Send the origin return command without waiting for the end of the motion."""
+        self.transport.write(self.codec.home(channel))
+
+    def start_home_axes(self, channels):
+        """Send the origin returns of several channels at once without waiting for the end of the motions."""
+        for command in self.codec.home_axes(channels):
+            self.transport.write(command)
+
+    def home(self, channel):
+        """Move the channel to the home position and wait for it. Returns False if the motion was stopped or has not
+        ended in time."""
+        return self.home_axes([channel])
+
+    def home_axes(self, channels=None):
+        """Move several channels (all of them if None) to the home position at once and wait for all of them.
+        Returns False if the motion was stopped or has not ended in time."""
+        channels = self.channels if channels is None else list(channels)
+        if self.wait_before_move:
+            self.wait_axes(channels)
+        self.start_home_axes(channels)
+        for channel in channels:
+            self.position[channel - 1] = 0
+        homed = self.wait_axes(channels)
+        if homed:
+            for channel in channels:
+                self.persisted.homed(channel)
+        return homed
+
+    def wait_for_ready(self, channel=None, expected=None):
+        """Wait for the channel (all of them if None) to stop moving, see wait_axes."""
+        return self.wait_axes(self.channels if channel is None else [channel], expected)
+
+    def wait_axes(self, channels, expected=None):
+        """Wait for the channels to stop moving, expected being the expected duration of the motion (s), None if
+        unknown. Returns False on a timeout, the errors being checked, or if the wait is cancelled by a stop."""
+        ready = partial(self.is_ready, channels[0]) if len(channels) == 1 else partial(self.axes_ready, channels)
+        try:
+            if self.polling.wait(ready, expected, channels=channels):
+                return True
+        except MotionCancelled:
+            logger.info(f"Motion of the channels {channels} of {self.rsrc_name} stopped")
+            return False
+        logger.error(f"Timeout of the motion of the channels {channels} of {self.rsrc_name}")
+        for channel in channels:
+            self.check_error(channel)
+        return False
+
+    def stop(self, channel=None):
+        """Stop the channel (all of them if None). The stop command is written at once, ahead of the queued commands
+        and of a status poll in progress, and the waits of the channel are cancelled, a blocking move in another
+        thread returning False. Returns the time taken to write the stop command (s), without waiting for the
+        standstill (see wait_stopped)."""
+        channels = self.channels if channel is None else [channel]
+        time0 = self.transport.clock.time()
+        latency = self.transport.write_priority(self.codec.stop(channel))
+        self.polling.cancel(channels)
+        for stopped in channels:
+            self.motion.cancel(stopped)
+            self._stop_times[stopped] = time0
+        self.instrumentation.record_stop(latency)
+        return latency
+
+    def wait_stopped(self, channel=None):
+        """Wait for the channel stopped by stop (all of them if None) to be at a standstill. Returns the time from the
+        stop request to the standstill (s), kept in the command statistics, None on a timeout."""
+        channels = self.channels if channel is None else [channel]
+        now = self.transport.clock.time()
+        time0 = min(self._stop_times.pop(stopped, now) for stopped in channels)
+        if not self.wait_axes(channels):
+            return None
+        duration = self.transport.clock.time() - time0
+        self.instrumentation.record_standstill(duration)
+        return duration
+
+    def home_all(self):
+        """Move all the channels to the home position at once."""
+        self.home_axes()
+
+    def warm_start(self):
+        """Restore the state saved at the last closing if the controller reports the same positions (single status
+        query), see state.PersistedState. Returns the channels to be homed, none after a successful warm start."""
+        return self.persisted.warm_start(self.read_status())
+
+    def get_status(self):
+        """Return the status of all the channels, from the cache if it is recent enough."""
+        status = self.status_cache.get()
+        status.sync_positions(self.position)
+        self.motion.update_status(status)
+        return status
+
+    def read_position(self, channel):
+        """Return the position of the specified channel as read from the controller (cached status)."""
+        return self.get_status().position(channel)
+
+    def start_sampler(self, rate=None, capacity=None):
+        """Start reading the positions and states in the background at rate (samples/s) into the ring buffer of
+        self.sampler, see sampler.PositionSampler. The values of the [sampler] configuration are used if None."""
+        return start_sampler(self, rate, capacity)
+
+    def stop_sampler(self):
+        """Stop the background sampling, the samples being kept in self.sampler.buffer."""
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    def close(self):
+        """Close the connection, saving the motion models and the state of the controller."""
+        self.stop_sampler()
+        self.motion.save()
+        if self.transport is not None:
+            self.persisted.save()
+            self.transport.close()
+            self.transport = None
@@ -0,0 +1,304 @@
+"""
+Encoding of the commands and decoding of the replies of the OptoSigma controllers.
+
+Each dialect is a codec class building the command strings (A:, M:, G:, D:...) and parsing the replies into
+structured results, the malformed replies raising a ProtocolError instead of an IndexError or a wrong value further
+on. The regular expressions and the tables are compiled once at import. encode gives the bytes of a frame as sent
+on the serial line (the drivers hand the command strings to the PipelinedTransport, which joins them in a single
+transfer).
+
+The status of an SHRC-203 axis (SRQ:) is a bitfield given in hexadecimal, decoded by decode_shrc_status into the
+list of the conditions it reports.
+
+The cost of each encoder and parser can be measured with benchmarks/bench_codec.py.
+"""
+import re
+from collections import namedtuple
+
+
+class ProtocolError(ValueError):
+    """Raised when a reply of a controller does not follow the protocol."""
+
+
+def sign(value) -> str:
+    return '+' if value >= 0 else '-'
+
+
+def parse_position(field: str) -> float:
+    """Position field of a status reply, for instance '+    10000' or '-12.5'."""
+    try:
+        return float(field.replace(' ', ''))
+    except ValueError:
+        raise ProtocolError(f'Invalid position: {field!r}') from None
+
+
+def parse_q_reply(reply: str, n_axes: int):
+    """Split the reply to Q: into the positions of the n_axes axes and the three acknowledgements
+    (ACK1: command error X or K, ACK2: limit sensor, ACK3: B busy or R ready)."""
+    fields = reply.split(',')
+    if len(fields) != n_axes + 3:
+        raise ProtocolError(f'Invalid reply to Q: {reply!r}, {n_axes} positions and 3 acknowledgements expected')
+    positions = [parse_position(field) for field in fields[:n_axes]]
+    acks = [field.strip() for field in fields[n_axes:]]
+    if acks[2] not in ('B', 'R'):
+        raise ProtocolError(f'Invalid state in the reply to Q: {reply!r}')
+    return positions, acks
+
+
+def parse_states(reply: str, n_states=1):
+    """Ready flags of a reply to !: made of n_states B (busy) or R (ready) separated by commas."""
+    states = reply.split(',')
+    if len(states) != n_states or not all(state in ('B', 'R') for state in states):
+        raise ProtocolError(f'Invalid reply to !: {reply!r}')
+    return [state == 'R' for state in states]
+
+
+class HostCodec:
+    """Commands of the controllers speaking the OptoSigma HOST protocol (GSC-02C, RMC-102, SHRC-203).
+
+    Attributes:
+        unit (str): Unit letter of the moves (P: pulses, U: um...).
+        termination (str): End of each command on the line.
+    """
+
+    unit = ''
+    termination = '\r\n'
+
+    def move(self, channel, position, relative=False) -> str:
+        """Load an absolute (A:) or relative (M:) target, the motion starts with drive."""
+        return f"{'M' if relative else 'A'}:{channel}{sign(position)}{self.unit}{abs(position)}"
+
+    def drive(self) -> str:
+        return 'G:'
+
+    def move_commands(self, channel, position, relative=False) -> list:
+        """Target of a single channel then the drive command starting the motion."""
+        return [self.move(channel, position, relative), self.drive()]
+
+    def move_axes(self, positions: dict) -> list:
+        """Absolute targets of several channels {channel: position} then the single drive command."""
+        commands = [self.move(channel, position) for channel, position in positions.items()]
+        commands.append(self.drive())
+        return commands
+
+    def home(self, channel) -> str:
+        return f'H:{channel}'
+
+    def home_axes(self, channels) -> list:
+        """Origin return of several channels started at once: a single H:W if they are all the axes of the
+        controller, one H: per channel otherwise."""
+        channels = sorted(set(channels))
+        if channels == list(range(1, self.n_axes + 1)):
+            return [self.home('W')]
+        return [self.home(channel) for channel in channels]
+
+    def stop(self, channel=None) -> str:
+        return 'L:W' if channel is None else f'L:{channel}'
+
+    def status(self) -> str:
+        return 'Q:'
+
+    def ready(self, channel=None) -> str:
+        return '!:'
+
+    def encode(self, commands) -> bytes:
+        """Bytes of a transfer of one command (str) or several back-to-back."""
+        if isinstance(commands, str):
+            return (commands + self.termination).encode('ascii')
+        return (self.termination.join(commands) + self.termination).encode('ascii')
+
+
+class GSCCodec(HostCodec):
+    """GSC-02C: moves in pulses, a single ready state for both axes"""
+
+    unit = 'P'
+    n_axes = 2
+
+    def speed(self, channel, speed_ini, speed_fin, accel_t) -> str:
+        return f'D:{channel}S{speed_ini}F{speed_fin}R{accel_t}'
+
+    def parse_status(self, reply: str):
+        return parse_q_reply(reply, self.n_axes)
+
+    def parse_ready(self, reply: str) -> list:
+        return parse_states(reply) * self.n_axes
+
+
+class RMCCodec(HostCodec):
+    """RMC-102: moves in um, one ready state per axis, speed level from 1 to 8"""
+
+    unit = 'U'
+    n_axes = 2
+
+    def speed(self, channel, level) -> str:
+        return f'D:{channel}J{level}'
+
+    def parse_status(self, reply: str):
+        return parse_q_reply(reply, self.n_axes)
+
+    def parse_ready(self, reply: str) -> list:
+        return parse_states(reply, self.n_axes)
+
+
+SpeedSettings = namedtuple('SpeedSettings', ['speed_ini', 'speed_fin', 'accel_t'])
+
+
+class SHRC203Codec(HostCodec):
+    """SHRC-203: unit letter chosen by the driver, one ready state and one status bitfield per axis"""
+
+    n_axes = 3
+    speed_regex = re.compile(r'^S(\d+(?:\.\d*)?)F(\d+(?:\.\d*)?)R(\d+(?:\.\d*)?)$')
+
+    def __init__(self, unit='U'):
+        self.unit = unit
+
+    def speed(self, channel, speed_ini, speed_fin, accel_t) -> str:
+        return f'D:{channel},{speed_ini},{speed_fin},{accel_t}'
+
+    def speed_query(self, channel) -> str:
+        return f'?:D{channel}'
+
+    def parse_speed(self, reply: str) -> SpeedSettings:
+        """Reply to ?:D, for instance S500F5000R100."""
+        match = self.speed_regex.match(reply)
+        if match is None:
+            raise ProtocolError(f'Invalid reply to ?:D {reply!r}')
+        return SpeedSettings(*(int(value) if value.isdigit() else float(value) for value in match.groups()))
+
+    def loop(self, channel, loop) -> str:
+        return f'F:{channel}{loop}'
+
+    def ready(self, channel=None) -> str:
+        return f'!:{channel}S'
+
+    def status_request(self, channel) -> str:
+        return f'SRQ:{channel}S'
+
+    def parse_status(self, reply: str):
+        return parse_q_reply(reply, self.n_axes)
+
+    def parse_ready(self, reply: str) -> bool:
+        return parse_states(reply)[0]
+
+
+AxisReply = namedtuple('AxisReply', ['channel', 'position', 'error', 'ready'])
+
+
+class SBIS26Codec:
+    """SBIS26: every command is addressed to a stage (D,<channel>), the moves start without drive command"""
+
+    n_axes = 3
+    termination = '\r\n'
+    srq_regex = re.compile(r'^D,([1-3]),([+-]?\s*\d+(?:\.\d*)?),([A-Z]),([BR])$')
+
+    def move(self, channel, position, relative=False) -> str:
+        return f"{'M' if relative else 'A'}:D,{channel},{sign(position)}{abs(position)}"
+
+    def move_commands(self, channel, position, relative=False) -> list:
+        return [self.move(channel, position, relative)]
+
+    def move_axes(self, positions: dict) -> list:
+        return [self.move(channel, position) for channel, position in positions.items()]
+
+    def speed(self, channel, speed_ini, speed_fin, accel_t) -> str:
+        return f'D:D,{channel},{speed_ini},{speed_fin},{accel_t}'
+
+    def home(self, channel) -> str:
+        return f'H:D,{channel}'
+
+    def home_axes(self, channels) -> list:
+        return [self.home(channel) for channel in sorted(set(channels))]
+
+    def stop(self, channel=None) -> str:
+        return 'LE:A' if channel is None else f'L:D,{channel}'
+
+    def status(self, channel) -> str:
+        return f'SRQ:D,{channel}'
+
+    def parse_status(self, reply: str) -> AxisReply:
+        """Reply to SRQ:D,<channel>, for instance D,1,+1000,K,R."""
+        match = self.srq_regex.match(reply)
+        if match is None:
+            raise ProtocolError(f'Invalid reply to SRQ: {reply!r}')
+        channel, position, error, state = match.groups()
+        return AxisReply(int(channel), parse_position(position), error, state == 'R')
+
+    encode = HostCodec.encode
+
+
+# conditions reported by the bits of the SHRC-203 status (SRQ:), from bit 0, with their kind
+SHRC_STATUS_BITS = (
+    ('Normal (S1 to S10 and emergency stop has not occurred)', 'normal'),
+    ('Command error', 'error'),
+    ('Scale error (S1)', 'error'),
+    ('Disconnection error (S2)', 'error'),
+    ('Overflow error (S4)', 'error'),
+    ('Emergency stop', 'error'),
+    ('Hunting error (S3)', 'error'),
+    ('Limit error (S5)', 'error'),
+    ('Counter overflow (S6)', 'error'),
+    ('Auto config error', 'error'),
+    ('24V IO overload warning (W1)', 'warning'),
+    ('24V terminal block overload warning (W2)', 'warning'),
+    ('System error (S7)', 'error'),
+    ('Motor driver overheat warning (W3)', 'warning'),
+    ('Motor driver overheat error (S10)', 'error'),
+    ('Out of in-position range (after positioning is completed) (READY)', 'state'),
+    ('Out of in-position range (During positioning operation) (BUSY)', 'state'),
+    ('Logical origin return is in progress', 'state'),
+    ('Mechanical origin return is in progress', 'state'),
+    ('CW limit detection', 'state'),
+    ('CCW limit detection', 'state'),
+    ('CW software limit stop', 'state'),
+    ('CCW software limit stop', 'state'),
+    ('NEAR sensor detection', 'state'),
+    ('ORG sensor detection', 'state'),
+)
+_SHRC_MASKS = {kind: sum(1 << bit for bit, (_, bit_kind) in enumerate(SHRC_STATUS_BITS) if bit_kind == kind)
+               for kind in ('normal', 'error', 'warning', 'state')}
+
+
+class SHRCStatus:
+    """Decoded status bitfield of an SHRC-203 axis.
+
+    Attributes:
+        value (int): The bitfield.
+        flags (list of str): Conditions of the bits set, from bit 0.
+    """
+
+    def __init__(self, value: int):
+        self.value = value
+        self.flags = [message for bit, (message, _) in enumerate(SHRC_STATUS_BITS) if value >> bit & 1]
+
+    def _messages(self, kind):
+        return [message for bit, (message, bit_kind) in enumerate(SHRC_STATUS_BITS)
+                if bit_kind == kind and self.value >> bit & 1]
+
+    @property
+    def errors(self) -> list:
+        return self._messages('error')
+
+    @property
+    def warnings(self) -> list:
+        return self._messages('warning')
+
+    @property
+    def ok(self) -> bool:
+        """True if no error bit is set."""
+        return not self.value & _SHRC_MASKS['error']
+
+    @property
+    def message(self) -> str:
+        return '; '.join(self.flags) if self.flags else 'No status bit set'
+
+    def __repr__(self):
+        return f'SHRCStatus(0x{self.value:X}: {self.message})'
+
+
+def decode_shrc_status(reply: str) -> SHRCStatus:
+    """Decode the reply to SRQ:<channel>S, whose first field is the status bitfield in hexadecimal."""
+    field = reply.split(',')[0].strip()
+    try:
+        return SHRCStatus(int(field, 16))
+    except ValueError:
+        raise ProtocolError(f'Invalid reply to SRQ: {reply!r}') from None
@@ -0,0 +1,95 @@
+"""
+Process-wide registry of the connections to the OptoSigma controllers.
+
+All the DAQ_Move plugins (master or slave, one per axis) using the same visa_name share a single driver, hence a
+single open port, which is closed only when the last of them releases it.
+
+Example:
+    driver = acquire(GSC, 'ASRL4::INSTR')  # opens the port
+    same = acquire(GSC, 'ASRL4::INSTR')  # same driver, no new serial open
+    release(same)
+    release(driver)  # closes the port
+"""
+import threading
+
+from pymodaq.utils.logger import set_logger, get_module_name
+
+logger = set_logger(get_module_name(__file__))
+
+
+class Connection:
+    def __init__(self, driver):
+        self.driver = driver
+        self.users = 1
+
+
+_connections = {}
+_lock = threading.RLock()
+
+
+def _connect(driver):
+    if hasattr(driver, 'connect'):
+        driver.connect()
+    else:  # SHRC203VISADriver
+        driver.open_connection()
+
+
+def acquire(driver_class, rsrc_name: str, initialize=_connect):
+    """Return the driver connected to rsrc_name, creating and initializing it if no one uses it yet. If the
+    initialization fails, the new driver is closed and not registered, and the error is raised.
+
+    Args:
+        driver_class: Class of the driver, for instance GSC.
+        rsrc_name (str): VISA resource name (or simulated controller name).
+        initialize (callable): Called with the new driver to open its connection, driver.connect() by default.
+    """
+    with _lock:
+        connection = _connections.get(rsrc_name)
+        if connection is not None:
+            if not isinstance(connection.driver, driver_class):
+                raise ValueError(f'{rsrc_name} is already used by a {type(connection.driver).__name__} driver')
+            connection.users += 1
+            return connection.driver
+        driver = driver_class(rsrc_name)
+        try:
+            initialize(driver)
+        except Exception:
+            driver.close()
+            raise
+        _connections[rsrc_name] = Connection(driver)
+        logger.info(f'Connection opened to {rsrc_name}')
+        return driver
+
+
+def retain(driver):
+    """Register one more user of an already acquired driver (for instance a slave plugin)."""
+    with _lock:
+        connection = _connections.get(driver.rsrc_name)
+        if connection is None or connection.driver is not driver:
+            raise ValueError(f'No connection has been acquired for {driver.rsrc_name}')
+        connection.users += 1
+        return driver
+
+
+def release(driver):
+    """Release one use of the driver, closing its connection if it was the last one."""
+    if driver is None:
+        return
+    with _lock:
+        connection = _connections.get(driver.rsrc_name)
+        if connection is None or connection.driver is not driver:
+            logger.warning(f'{driver.rsrc_name} was not acquired from the registry, closing it directly')
+            driver.close()
+            return
+        connection.users -= 1
+        if connection.users == 0:
+            del _connections[driver.rsrc_name]
+            driver.close()
+            logger.info(f'Connection to {driver.rsrc_name} closed')
+
+
+def users(rsrc_name: str) -> int:
+    """Number of users of the connection to rsrc_name."""
+    with _lock:
+        connection = _connections.get(rsrc_name)
+        return 0 if connection is None else connection.users
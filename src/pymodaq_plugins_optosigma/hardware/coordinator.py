@@ -0,0 +1,229 @@
+"""
+Composite actuator made of the axes of several controllers on separate serial ports.
+
+Moving a GSC, a RMC-102 and a SHRC-203 one after the other takes the sum of their move times. The Coordinator
+drives them at once: the axes of each controller are grouped in a single multi-axis move, every controller gets
+its own worker thread (see async_transport), the commands are released together by a barrier (synchronised start)
+and the ends of the motions are awaited concurrently in the shared event loop, so that the composite move takes as
+long as the longest one. A single timeout applies to all the controllers and the outcome of every axis is gathered
+in a MoveReport.
+
+Example:
+    stage = Coordinator.open({'x': (GSC, 'ASRL4::INSTR', 1), 'y': (GSC, 'ASRL4::INSTR', 2),
+                              'focus': (RMCVISADriver, 'ASRL5::INSTR', 1),
+                              'theta': (SHRC203VISADriver, 'ASRL3::INSTR', 3)})
+    report = stage.move({'x': 1000, 'y': 2000, 'focus': 500, 'theta': 10})
+    stage.close()
+"""
+import asyncio
+import threading
+
+from pymodaq.utils.logger import set_logger, get_module_name
+
+from pymodaq_plugins_optosigma.hardware import connections
+from pymodaq_plugins_optosigma.hardware.async_transport import AsyncDriver, get_event_loop_thread
+
+logger = set_logger(get_module_name(__file__))
+
+
+class CoordinatedMoveError(Exception):
+    """Raised when some axes of a coordinated move failed, the MoveReport being in the report attribute."""
+
+    def __init__(self, report):
+        super().__init__(report.summary())
+        self.report = report
+
+
+class AxisResult:
+    """Outcome of the move of one axis of a Coordinator.
+
+    Attributes:
+        name (str): Name of the axis in the Coordinator.
+        target (float): Absolute target of the move.
+        duration (float): Time from the synchronised start to the end of the motion of its controller (s).
+        error (str or None): Why the target has not been reached, None if it has.
+    """
+
+    def __init__(self, name, target, duration=None, error=None):
+        self.name = name
+        self.target = target
+        self.duration = duration
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self):
+        return f'AxisResult({self.name!r}, target={self.target}, duration={self.duration}, error={self.error!r})'
+
+
+class MoveReport:
+    """Outcome of a coordinated move: an AxisResult per axis and the duration of the whole move (s)."""
+
+    def __init__(self, results: dict, duration: float, timeout: float):
+        self.results = results
+        self.duration = duration
+        self.timeout = timeout
+
+    @property
+    def ok(self) -> bool:
+        return all(result.ok for result in self.results.values())
+
+    @property
+    def errors(self) -> dict:
+        return {name: result.error for name, result in self.results.items() if not result.ok}
+
+    def summary(self) -> str:
+        if self.ok:
+            return f'{len(self.results)} axes reached their targets in {self.duration:.3f} s'
+        return 'Coordinated move failed: ' + ', '.join(f'{name}: {error}' for name, error in self.errors.items())
+
+
+class Coordinator:
+    """Composite actuator driving axes of several controllers concurrently.
+
+    Args:
+        axes (dict): {name: (driver, channel)}, the drivers being connected OptoSigma drivers. Several axes may
+            belong to the same driver.
+        timeout (float or None): Timeout shared by all the controllers (s). None to take the longest of the
+            timeouts of their polling strategies for the expected durations of the moves.
+        loop_thread (EventLoopThread): Event loop running the moves, the shared one by default.
+    """
+
+    start_timeout = 5.
+
+    def __init__(self, axes: dict, timeout=None, loop_thread=None):
+        self.axes = dict(axes)
+        self.timeout = timeout
+        self.loop_thread = get_event_loop_thread() if loop_thread is None else loop_thread
+        self._async_drivers = {}
+        for driver, _ in self.axes.values():
+            if id(driver) not in self._async_drivers:
+                self._async_drivers[id(driver)] = AsyncDriver(driver)
+        self._acquired = []
+
+    @classmethod
+    def open(cls, axes: dict, timeout=None, loop_thread=None):
+        """Create a Coordinator from {name: (driver_class, rsrc_name, channel)}, the drivers being acquired from
+        the connection registry, hence shared with the DAQ_Move plugins using the same ports."""
+        drivers = {}
+        try:
+            for driver_class, rsrc_name, _ in axes.values():
+                if rsrc_name not in drivers:
+                    drivers[rsrc_name] = connections.acquire(driver_class, rsrc_name)
+        except Exception:
+            for driver in drivers.values():
+                connections.release(driver)
+            raise
+        coordinator = cls({name: (drivers[rsrc_name], channel) for name, (_, rsrc_name, channel) in axes.items()},
+                          timeout, loop_thread)
+        coordinator._acquired = list(drivers.values())
+        return coordinator
+
+    def positions(self) -> dict:
+        """Last known position of every axis, {name: position}."""
+        return {name: driver.position[channel - 1] for name, (driver, channel) in self.axes.items()}
+
+    def _groups(self, targets: dict) -> list:
+        """Group the targets by controller: list of (driver, {channel: position}, {channel: name})."""
+        groups = {}
+        for name, position in targets.items():
+            if name not in self.axes:
+                raise KeyError(f'Unknown axis {name}, the axes are {list(self.axes)}')
+            driver, channel = self.axes[name]
+            _, positions, names = groups.setdefault(id(driver), (driver, {}, {}))
+            positions[channel] = position
+            names[channel] = name
+        return list(groups.values())
+
+    def _shared_timeout(self, groups) -> float:
+        if self.timeout is not None:
+            return self.timeout
+        timeouts = []
+        for driver, positions, _ in groups:
+            durations = [driver.expected_duration(position - driver.position[channel - 1], channel)
+                         for channel, position in positions.items()]
+            timeouts.append(driver.polling.timeout(None if None in durations else max(durations)))
+        return max(timeouts)
+
+    async def _move_group(self, driver, positions, names, barrier, timeout, results):
+        async_driver = self._async_drivers[id(driver)]
+        clock = driver.polling.clock
+        durations = [driver.expected_duration(position - driver.position[channel - 1], channel)
+                     for channel, position in positions.items()]
+        try:
+            await async_driver.start_move_axes(positions, barrier)
+            time0 = clock.time()
+            ready = await async_driver.wait_for_axes(positions, None if None in durations else max(durations),
+                                                     timeout)
+            duration = clock.time() - time0
+        except threading.BrokenBarrierError:
+            error = f'not started, the other controllers did not start within {self.start_timeout} s'
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        else:
+            if ready:
+                for channel, position in positions.items():
+                    driver.position[channel - 1] = position
+                error = None
+            else:
+                error = f'timeout after {timeout:.3f} s'
+                for channel in positions:
+                    await async_driver.stop(channel)
+            for channel, position in positions.items():
+                results[names[channel]] = AxisResult(names[channel], position, duration, error)
+            return duration
+        for channel, position in positions.items():
+            results[names[channel]] = AxisResult(names[channel], position, None, error)
+        return None
+
+    async def _move(self, groups, timeout, results):
+        barrier = threading.Barrier(len(groups), timeout=self.start_timeout)
+        durations = await asyncio.gather(*[self._move_group(driver, positions, names, barrier, timeout, results)
+                                           for driver, positions, names in groups])
+        return max([duration for duration in durations if duration is not None], default=0.)
+
+    def move(self, targets: dict, relative=False, raise_errors=True) -> MoveReport:
+        """Move the axes to their targets at once and wait for all of them.
+
+        Args:
+            targets (dict): {name: position} in the unit of each controller, the other axes do not move.
+            relative (bool): Whether the targets are displacements from the current positions.
+            raise_errors (bool): Raise a CoordinatedMoveError if any axis failed, otherwise only log the report.
+        Returns (MoveReport): Outcome of every axis.
+        """
+        if relative:
+            targets = {name: self.axes[name][0].position[self.axes[name][1] - 1] + value
+                       for name, value in targets.items()}
+        groups = self._groups(targets)
+        if not groups:
+            return MoveReport({}, 0., 0.)
+        timeout = self._shared_timeout(groups)
+        results = {}
+        duration = self.loop_thread.run(self._move(groups, timeout, results))
+        report = MoveReport({name: results[name] for name in targets}, duration, timeout)
+        if not report.ok:
+            logger.error(report.summary())
+            if raise_errors:
+                raise CoordinatedMoveError(report)
+        return report
+
+    def move_rel(self, targets: dict, raise_errors=True) -> MoveReport:
+        """Move the axes by the given displacements, see move."""
+        return self.move(targets, relative=True, raise_errors=raise_errors)
+
+    def stop(self):
+        """Stop all the axes."""
+        async def stop_all():
+            await asyncio.gather(*[self._async_drivers[id(driver)].stop(channel)
+                                   for driver, channel in self.axes.values()], return_exceptions=True)
+        self.loop_thread.run(stop_all())
+
+    def close(self):
+        """Stop the worker threads and release the drivers acquired by open."""
+        for async_driver in self._async_drivers.values():
+            async_driver.close()
+        for driver in self._acquired:
+            connections.release(driver)
+        self._acquired = []
@@ -0,0 +1,191 @@
+"""
+Continuous (fly) scans with timestamped position capture.
+
+A line scan made of steps pays a start, an acceleration, a deceleration and a settling at every point. A fly scan
+sweeps the range in a single move at constant velocity instead: the axis first goes back by the run-up distance
+needed to reach the velocity, then moves through the range to the same distance beyond it, while a background
+thread reads the positions of the controller (Q: query) and stores them with their time in a preallocated NumPy
+buffer. The positions at the times of the detector frames are then obtained by interpolation.
+
+The times are those of the clock of the driver (time.time() for a real controller, the virtual clock of a simulated
+one), each sample being dated at the middle of its query.
+
+Example:
+    scan = driver.fly_scan(0, 20000, velocity=2000, channel=1, rate=200)
+    while not scan.done:
+        frames.append((time.time(), camera.grab()))
+    scan.wait()
+    positions = scan.interpolate([frame_time for frame_time, _ in frames])
+"""
+import math
+import threading
+
+import numpy as np
+
+from pymodaq.utils.logger import set_logger, get_module_name
+
+from pymodaq_plugins_optosigma.hardware.polling import MotionCancelled, trapezoid_duration
+
+logger = set_logger(get_module_name(__file__))
+
+
+def run_up_distance(velocity, speed_ini, accel_t):
+    """Distance (whole pulses) travelled while accelerating from speed_ini to velocity (pulses/s) in accel_t (ms)."""
+    speed_ini = min(speed_ini, velocity)
+    return math.ceil((speed_ini + velocity) / 2 * accel_t / 1000)
+
+
+class FlyScan:
+    """Sweep of one axis at constant velocity with the capture of its positions, see the module docstring.
+
+    Args:
+        driver: GSC or SHRC203VISADriver, connected.
+        channel (int): Axis swept.
+        start (float): First position of the range, in the unit of the controller.
+        stop (float): Last position of the range.
+        velocity (float): Speed through the range (pulses/s).
+        rate (float): Position samples per second.
+        run_up (float or None): Distance added before and after the range (unit of the controller), computed
+            from the acceleration settings of the axis if None and its unit is the pulse, 0 otherwise.
+        margin (float): Capacity of the buffer as a multiple of the expected number of samples.
+
+    Attributes:
+        buffer (ndarray): (capacity, 2) preallocated array of (time, position) rows, the count first being valid.
+        count (int): Number of samples captured.
+
+    Raises:
+        ValueError: If the speed settings of the axis have never been set (they are restored after the sweep).
+    """
+
+    def __init__(self, driver, channel, start, stop, velocity, rate=100., run_up=None, margin=1.5):
+        if velocity <= 0 or rate <= 0:
+            raise ValueError('The velocity and the sampling rate must be positive')
+        self.driver = driver
+        self.channel = channel
+        self.start = start
+        self.stop = stop
+        self.velocity = velocity
+        self.interval = 1 / rate
+        self.transport = driver.status_cache.transport
+        self.clock = driver.polling.clock
+        self.speeds = (driver.speed_ini[channel - 1], driver.speed_fin[channel - 1], driver.accel_t[channel - 1])
+        if not all(speed is not None and speed > 0 for speed in self.speeds):
+            raise ValueError(f'The speed settings of axis {channel} are not set: {self.speeds}')
+        self.sweep_speeds = (min(self.speeds[0], velocity), velocity, self.speeds[2])
+        if run_up is None:
+            run_up = 0. if driver.speeds(channel) is None else run_up_distance(velocity, self.speeds[0],
+                                                                                 self.speeds[2])
+        direction = 1 if stop >= start else -1
+        self.origin = start - direction * run_up
+        self.target = stop + direction * run_up
+        # duration of the sweep, rough if the unit is not the pulse, sizing the buffer and the timeout
+        self.expected = trapezoid_duration(self.target - self.origin, *self.sweep_speeds)
+        if self.expected is None:
+            self.expected = abs(self.target - self.origin) / velocity
+        capacity = max(int(math.ceil(margin * self.expected * rate)), 16)
+        self.buffer = np.empty((capacity, 2))
+        self.count = 0
+        self.completed = False
+        self._abort = threading.Event()
+        self._thread = None
+
+    def run(self):
+        """Go to the beginning of the run-up, set the velocity and start the sweep with the sampling thread.
+        Returns immediately, see wait. Raises ValueError if the driver refused the speed of the sweep. The sweep is not
+        started if the move to the beginning of the run-up is stopped (see abort)."""
+        if not self.driver.move(self.origin, self.channel):
+            logger.info(f'Fly scan of axis {self.channel} stopped before the sweep')
+            self._abort.set()
+            return self
+        self.driver.set_speed(*self.sweep_speeds, self.channel)
+        index = self.channel - 1
+        # the drivers only record the speed settings they have sent
+        sent = self.driver.speed_ini[index], self.driver.speed_fin[index], self.driver.accel_t[index]
+        if sent != self.sweep_speeds:
+            raise ValueError(f'The speed of the sweep {self.sweep_speeds} was not sent to the controller')
+        self._thread = threading.Thread(target=self._sample, name=f'optosigma-flyscan-{self.driver.rsrc_name}',
+                                        daemon=True)
+        self.driver.start_move(self.target, self.channel)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        index = self.channel - 1
+        codec = self.driver.codec
+        next_time = self.clock.time()
+        ready = False
+        try:
+            while not ready and not self._abort.is_set():
+                time0 = self.clock.time()
+                positions, acks = codec.parse_status(self.transport.query(codec.status()))
+                time1 = self.clock.time()
+                ready = acks[2] == 'R'
+                if self.count < len(self.buffer):
+                    self.buffer[self.count] = (time0 + time1) / 2, positions[index]
+                    self.count += 1
+                elif not ready:
+                    logger.warning(f'Fly scan buffer full after {self.count} samples')
+                    break
+                next_time += self.interval
+                delay = next_time - self.clock.time()
+                if delay > 0:
+                    self.clock.sleep(delay)
+                else:
+                    next_time = self.clock.time()
+            self.completed = ready and not self._abort.is_set()
+            if self.completed:
+                self.driver.position[index] = self.target
+            else:
+                if not ready:
+                    try:
+                        self.driver.polling.wait(lambda: self.driver.is_ready(self.channel), self.expected)
+                    except MotionCancelled:  # stopped by abort
+                        pass
+                positions, _ = codec.parse_status(self.transport.query(codec.status()))
+                self.driver.position[index] = positions[index]
+            self.driver.set_speed(*self.speeds, self.channel)
+        except Exception as e:
+            self.completed = False
+            logger.error(f'Fly scan sampling stopped: {e}')
+
+    @property
+    def done(self) -> bool:
+        if self._thread is None:
+            return self._abort.is_set()
+        return not self._thread.is_alive()
+
+    def wait(self, timeout=None) -> bool:
+        """Wait for the end of the sweep, returns True if the axis reached the end of the run-out."""
+        if self._thread is not None:
+            self._thread.join(self.driver.polling.timeout(self.expected) if timeout is None else timeout)
+        return bool(self.completed)
+
+    def abort(self):
+        """Stop the axis and the sampling."""
+        self._abort.set()
+        self.driver.stop(self.channel)
+
+    @property
+    def times(self) -> np.ndarray:
+        """Times of the samples captured so far (view on the buffer)."""
+        return self.buffer[:self.count, 0]
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Positions of the samples captured so far (view on the buffer)."""
+        return self.buffer[:self.count, 1]
+
+    @property
+    def data(self) -> np.ndarray:
+        """(count, 2) view of the (time, position) samples captured so far."""
+        return self.buffer[:self.count]
+
+    def interpolate(self, times) -> np.ndarray:
+        """Positions of the axis at the given times (clock of the driver), linearly interpolated between the
+        samples, the first and last samples being used outside of them."""
+        return np.interp(times, self.times, self.positions)
+
+
+def fly_scan(driver, start, stop, velocity, channel, rate=100., run_up=None) -> FlyScan:
+    """Start a fly scan of the channel of the driver over [start, stop] at velocity and return its FlyScan."""
+    return FlyScan(driver, channel, start, stop, velocity, rate, run_up).run()
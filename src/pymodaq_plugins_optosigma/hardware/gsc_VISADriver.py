@@ -1,6 +1,9 @@
-import pyvisa
-import time
 import logging
+from pymodaq_plugins_optosigma.hardware.base import OptoSigmaDriver
+from pymodaq_plugins_optosigma.hardware.codec import GSCCodec
+from pymodaq_plugins_optosigma.hardware.flyscan import fly_scan
+from pymodaq_plugins_optosigma.hardware.health import Condition, summary
+from pymodaq_plugins_optosigma.hardware.status import StatusSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +15,7 @@ class AxisError(Exception):
         "X": "Command or parameter errors",
         "K": "Normal state",
         "L": "First-axis stopped at LS",
+        "M": "Second-axis stopped at LS",
         "W": "First and second axes stopped at LS",
     }
 
@@ -19,94 +23,55 @@ class AxisError(Exception):
         self.message = self.MESSAGES[error_code]
 
 
-class GSC:
+class GSC(OptoSigmaDriver):
     default_units = ' '
+    model = 'GSC'
+    persisted_attributes = ('speed_ini', 'speed_fin', 'accel_t')
 
     def __init__(self, rsrc_name):
-        self._actuator = None
-        self.rsrc_name = rsrc_name
+        self.codec = GSCCodec()
         self.position = [0, 0] 
         self.speed_ini = [0, 0]
         self.speed_fin = [0, 0]
         self.accel_t = [0, 0]
-        
-
-    def connect(self):
-        try:
-            rm = pyvisa.ResourceManager()
-            self._actuator = rm.open_resource(self.rsrc_name)
-            self._actuator.write_termination = "\r\n"
-            self._actuator.read_termination = "\r\n"
-            self._actuator.baud_rate = 9600
-            logger.info(f"Connection to {self._actuator} successful")
-        except Exception as e:
-            logger.error(f"Error connecting to {self.rsrc_name}: {e}")
-        
-#### Below are methods based on updating the GUI units 
-    def convert_units(self, units, value, coeff):
-        """Convert value based on the units. Coefficient is taken through the GUI"""
-        if units == " " or units == "pulse":
-            return value
-        elif units == "um":
-            return value*(coeff) 
-    
-    def set_unit(self, unit): 
-        """Set the unit pulse based on the GUI needed"""
-        if unit == "pulse": 
-            return " "
-        else: 
-            return unit
-    def get_unit_position(self, unit, channel): 
-        """Gets the actuator position based on the unit."""
-        if unit == 'um': 
-            self.position[channel-1] = (self.position[channel-1])/2 
-        else: 
-            pass
-### End of the block of code that updates the unit of GUI
-    def move(self, position, channel):
-        """Move the specified channel to the position."""
-
-        print(position, "pulses in move method")
-
-        if position >= 0:
-            self._actuator.write(f"A:{channel}+P{position}")
-        else:
-            self._actuator.write(f"A:{channel}-P{abs(position)}")
-        self._actuator.write("G:")
-        self.wait_for_ready()
-        
-        self.position[channel - 1] = position
-
-    def move_rel(self, position, channel):
-        """Move the specified channel to the relative position."""
-        if position >= 0:
-            self._actuator.write(f"M:{channel}+P{position}")
-        else:
-            self._actuator.write(f"M:{channel}-P{abs(position)}")
-        self._actuator.write("G:")
-        self.wait_for_ready()
-        self.position[channel - 1] = position + self.position[channel - 1]
-
-    def stop(self, channel):
-        """Stop the specified channel."""
-        self._actuator.write(f"L:{channel}")
-
-    def get_position(self, channel):
-        """Get the position of the specified channel."""
-        if self.position[channel - 1] is None:
-            return logger.error("Position is None")
-        return self.position[channel - 1]
-
-    def home(self, channel):
-        """Move the specified channel to the home position."""
-        self._actuator.write(f"H:{channel}")
-        self.wait_for_ready()
-        self.position[channel - 1] = 0
+        super().__init__(rsrc_name)
+
+    @property
+    def _actuator(self):
+        """Transport of the serial line, see base.OptoSigmaDriver."""
+        return self.transport
+
+    @_actuator.setter
+    def _actuator(self, transport):
+        self.transport = transport
+
+    def connect(self, negotiate=None):
+        """Open the connection, probing the baud rate at the first connection if negotiate (see line.open_line)."""
+        super().connect(negotiate)
+        logger.info(f"Connection to {self.transport} successful")
+
+    def move_rel(self, position, channel, wait=True):
+        """Move the specified channel to the relative position, see move_relative."""
+        return self.move_relative(position, channel, wait)
+
+    def fly_scan(self, start, stop, velocity, channel, rate=100., run_up=None):
+        """Sweep the channel over [start, stop] at constant velocity (pulses/s) while its positions are sampled at
+        rate in the background, see flyscan.FlyScan. Returns the running FlyScan."""
+        return fly_scan(self, start, stop, velocity, channel, rate, run_up)
+
+    def restore(self, state):
+        """Send again the speed settings of a saved state (see state.PersistedState) to the controller, skipping the
+        channels whose speed was never set."""
+        speeds = zip(state.get('speed_ini', []), state.get('speed_fin', []), state.get('accel_t', []))
+        for channel, (speed_ini, speed_fin, accel_t) in enumerate(speeds, start=1):
+            if speed_fin > 0:
+                self.set_speed(speed_ini, speed_fin, accel_t, channel)
 
     def set_speed(self, speed_ini, speed_fin, accel_t, channel):
         """Set the speed of the specified channel"""
         if speed_ini >= 0 and speed_fin >= 0 and accel_t >= 0:
-            self._actuator.write(f"D:{channel}S{speed_ini}F{speed_fin}R{accel_t}")
+            self.transport.write(self.codec.speed(channel, speed_ini, speed_fin, accel_t))
+            self.transport.flush()
             self.speed_ini[channel - 1] = speed_ini
             self.speed_fin[channel - 1] = speed_fin
             self.accel_t[channel - 1] = accel_t
@@ -119,28 +84,44 @@ class GSC:
             return logger.error("Speed is None")
         return self.speed[channel - 1]
 
-    def close(self):
-        pyvisa.ResourceManager().close()
-
-    def check_error(self):
-        """Checks for the errors and returns the error message."""
-        error = self._actuator.query("Q:")
-        error = error.split(",")[2]
-        if error != "K":
-            logger.error(f"Error: {error}")
-            AxisError(error)
-
-    def read_state(self):
-        """Read the state of the specified channel."""
-        state = self._actuator.query(f"!:") 
+    def read_health(self, channel=None):
+        """Error conditions of the controller: command error (first acknowledgement of Q:) and limit sensor stops
+        (second acknowledgement). The GSC reports them for both axes, the channel is only there to match the other
+        drivers."""
+        _, acks = self.codec.parse_status(self.transport.query(self.codec.status()))
+        return [Condition("error", ack, AxisError.MESSAGES.get(ack, f"Error code {ack}"))
+                for ack in acks[:2] if ack != "K"]
+
+    def check_error(self, channel=None):
+        """Checks for the errors (at most once every health.min_interval) and returns the error message.
+        The GSC reports the errors of both axes, the channel is only there to match the other drivers."""
+        conditions = self.health.check()
+        if conditions:
+            logger.error(f"Error: {summary(conditions)}")
+        return summary(conditions)
+
+    def read_state(self, channel=None):
+        """Read the state of the specified channel.
+        The GSC reports a single state for both axes, the channel is only there to match the other drivers."""
+        state = self.transport.query(self.codec.ready(channel))
         return state
 
-    def wait_for_ready(self):
-        time0 = time.time()
-        while self.read_state() != "R":
-            time1 = time.time() - time0
-            if time1 >= 60:
-                logger.error("Timeout error")
-                self.check_error()
-                break
-            time.sleep(0.2)
\ No newline at end of file
+    def is_ready(self, channel=None):
+        """Return True if the controller is not moving."""
+        ready = self.read_state(channel) == "R"
+        for axis in (1, 2):
+            self.motion.update(axis, ready)
+        return ready
+
+    def axes_ready(self, channels):
+        """Return True if the controller is not moving, the state being common to both channels."""
+        return self.is_ready()
+
+    def read_status(self):
+        """Read the positions of both channels and the state of the controller with a single Q: query."""
+        positions, acks = self.codec.parse_status(self.transport.query(self.codec.status()))
+        return StatusSnapshot(positions, [acks[2] == "R"] * 2, acks[0])
+
+    def speeds(self, channel):
+        """Speed settings (pulses/s, pulses/s, ms) of the specified channel."""
+        return self.speed_ini[channel - 1], self.speed_fin[channel - 1], self.accel_t[channel - 1]
@@ -0,0 +1,155 @@
+"""
+Health monitoring of the OptoSigma controllers.
+
+Each driver reads the error and warning conditions of an axis (or of the whole controller) with read_health(channel),
+decoding all the error and warning codes of its protocol (SRQ: bitfield of the SHRC-203, error field of the SBIS26,
+acknowledgements of the Q: reply of the GSC and RMC). The HealthMonitor of the driver calls it:
+
+* at most once every min_interval per channel, a check made sooner returning the conditions found last, so that a
+  plugin checking after each move does not load the serial line,
+* with a bounded number of attempts, retry_delay apart, when the reply is invalid or missing; after that the channel
+  is reported as not replying and its next reads are spaced out (doubling up to max_interval), so that a faulty axis
+  does not hold the connection used by the others.
+
+Changes of the conditions (appearing or cleared) are published as HealthEvent to the subscribers, for instance the
+DAQ_Move plugins which show them in their status bar, and kept in a bounded history.
+"""
+import threading
+import time
+from collections import deque, namedtuple
+
+from pymodaq_plugins_optosigma import config
+
+# one error or warning reported by a controller: severity is 'error' or 'warning', code the raw value of the protocol
+Condition = namedtuple('Condition', ['severity', 'code', 'message'])
+
+
+class HealthEvent:
+    """A condition of a controller axis which appeared (or was cleared, severity 'info').
+
+    Attributes:
+        source (str): visa_name of the controller.
+        channel (int or None): Axis concerned, None for the whole controller.
+        severity (str): 'error', 'warning' or 'info'.
+        code (str): Code of the condition in the protocol of the controller.
+        message (str): Description of the condition.
+        time (float): Time of the check (clock of the driver).
+    """
+
+    def __init__(self, source, channel, severity, code, message, time=0.):
+        self.source = source
+        self.channel = channel
+        self.severity = severity
+        self.code = code
+        self.message = message
+        self.time = time
+
+    def as_dict(self) -> dict:
+        return dict(source=self.source, channel=self.channel, severity=self.severity, code=self.code,
+                    message=self.message, time=self.time)
+
+    def __str__(self):
+        where = self.source if self.channel is None else f'{self.source} axis {self.channel}'
+        return f'{self.severity.capitalize()} on {where}: {self.message}'
+
+    def __repr__(self):
+        return f'HealthEvent({self.as_dict()})'
+
+
+class HealthMonitor:
+    """Rate-limited and bounded checks of the health of a controller, see the module docstring.
+
+    Args:
+        source (str): visa_name of the controller.
+        read (callable): read(channel) returns the list of the Condition of the channel, empty if healthy, and
+            raises if the reply is missing or invalid.
+        min_interval (float): Shortest time between two reads of a channel (s).
+        max_interval (float): Longest time between two reads of a channel which does not reply (s).
+        retries (int): Attempts of a read before reporting the channel as not replying.
+        retry_delay (float): Time between two attempts (s).
+        history (int): Number of events kept in the events attribute.
+    The values of the [health] section of the configuration are used for the arguments left to None.
+    """
+
+    def __init__(self, source, read, min_interval=None, max_interval=None, retries=None, retry_delay=None,
+                 history=100):
+        self.source = source
+        self.read = read
+        self.min_interval = config('health', 'min_interval') if min_interval is None else min_interval
+        self.max_interval = config('health', 'max_interval') if max_interval is None else max_interval
+        self.retries = max(config('health', 'retries') if retries is None else retries, 1)
+        self.retry_delay = config('health', 'retry_delay') if retry_delay is None else retry_delay
+        self.clock = time
+        self.events = deque(maxlen=history)
+        self.reads = 0
+        self._listeners = []
+        self._last_read = {}
+        self._failures = {}
+        self._conditions = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback):
+        """Call callback(event) for every HealthEvent, from the thread making the check."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def interval(self, channel) -> float:
+        """Time between two reads of the channel, growing while it does not reply."""
+        return min(self.min_interval * 2 ** self._failures.get(channel, 0), max(self.max_interval,
+                                                                                 self.min_interval))
+
+    def conditions(self, channel=None) -> list:
+        """Conditions found by the last check of the channel."""
+        return list(self._conditions.get(channel, ()))
+
+    def check(self, channel=None, force=False) -> list:
+        """Return the conditions of the channel (None for the whole controller), reading them from the controller
+        unless they have been read less than interval(channel) ago and force is False."""
+        with self._lock:
+            now = self.clock.time()
+            last = self._last_read.get(channel)
+            if not force and last is not None and now - last < self.interval(channel):
+                return self.conditions(channel)
+            conditions = self._read(channel)
+            self._last_read[channel] = now
+            events = self._update(channel, conditions)
+        for event in events:
+            for callback in list(self._listeners):
+                callback(event)
+        return list(conditions)
+
+    def _read(self, channel):
+        error = None
+        for attempt in range(self.retries):
+            if attempt:
+                self.clock.sleep(self.retry_delay)
+            self.reads += 1
+            try:
+                conditions = tuple(self.read(channel))
+            except Exception as e:
+                error = e
+                continue
+            self._failures[channel] = 0
+            return conditions
+        self._failures[channel] = self._failures.get(channel, 0) + 1
+        return Condition('error', 'no_reply', f'No valid status after {self.retries} attempts ({error})'),
+
+    def _update(self, channel, conditions):
+        previous = self._conditions.get(channel, ())
+        self._conditions[channel] = conditions
+        now = self.clock.time()
+        events = [HealthEvent(self.source, channel, condition.severity, condition.code, condition.message, now)
+                  for condition in conditions if condition not in previous]
+        events += [HealthEvent(self.source, channel, 'info', condition.code, f'{condition.message} cleared', now)
+                   for condition in previous if condition not in conditions]
+        self.events.extend(events)
+        return events
+
+
+def summary(conditions) -> str:
+    """One line description of a list of conditions, 'Normal' if empty."""
+    return '; '.join(condition.message for condition in conditions) if conditions else 'Normal'
@@ -0,0 +1,187 @@
+"""
+Opt-in timing statistics of the communication with a controller.
+
+When enabled, the PipelinedTransport of a driver reports every transfer and every reply, and its PollingStrategy every
+wait for the end of a motion, to an Instrumentation object which keeps, per command (A:, G:, Q:, !:, SRQ:...):
+
+* the number of commands, the bytes sent and received,
+* a histogram of the latencies: duration of the transfer for the commands without reply, time between the sending of
+  the query and the reading of its reply (round trip) for the others,
+
+and for the waits: the number of status polls per motion and the total time spent waiting and sleeping, and for the
+stops: the time taken to write the stop command (stop latency) and to get the axis at a standstill.
+
+When disabled, the transport and the polling hold None instead of the Instrumentation object, so the cost is a single
+test per transfer.
+
+Example:
+    driver.instrumentation.enable()
+    driver.move(1000, 1)
+    print(driver.instrumentation.report())
+"""
+import time
+
+import numpy as np
+
+
+def command_key(command: str) -> str:
+    """Key under which the statistics of a command are gathered: its header, for instance A: for A:1+P100."""
+    if ':' in command:
+        return command.split(':', 1)[0] + ':'
+    return command
+
+
+class LatencyHistogram:
+    """Histogram of durations on logarithmic bins (8 per decade from 10 us to 100 s)."""
+
+    edges = np.logspace(-5, 2, 57)
+
+    def __init__(self):
+        self.counts = np.zeros(len(self.edges) + 1, dtype=int)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def add(self, duration: float):
+        self.counts[np.searchsorted(self.edges, duration)] += 1
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.
+
+    def percentile(self, percent: float) -> float:
+        """Upper edge of the bin containing the given percentile (s)."""
+        if not self.count:
+            return 0.
+        index = int(np.searchsorted(np.cumsum(self.counts), percent / 100 * self.count))
+        return float(min(self.edges[min(index, len(self.edges) - 1)], self.max))
+
+    def as_dict(self) -> dict:
+        return dict(count=self.count, mean=self.mean, p50=self.percentile(50), p95=self.percentile(95), max=self.max)
+
+
+class CommandStats:
+    def __init__(self):
+        self.count = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = LatencyHistogram()
+
+
+class Instrumentation:
+    """Timing statistics of the transport and the polling of one driver, see the module docstring."""
+
+    def __init__(self):
+        self.enabled = False
+        self.transport = None
+        self.polling = None
+        self.timer = time.perf_counter
+        self.reset()
+
+    def reset(self):
+        self.commands = {}
+        self.transfers = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.polls = 0
+        self.max_polls = 0
+        self.wait_time = 0.
+        self.sleep_time = 0.
+        self.stop_latency = LatencyHistogram()
+        self.stop_duration = LatencyHistogram()
+
+    def attach(self, transport, polling):
+        """Follow the transport and the polling strategy of a driver (called when the driver connects)."""
+        self.transport = transport
+        self.polling = polling
+        self.timer = time.perf_counter if transport.clock is time else transport.clock.time
+        self.enable(self.enabled)
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+        hook = self if enabled else None
+        for target in (self.transport, self.polling):
+            if target is not None:
+                target.instrumentation = hook
+
+    def _stats(self, command) -> CommandStats:
+        key = command_key(command)
+        if key not in self.commands:
+            self.commands[key] = CommandStats()
+        return self.commands[key]
+
+    def record_transfer(self, commands, termination: str, duration: float, queries=()):
+        """A transfer of the commands (each followed by termination), lasting duration.
+        The latency of the commands without reply (not in queries) is the duration of the transfer."""
+        self.transfers += 1
+        queries = list(queries)
+        for command in commands:
+            stats = self._stats(command)
+            stats.count += 1
+            stats.bytes_sent += len(command) + len(termination)
+            if command in queries:
+                queries.remove(command)
+            else:
+                stats.latency.add(duration)
+
+    def record_reply(self, command: str, nbytes: int, round_trip: float):
+        """The reply of nbytes to the query command, read round_trip seconds after it was sent."""
+        stats = self._stats(command)
+        stats.bytes_received += nbytes
+        stats.latency.add(round_trip)
+
+    def record_wait(self, iterations: int, duration: float, slept: float, ready: bool):
+        """A wait for the end of a motion polling the status iterations times."""
+        self.waits += 1
+        self.timeouts += not ready
+        self.polls += iterations
+        self.max_polls = max(self.max_polls, iterations)
+        self.wait_time += duration
+        self.sleep_time += slept
+
+    def record_stop(self, latency: float):
+        """A stop whose command was written latency seconds after the request. Ignored when disabled."""
+        if self.enabled:
+            self.stop_latency.add(latency)
+
+    def record_standstill(self, duration: float):
+        """A stopped axis at a standstill duration seconds after the stop request. Ignored when disabled."""
+        if self.enabled:
+            self.stop_duration.add(duration)
+
+    def summary(self) -> dict:
+        """Statistics as a dict: totals, the waits, and the latencies (s) per command."""
+        return dict(
+            commands=sum(stats.count for stats in self.commands.values()),
+            transfers=self.transfers,
+            bytes_sent=sum(stats.bytes_sent for stats in self.commands.values()),
+            bytes_received=sum(stats.bytes_received for stats in self.commands.values()),
+            waits=self.waits,
+            timeouts=self.timeouts,
+            polls=self.polls,
+            polls_per_wait=self.polls / self.waits if self.waits else 0.,
+            max_polls=self.max_polls,
+            wait_time=self.wait_time,
+            sleep_time=self.sleep_time,
+            stop_latency=self.stop_latency.as_dict(),
+            stop_duration=self.stop_duration.as_dict(),
+            latency={key: dict(stats.latency.as_dict(), bytes_sent=stats.bytes_sent,
+                               bytes_received=stats.bytes_received)
+                     for key, stats in sorted(self.commands.items())},
+        )
+
+    def report(self) -> str:
+        """Latencies per command as text, one line per command."""
+        lines = []
+        for key, stats in sorted(self.commands.items()):
+            latency = stats.latency
+            lines.append(f'{key:<9} n={stats.count:<6} mean={latency.mean * 1000:.2f} ms '
+                         f'p95={latency.percentile(95) * 1000:.2f} ms max={latency.max * 1000:.2f} ms')
+        if self.stop_latency.count:
+            stops = self.stop_latency
+            lines.append(f'{"stops":<9} n={stops.count:<6} mean={stops.mean * 1000:.2f} ms '
+                         f'p95={stops.percentile(95) * 1000:.2f} ms max={stops.max * 1000:.2f} ms')
+        return '\n'.join(lines)
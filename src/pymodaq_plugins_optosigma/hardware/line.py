@@ -0,0 +1,139 @@
+"""
+Serial line settings of the OptoSigma controllers and baud rate auto-negotiation.
+
+The settings of each model (baud rates supported, default baud rate, data bits, parity, stop bits) are read from the
+[line.<model>] sections of the plugin configuration file, so that all the drivers open their port the same way.
+
+The baud rate of a controller is set on the controller itself. When the negotiation is enabled, the first
+connection to a visa_name probes the supported rates from the fastest one, and keeps the first rate at which the
+controller answers a status query correctly several times in a row. The result is stored in the [line.baud_rates]
+section of the configuration file, which is only saved when the rate found is a new one, and reused by the next
+connections without probing again.
+
+A controller whose communication must be opened first (#CONNECT for the SBIS26) is given the handshake command: it
+is sent before the status queries at each probed rate, and once on the line otherwise.
+
+Example:
+    resource = open_line('ASRL4::INSTR', 'SHRC203', 'Q:', SHRC203Codec().parse_status, negotiate=True)
+"""
+import pyvisa
+
+from pymodaq.utils.logger import set_logger, get_module_name
+
+from pymodaq_plugins_optosigma import config
+from pymodaq_plugins_optosigma.hardware.transport import open_resource
+
+logger = set_logger(get_module_name(__file__))
+
+STOP_BITS = {1: pyvisa.constants.StopBits.one, 1.5: pyvisa.constants.StopBits.one_and_a_half,
+             2: pyvisa.constants.StopBits.two}
+
+
+def line_settings(model: str) -> dict:
+    """Line settings of a controller model (SHRC203, GSC, RMC or SBIS26) from the configuration file."""
+    return dict(config('line', model))
+
+
+def apply_line_settings(resource, model: str, baud_rate=None):
+    """Set the serial attributes of resource for the model, at baud_rate if given."""
+    settings = line_settings(model)
+    resource.baud_rate = settings['baud_rate'] if baud_rate is None else baud_rate
+    resource.data_bits = settings['data_bits']
+    resource.parity = pyvisa.constants.Parity[settings['parity']]
+    resource.stop_bits = STOP_BITS[settings['stop_bits']]
+    resource.write_termination = '\r\n'
+    resource.read_termination = '\r\n'
+
+
+def stored_baud_rate(rsrc_name: str):
+    """Baud rate negotiated for rsrc_name, None if it has never been."""
+    return config('line', 'baud_rates').get(rsrc_name)
+
+
+def store_baud_rate(rsrc_name: str, baud_rate: int) -> bool:
+    """Store the rate negotiated for rsrc_name in the configuration file, which is only saved if the rate is a new
+    one. Returns True if the file has been saved."""
+    if stored_baud_rate(rsrc_name) == baud_rate:
+        return False
+    config['line', 'baud_rates', rsrc_name] = baud_rate
+    config.save()
+    logger.info(f'Baud rate {baud_rate} of {rsrc_name} saved in {config.config_path}')
+    return True
+
+
+def _discard_input(resource):
+    """Drop the characters received at a wrong rate, if the resource allows it."""
+    if hasattr(resource, 'flush'):
+        try:
+            resource.flush(pyvisa.constants.BufferOperation.discard_read_buffer_no_io)
+        except Exception:
+            pass
+
+
+def probe(resource, command: str, parse, attempts=3, handshake=None) -> bool:
+    """True if the reply to command is accepted by parse (no exception) attempts times in a row, after the reply to
+    the handshake command if any."""
+    if handshake is not None:
+        try:
+            resource.write(handshake)
+            resource.read()
+        except Exception:
+            _discard_input(resource)
+            return False
+    for _ in range(attempts):
+        try:
+            resource.write(command)
+            parse(resource.read())
+        except Exception:
+            _discard_input(resource)
+            return False
+    return True
+
+
+def negotiate_baud_rate(resource, model: str, command: str, parse, attempts=3, timeout=200, handshake=None):
+    """Return the fastest supported rate at which the controller answers command reliably, None if none.
+
+    Args:
+        resource: Opened pyvisa resource (or simulated controller), left at the rate found.
+        model (str): Controller model, whose supported rates are probed from the fastest.
+        command (str): Status query sent to probe a rate.
+        parse (callable): Parser of the reply, raising an exception if it is invalid.
+        attempts (int): Number of correct replies in a row needed to accept a rate.
+        timeout (int): Timeout of the reads during the probe (ms).
+        handshake (str): Command opening the communication, sent before command at each rate.
+    """
+    initial_timeout = resource.timeout
+    resource.timeout = timeout
+    try:
+        for baud_rate in sorted(line_settings(model)['baud_rates'], reverse=True):
+            resource.baud_rate = baud_rate
+            if probe(resource, command, parse, attempts, handshake):
+                logger.info(f'{model} answers at {baud_rate} baud')
+                return baud_rate
+    finally:
+        resource.timeout = initial_timeout
+    return None
+
+
+def open_line(rsrc_name: str, model: str, command: str, parse, negotiate=None, handshake=None):
+    """Open rsrc_name with the line settings of the model.
+
+    The baud rate is the one stored for rsrc_name if any, otherwise the one negotiated (if negotiate, by default the
+    negotiate entry of the configuration file) which is then stored, otherwise the default rate of the model.
+    command and parse are the status query and its parser used to probe the rates (see negotiate_baud_rate).
+    handshake is the command opening the communication, if the controller needs one, whose reply is read.
+    """
+    resource = open_resource(rsrc_name)
+    baud_rate = stored_baud_rate(rsrc_name)
+    apply_line_settings(resource, model, baud_rate)
+    if baud_rate is None and (config('line', 'negotiate') if negotiate is None else negotiate):
+        baud_rate = negotiate_baud_rate(resource, model, command, parse, handshake=handshake)
+        if baud_rate is not None:
+            store_baud_rate(rsrc_name, baud_rate)
+            return resource
+        logger.warning(f'{rsrc_name} does not answer at any of the {model} baud rates, using the default one')
+        apply_line_settings(resource, model)
+    if handshake is not None:
+        resource.write(handshake)
+        resource.read()
+    return resource
@@ -0,0 +1,176 @@
+"""
+Motion-time model of the axes of a controller, learning from the observed moves.
+
+The duration of a move of one axis is modelled as offset + gain * base, where base is:
+
+* the duration of the trapezoidal speed profile given by the speed settings of the axis ('trapezoid' model), the
+  offset then accounting for the command latency and the settling time, and the gain for the actual speeds,
+* the distance when the speed settings cannot give a duration (speed level of the RMC, SHRC-203 in a length unit),
+  the gain being then the inverse of an average speed ('distance' model).
+
+offset and gain are fitted by recursive least squares with a forgetting factor on the durations measured by the
+driver: a move starts when its command is sent (started) and ends between the last status read busy and the first
+read ready (update), so its measured duration is the middle of that interval. Moves whose end is not bracketed (axis
+found ready at the first status read) are not used.
+
+The learned parameters are kept in the [motion.models] section of the configuration file, loaded at the connection
+and saved at the closing of the driver (not for the simulated controllers, whose state does not outlive the process).
+"""
+import time
+
+import numpy as np
+
+from pymodaq_plugins_optosigma import config
+from pymodaq_plugins_optosigma.hardware.polling import trapezoid_duration
+
+
+class AxisModel:
+    """Duration of the moves of one axis, offset + gain * base, see the module docstring.
+
+    Args:
+        offset (float): Fixed time of a move (s).
+        gain (float): Duration per unit of base.
+        covariance (2x2 array): Uncertainty of (offset, gain), the larger the faster they follow the observations.
+        count (int): Number of moves observed.
+    """
+
+    forgetting = 0.98
+
+    def __init__(self, offset=0., gain=1., covariance=((1., 0.), (0., 1.)), count=0):
+        self.theta = np.array([offset, gain], dtype=float)
+        self.covariance = np.array(covariance, dtype=float)
+        self.count = count
+
+    @property
+    def offset(self) -> float:
+        return float(self.theta[0])
+
+    @property
+    def gain(self) -> float:
+        return float(self.theta[1])
+
+    def estimate(self, base: float) -> float:
+        return max(self.offset + self.gain * base, 0.)
+
+    def observe(self, base: float, duration: float):
+        """Refine offset and gain from a move of the given base which lasted duration (recursive least squares)."""
+        x = np.array([1., base])
+        px = self.covariance @ x
+        k = px / (self.forgetting + x @ px)
+        self.theta = self.theta + k * (duration - x @ self.theta)
+        self.covariance = (self.covariance - np.outer(k, px)) / self.forgetting
+        self.count += 1
+
+    def to_dict(self) -> dict:
+        return dict(offset=self.offset, gain=self.gain, covariance=self.covariance.tolist(), count=self.count)
+
+    @classmethod
+    def from_dict(cls, values: dict):
+        return cls(**values)
+
+
+def new_model(kind: str) -> AxisModel:
+    if kind == 'trapezoid':
+        return AxisModel()
+    # unknown average speed: the gain follows the first observation
+    return AxisModel(gain=0., covariance=((1e-2, 0.), (0., 1.)))
+
+
+class MotionModels:
+    """Motion-time models of the axes of a controller, with the tracking of the moves in progress.
+
+    Args:
+        name (str): Key of the models in the configuration file, the visa_name of the controller.
+        speeds (callable): Returns the speed settings (speed_ini, speed_fin, accel_t) of a channel, or None if they
+            cannot give the duration of a move.
+        persist (bool): Whether the models are loaded from and saved to the configuration file.
+
+    The clock attribute (time module or virtual clock of a simulator) dates the moves.
+    """
+
+    def __init__(self, name: str, speeds=None, persist=True):
+        self.name = name
+        self.speeds = (lambda channel: None) if speeds is None else speeds
+        self.persist = persist
+        self.clock = time
+        self.models = {}
+        self._moves = {}
+        if persist:
+            self.load()
+
+    @staticmethod
+    def base(distance, speeds=None):
+        """Base of the model of a move and its kind: ('trapezoid', duration) if speeds (speed_ini, speed_fin,
+        accel_t in pulses/s and ms) give a duration, ('distance', |distance|) otherwise."""
+        if speeds is not None:
+            duration = trapezoid_duration(distance, *speeds)
+            if duration is not None:
+                return 'trapezoid', duration
+        return 'distance', abs(distance)
+
+    def model(self, channel, kind) -> AxisModel:
+        if (channel, kind) not in self.models:
+            self.models[(channel, kind)] = new_model(kind)
+        return self.models[(channel, kind)]
+
+    def estimate(self, channel, distance):
+        """Expected duration (s) of a move of the channel, None if it cannot be predicted yet."""
+        if distance == 0:
+            return 0.
+        kind, base = self.base(distance, self.speeds(channel))
+        model = self.model(channel, kind)
+        if kind == 'distance' and model.count == 0:
+            return None
+        return model.estimate(base)
+
+    def started(self, channel, distance):
+        """A move of the channel over distance has just been commanded."""
+        if distance != 0:
+            self._moves[channel] = dict(base=self.base(distance, self.speeds(channel)), start=self.clock.time(),
+                                        busy=None)
+
+    def update(self, channel, ready: bool, read_time=None):
+        """The status of the channel has been read at read_time (now by default), the move in progress is observed
+        when it ends."""
+        move = self._moves.get(channel)
+        if move is None:
+            return
+        read_time = self.clock.time() if read_time is None else read_time
+        if read_time <= move['start']:
+            return
+        if not ready:
+            move['busy'] = read_time
+            return
+        del self._moves[channel]
+        if move['busy'] is not None:
+            kind, base = move['base']
+            self.model(channel, kind).observe(base, (move['busy'] + read_time) / 2 - move['start'])
+
+    def update_status(self, status):
+        """Update all the channels from a StatusSnapshot."""
+        for index, ready in enumerate(status.ready):
+            self.update(index + 1, ready, status.time)
+
+    def cancel(self, channel=None):
+        """Forget the moves in progress (of all the channels if None), for instance after a stop."""
+        if channel is None:
+            self._moves.clear()
+        else:
+            self._moves.pop(channel, None)
+
+    def to_dict(self) -> dict:
+        models = {}
+        for (channel, kind), model in self.models.items():
+            if model.count:
+                models.setdefault(str(channel), {})[kind] = model.to_dict()
+        return models
+
+    def load(self):
+        stored = config('motion', 'models').get(self.name, {})
+        self.models = {(int(channel), kind): AxisModel.from_dict(values)
+                       for channel, kinds in stored.items() for kind, values in kinds.items()}
+
+    def save(self):
+        if self.persist and self.to_dict():
+            config['motion', 'models', self.name] = self.to_dict()
+            config.save()
@@ -0,0 +1,182 @@
+"""
+Move-aware status polling shared by the OptoSigma drivers.
+
+Instead of polling the controller every 0.2 s during 60 s, the waiting loop uses the expected duration of the motion
+(when the driver can compute it from the distance and the speed settings): it sleeps for half of the remaining
+expected time during long travels, polls fast around the expected end, and backs off exponentially when the duration
+is unknown or has been overrun. The timeout follows the expected duration too.
+
+A wait can be cancelled from another thread (cancel, called by the stop of the drivers): it returns within the
+sleep in progress, on the real clock, instead of at its next status poll, and raises MotionCancelled.
+
+When an Instrumentation is attached, every wait reports its number of status polls and the time spent.
+"""
+import math
+import threading
+import time
+
+
+def trapezoid_duration(distance, speed_ini, speed_fin, accel_t):
+    """Duration (s) of a trapezoidal speed profile.
+
+    Args:
+        distance (float): Travel in pulses.
+        speed_ini (float): Starting speed in pulses/s.
+        speed_fin (float): Maximum speed in pulses/s.
+        accel_t (float): Acceleration (and deceleration) time in ms.
+    Returns (float or None): None if the speed settings are unknown or invalid.
+    """
+    distance = abs(distance)
+    if distance == 0:
+        return 0.
+    try:
+        speed_ini, speed_fin, accel_t = float(speed_ini), float(speed_fin), float(accel_t) / 1000
+    except (TypeError, ValueError):
+        return None
+    if speed_fin <= 0 or speed_ini < 0 or accel_t < 0:
+        return None
+    speed_ini = min(speed_ini, speed_fin)
+    if accel_t == 0 or speed_fin == speed_ini:
+        return distance / speed_fin
+    ramps_distance = (speed_ini + speed_fin) * accel_t
+    if distance >= ramps_distance:
+        return 2 * accel_t + (distance - ramps_distance) / speed_fin
+    # triangular profile: the maximum speed is never reached
+    accel = (speed_fin - speed_ini) / accel_t
+    speed_peak = math.sqrt(speed_ini ** 2 + accel * distance)
+    return 2 * (speed_peak - speed_ini) / accel
+
+
+class MotionCancelled(Exception):
+    """Raised by PollingStrategy.wait when the wait is cancelled, the motion having been stopped"""
+
+
+class _Wait:
+    def __init__(self, channels):
+        self.channels = None if channels is None else set(channels)
+        self.cancelled = False
+
+    def concerns(self, channels) -> bool:
+        return self.channels is None or channels is None or not self.channels.isdisjoint(channels)
+
+
+class PollingStrategy:
+    """Adaptive polling of the ready state of a controller.
+
+    Attributes:
+        min_interval (float): Shortest time between two status queries (s).
+        max_interval (float): Longest time between two status queries (s).
+        backoff (float): Growth factor of the interval when the end of the motion is not predictable.
+        timeout_factor (float): The timeout is timeout_factor * expected duration + timeout_margin.
+        timeout_margin (float): See timeout_factor (s).
+        default_timeout (float): Timeout used when the expected duration is unknown (s).
+        clock: Object with time() and sleep() methods, the time module or the virtual clock of a simulator.
+    """
+
+    def __init__(self, min_interval=0.01, max_interval=0.5, backoff=1.5, timeout_factor=3., timeout_margin=2.,
+                 default_timeout=60.):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout_factor = timeout_factor
+        self.timeout_margin = timeout_margin
+        self.default_timeout = default_timeout
+        self.clock = time
+        self.instrumentation = None
+        self._waits = []
+        self._wakeup = threading.Condition()
+
+    def update(self, **kwargs):
+        """Update the attributes from keyword arguments, unknown keys are ignored."""
+        for key, value in kwargs.items():
+            if hasattr(self, key):
+                setattr(self, key, value)
+
+    def timeout(self, expected=None):
+        """Timeout (s) of a motion whose expected duration is given (None if unknown)."""
+        if expected is None:
+            return self.default_timeout
+        return self.timeout_factor * expected + self.timeout_margin
+
+    def next_interval(self, elapsed, expected=None, previous=None):
+        """Time to sleep before the next status query.
+
+        Args:
+            elapsed (float): Time since the motion started (s).
+            expected (float or None): Expected duration of the motion (s).
+            previous (float or None): Previous interval, None at the first iteration.
+        """
+        if expected is not None and elapsed < expected:
+            interval = (expected - elapsed) / 2
+        elif previous is None:
+            interval = self.min_interval
+        else:
+            interval = previous * self.backoff
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def wait(self, is_ready, expected=None, clock=None, channels=None):
+        """Poll is_ready until it returns True or the timeout is reached.
+
+        Args:
+            is_ready (callable): Returns True when the motion is over.
+            expected (float or None): Expected duration of the motion (s).
+            clock: Object with time() and sleep() methods, the clock attribute by default.
+            channels (list or None): Channels of the motion, None for all of them, see cancel.
+        Returns (bool): False if the timeout has been reached.
+        Raises MotionCancelled if the wait is cancelled.
+        """
+        clock = self.clock if clock is None else clock
+        timeout = self.timeout(expected)
+        time0 = clock.time()
+        interval = None
+        polls = 1
+        slept = 0.
+        wait = _Wait(channels)
+        with self._wakeup:
+            self._waits.append(wait)
+        try:
+            while True:
+                # checked before and after each poll: a motion stopped while its status was being read is
+                # cancelled even if it reads as ready
+                ready = not wait.cancelled and is_ready()
+                if wait.cancelled:
+                    self._record(polls, clock.time() - time0, slept, True)
+                    raise MotionCancelled('Wait cancelled by a stop')
+                if ready:
+                    break
+                elapsed = clock.time() - time0
+                if elapsed >= timeout:
+                    self._record(polls, clock.time() - time0, slept, False)
+                    return False
+                interval = self.next_interval(elapsed, expected, interval)
+                sleep = min(interval, timeout - elapsed)
+                self._sleep(wait, sleep, clock)
+                slept += sleep
+                polls += 1
+        finally:
+            with self._wakeup:
+                self._waits.remove(wait)
+        self._record(polls, clock.time() - time0, slept, True)
+        return True
+
+    def _sleep(self, wait, duration, clock):
+        """Sleep for duration, returning early on the real clock if the wait is cancelled."""
+        if clock is time:
+            with self._wakeup:
+                self._wakeup.wait_for(lambda: wait.cancelled, duration)
+        else:
+            clock.sleep(duration)
+
+    def cancel(self, channels=None):
+        """Cancel the waits in progress on the channels (all of them if None): they raise MotionCancelled without
+        polling the controller again. Returns the number of waits cancelled."""
+        with self._wakeup:
+            cancelled = [wait for wait in self._waits if wait.concerns(channels)]
+            for wait in cancelled:
+                wait.cancelled = True
+            self._wakeup.notify_all()
+        return len(cancelled)
+
+    def _record(self, polls, duration, slept, ready):
+        if self.instrumentation is not None:
+            self.instrumentation.record_wait(polls, duration, slept, ready)
@@ -0,0 +1,201 @@
+"""
+Recording and replay of the serial sessions of the OptoSigma controllers.
+
+A RecordingResource wraps the pyvisa resource of a controller and writes every transfer to a file: its direction
+(w: written by the host, r: read from the controller, x: read failed), its time since the opening and its
+characters. The file is a JSON header line followed by one JSON line [time, direction, text] per transfer, gzipped
+if its name ends with .gz. When the recording directory of the [recording] section of the configuration file is set,
+every connection to a controller is recorded there.
+
+A recording is played back by opening the address REPLAY::<path of the file>[::speed=fast] instead of the address of
+the controller: the drivers run against a ReplayResource which checks that they write exactly what was written
+during the recording (ReplayError otherwise) and returns the recorded replies, either at the times they were read
+(speed=original, the default) or as fast as possible (speed=fast, the drivers then run on a virtual clock following
+the recorded times). A scan captured once on the setup can thus be run again offline to check that a change of the
+drivers still sends the same commands, and to measure the time the drivers take on their own. The drivers must be set
+as during the recording (speeds, polling, status cache...) for the commands to be the same.
+
+Example:
+    driver = GSC('REPLAY::scan.rec.gz::speed=fast')
+    driver.connect()
+    ...  # same calls as during the recording
+    assert driver._actuator.resource.done
+"""
+import gzip
+import json
+import os
+import re
+import threading
+import time
+
+from pymodaq_plugins_optosigma import config
+from pymodaq_plugins_optosigma.hardware.simulator import REPLAY_PREFIX, VirtualClock
+
+FORMAT = 1
+
+
+class ReplayError(Exception):
+    """Raised when a driver does not write what was written during the recording"""
+
+
+class ReplayedReadError(IOError):
+    """Raised when replaying a read which failed during the recording"""
+
+
+def _open(path, mode):
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='ascii')
+    return open(path, mode, encoding='ascii')
+
+
+class RecordingResource:
+    """pyvisa resource (or simulated controller) recording its transfers to a file, see the module docstring.
+
+    Attributes not defined here (baud_rate, timeout, clock...) are those of the wrapped resource.
+
+    Args:
+        resource: Opened pyvisa resource or simulated controller.
+        path (str): File written, replaced if it exists.
+        rsrc_name (str): Address of the resource, kept in the header.
+    """
+
+    _own = ('resource', 'path', 'transfers', '_file', '_clock', '_time0', '_lock')
+
+    def __init__(self, resource, path, rsrc_name=''):
+        self.resource = resource
+        self.path = path
+        self.transfers = 0
+        self._clock = getattr(resource, 'clock', time)
+        self._time0 = self._clock.time()
+        self._lock = threading.Lock()
+        self._file = _open(path, 'w')
+        self._file.write(json.dumps(dict(format=FORMAT, rsrc_name=rsrc_name,
+                                         write_termination=resource.write_termination,
+                                         read_termination=resource.read_termination)) + '\n')
+
+    def __getattr__(self, item):
+        return getattr(self.resource, item)
+
+    def __setattr__(self, key, value):
+        if key in self._own:
+            object.__setattr__(self, key, value)
+        else:
+            setattr(self.resource, key, value)
+
+    def _record(self, direction, text):
+        with self._lock:
+            if self._file is not None:
+                self._file.write(json.dumps([round(self._clock.time() - self._time0, 6), direction, text]) + '\n')
+                self.transfers += 1
+
+    def write(self, message: str):
+        self._record('w', message)
+        return self.resource.write(message)
+
+    def read(self) -> str:
+        try:
+            reply = self.resource.read()
+        except Exception as e:
+            self._record('x', str(e))
+            raise
+        self._record('r', reply)
+        return reply
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self.resource.close()
+
+
+class ReplayClock(VirtualClock):
+    """Virtual clock of a fast replay, brought forward to the time of each recorded reply."""
+
+    def advance_to(self, moment):
+        with self._lock:
+            self._now = max(self._now, moment)
+
+
+class ReplayResource:
+    """Stand-in for the resource of a controller playing a recording back, see the module docstring.
+
+    Args:
+        path (str): Recording.
+        fast (bool): Return the replies at once on a virtual clock instead of at their recorded times.
+    """
+
+    def __init__(self, path, fast=False):
+        self.path = path
+        with _open(path, 'r') as file:
+            header = json.loads(file.readline())
+            if header.get('format') != FORMAT:
+                raise ValueError(f'{path} is not a recording of format {FORMAT}')
+            self.transfers = [json.loads(line) for line in file if line.strip()]
+        self.rsrc_name = header['rsrc_name']
+        self.write_termination = header['write_termination']
+        self.read_termination = header['read_termination']
+        self.baud_rate = 9600
+        self.timeout = 2000
+        self.clock = ReplayClock() if fast else time
+        self.index = 0
+        self._time0 = self.clock.time()
+
+    @property
+    def done(self) -> bool:
+        """True once all the recorded transfers have been replayed."""
+        return self.index == len(self.transfers)
+
+    def _next(self, directions):
+        if self.done:
+            raise ReplayError(f'End of the recording {self.path} reached')
+        moment, direction, text = self.transfers[self.index]
+        if direction not in directions:
+            raise ReplayError(f'Transfer {self.index} of {self.path}: {direction} {text!r} recorded, '
+                              f'{directions[0]} attempted')
+        self.index += 1
+        return moment, direction, text
+
+    def write(self, message: str):
+        _, _, text = self._next('w')
+        if message != text:
+            raise ReplayError(f'Transfer {self.index - 1} of {self.path}: {text!r} recorded, {message!r} written')
+        return len(message)
+
+    def read(self) -> str:
+        moment, direction, text = self._next('rx')
+        if isinstance(self.clock, ReplayClock):
+            self.clock.advance_to(moment)
+        else:
+            self.clock.sleep(max(moment - (self.clock.time() - self._time0), 0.))
+        if direction == 'x':
+            raise ReplayedReadError(text)
+        return text
+
+    def query(self, command: str) -> str:
+        self.write(command)
+        return self.read()
+
+    def close(self):
+        pass
+
+
+def is_replay(rsrc_name: str) -> bool:
+    return rsrc_name.upper().startswith(REPLAY_PREFIX)
+
+
+def open_replay(rsrc_name: str) -> ReplayResource:
+    """Open REPLAY::<path>[::speed=fast|original]."""
+    fields = rsrc_name[len(REPLAY_PREFIX):].split('::')
+    options = dict(option.split('=') for option in fields[1].split(',')) if len(fields) > 1 and fields[1] else {}
+    return ReplayResource(fields[0], fast=options.get('speed', 'original').strip() == 'fast')
+
+
+def recording_path(rsrc_name: str):
+    """File recording a new connection to rsrc_name, None if the recording is disabled in the configuration."""
+    directory = config('recording', 'directory')
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    name = re.sub(r'[^\w.-]+', '_', rsrc_name).strip('_')
+    return os.path.join(directory, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.rec.gz")
@@ -1,11 +1,14 @@
-import pyvisa
-import time
 import logging
+from pymodaq_plugins_optosigma.hardware.base import OptoSigmaDriver
+from pymodaq_plugins_optosigma.hardware.codec import RMCCodec
+from pymodaq_plugins_optosigma.hardware.health import Condition, summary
+from pymodaq_plugins_optosigma.hardware.status import StatusSnapshot
 
 logger = logging.getLogger(__name__)
 
 class AxisError(Exception):
     MESSAGES = {
+        "X": "Command or parameter errors",
         "K": "Normal state",
         "A": "Other",
         "O": "Overflow"
@@ -14,29 +17,50 @@ class AxisError(Exception):
     def __init__(self, error_code):
         self.message = self.MESSAGES[error_code]
 
-class RMCVISADriver:
+class RMCVISADriver(OptoSigmaDriver):
     """Class to communicate with the RMC Actuator"""
 
     default_units = "um"
+    model = "RMC"
+    persisted_attributes = ("speed",)
+    wait_before_move = True
+    native_unit = "um"
 
     def __init__(self, rsrc_name):
-        self._actuator = None
-        self.rsrc_name = rsrc_name
+        self.codec = RMCCodec()
         self.position = [-1, -1]
         self.speed = [-1, -1]
-
-    def check_error(self):
-        """Check for errors."""
-        error = self._actuator.query("Q:")
-        error = error.split(",")[2]
-        if error != "K":
-            logger.error(f"Error: {error}")
-            AxisError(error)
+        super().__init__(rsrc_name)
+
+    @property
+    def _actuator(self):
+        """Transport of the serial line, see base.OptoSigmaDriver."""
+        return self.transport
+
+    @_actuator.setter
+    def _actuator(self, transport):
+        self.transport = transport
+
+    def read_health(self, channel=None):
+        """Error conditions of the controller, from the first two acknowledgements of Q:. The RMC reports them for
+        both axes, the channel is only there to match the other drivers."""
+        _, acks = self.codec.parse_status(self.transport.query(self.codec.status()))
+        return [Condition("error", ack, AxisError.MESSAGES.get(ack, f"Error code {ack}"))
+                for ack in acks[:2] if ack != "K"]
+
+    def check_error(self, channel=None):
+        """Check for errors (at most once every health.min_interval) and return the error message.
+        The RMC reports the errors of both channels, the channel is only there to match the other drivers."""
+        conditions = self.health.check()
+        if conditions:
+            logger.error(f"Error: {summary(conditions)}")
+        return summary(conditions)
 
     def set_speed(self, speed, channel):
         """Set the speed of the specified channel."""
         if 0 < speed <= 8:
-            speed = self._actuator.write(f"D:{channel}J{speed}")
+            self.transport.write(self.codec.speed(channel, speed))
+            self.transport.flush()
             self.speed[channel - 1] = speed
         else:
             Exception("Invalid speed values")
@@ -47,86 +71,39 @@ class RMCVISADriver:
             return logger.error("Speed is None")
         return self.speed[channel - 1]
 
-    def connect(self):
-        """Connect to the actuator."""
-        try:
-            rm = pyvisa.ResourceManager()
-            self._actuator = rm.open_resource(self.rsrc_name)
-            self._actuator.write_termination = "\r\n"
-            self._actuator.read_termination = "\r\n"
-        except Exception as e:
-            logger.error(f"Error connecting to {self.rsrc_name}: {e}")
-
     def set_mode(self):
         """Set the actuator to remote mode."""
-        self._actuator.write("P:1")
-
-    def move(self, position, channel):
-        """Move the actuator to the specified position on the given channel.
-        Parameters
-        ----------
-        position: int
-            The position to move to.
-        channel: int
-            The channel to move.
-
-        """
-        self.wait_for_ready(channel)
-        if position >= 0:
-            self._actuator.write(f"A:{channel}+U{position}")
+        self.transport.write("P:1")
+        self.transport.flush()
 
-        else:
-            self._actuator.write(f"A:{channel}-U{abs(position)}")
-        self._actuator.write("G:")
-        self.wait_for_ready(channel)
-        self.position[channel - 1] = position
-
-    def get_position(self, channel):
-        """Returns the position of the specified channel."""
-        if self.position[channel - 1] is None:
-            return logger.error("Position is None")
-        return self.position[channel - 1]
-
-    def move_relative(self, position, channel):
-        """Move the specified channel to the relative position."""
-        self.wait_for_ready(channel)
-        if position >= 0:
-            self._actuator.write(f"M:{channel}+U{position}")
-        else:
-            self._actuator.write(f"M:{channel}-U{abs(position)}")
-        self._actuator.write("G:")
-        self.wait_for_ready(channel)
-        self.position[channel - 1] = position + self.position[channel - 1]
-
-    def home(self, channel):
-        """Move the specified channel to the home position"""
-        self.wait_for_ready(channel)
-        self._actuator.write(f"H:{channel}")
-        self.wait_for_ready(channel)
-        self.position[channel - 1] = 0
-
-    def wait_for_ready(self, channel):
-        """Wait for the actuator to be ready."""
-        time0 = time.time()
-        while self.read_state(channel) != "R":
-            time1 = time.time() - time0
-            if time1 >= 60:
-                logger.error("Timeout")
-                self.check_error()
-                break
-            time.sleep(0.2)
-
-    def stop(self, channel):
-        """Stop the actuator on the specified channel."""
-        self._actuator.write(f"L:{channel}")
-        self.wait_for_ready(channel)
+    def restore(self, state):
+        """Send again the speed settings of a saved state (see state.PersistedState) to the controller, skipping the
+        channels whose speed was never set."""
+        for channel, speed in enumerate(state.get("speed", []), start=1):
+            if speed > 0:
+                self.set_speed(speed, channel)
 
     def read_state(self, channel):
         """Returns the state of the specified channel."""
-        state = self._actuator.query("!:")
+        state = self.transport.query(self.codec.ready())
         state = state.split(",")[channel - 1]
         return state
 
-    def close(self):
-        """Closes the connection to the actuator."""
-        pyvisa.ResourceManager().close()
\ No newline at end of file
+    def is_ready(self, channel):
+        """Return True if the specified channel is not moving."""
+        ready = self.read_state(channel) == "R"
+        self.motion.update(channel, ready)
+        return ready
+
+    def axes_ready(self, channels):
+        """Return True if none of the specified channels is moving, with a single query."""
+        ready = self.codec.parse_ready(self.transport.query(self.codec.ready()))
+        for channel in channels:
+            self.motion.update(channel, ready[channel - 1])
+        return all(ready[channel - 1] for channel in channels)
+
+    def read_status(self):
+        """Read the positions and states of both channels in a single transfer (Q: and !:)."""
+        status, states = self.transport.query_many([self.codec.status(), self.codec.ready()])
+        positions, acks = self.codec.parse_status(status)
+        return StatusSnapshot(positions, self.codec.parse_ready(states), acks[0])
@@ -0,0 +1,182 @@
+"""
+Background sampling of the positions and states of a controller.
+
+The drivers only hold the last target of each axis. A PositionSampler reads the status of the controller
+(read_status, a single transfer) at a fixed rate in its own thread and stores each sample in a RingBuffer, so that
+the drift, the overshoot and the settling of the axes can be looked at afterwards.
+
+The sampler shares the serial line with the motion commands without delaying them: it only takes the line when no
+one else is using it (a sample is skipped otherwise), and it waits between two samples long enough for the line to
+be busy with its queries at most max_duty of the time.
+
+The ring buffer has a single writer (the sampler thread) and no lock: a row is written before the counter of rows
+is incremented, and the readers get views on the rows written so far, without copy. A row may be overwritten while
+it is read if the reader is slower than the capacity of the buffer, see RingBuffer.is_valid.
+
+Example:
+    sampler = driver.start_sampler(rate=50)
+    ...
+    older, newer = sampler.buffer.views(500)  # last 500 samples, chronological order
+    positions = sampler.buffer.to_array()[:, sampler.column('position', 1)]
+"""
+import threading
+
+import numpy as np
+
+from pymodaq.utils.logger import set_logger, get_module_name
+
+from pymodaq_plugins_optosigma import config
+
+logger = set_logger(get_module_name(__file__))
+
+
+class RingBuffer:
+    """Fixed-size buffer of rows of floats overwritten in a circle, with a single writer and lock-free readers.
+
+    Args:
+        capacity (int): Number of rows kept.
+        width (int): Number of columns of a row.
+
+    Attributes:
+        data (ndarray): (capacity, width) storage, allocated once.
+        written (int): Number of rows written since the creation (not bounded by the capacity).
+    """
+
+    def __init__(self, capacity: int, width: int):
+        self.data = np.zeros((capacity, width))
+        self.capacity = capacity
+        self.written = 0
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def append(self, row):
+        """Write a row, the oldest one being overwritten once the buffer is full (single writer only)."""
+        self.data[self.written % self.capacity] = row
+        self.written += 1
+
+    def views(self, n=None) -> tuple:
+        """Views on the last n rows (all the rows kept if None) in chronological order: one array, or two when the
+        rows wrap around the end of the storage."""
+        written = self.written
+        n = min(written, self.capacity) if n is None else min(n, written, self.capacity)
+        stop = written % self.capacity if written >= self.capacity else written
+        start = stop - n
+        if start >= 0:
+            return self.data[start:stop],
+        return self.data[start:], self.data[:stop]
+
+    def latest(self):
+        """View on the last row written, None if the buffer is empty."""
+        written = self.written
+        if written == 0:
+            return None
+        return self.data[(written - 1) % self.capacity]
+
+    def to_array(self, n=None) -> np.ndarray:
+        """Copy of the last n rows (all the rows kept if None) as a single array."""
+        views = self.views(n)
+        return views[0].copy() if len(views) == 1 else np.concatenate(views)
+
+    def is_valid(self, written: int, n: int) -> bool:
+        """Whether the n last rows as of the given count written (read before the views) have not been overwritten
+        since, to be checked after using the views."""
+        return self.written - written + n <= self.capacity
+
+
+class PositionSampler:
+    """Background reading of the status of a driver into a RingBuffer, see the module docstring.
+
+    Each row holds the time of the sample (middle of its reading, clock of the driver), then the position of each
+    axis, then their ready flags (1. ready, 0. moving).
+
+    Args:
+        driver: Connected OptoSigma driver implementing read_status, with its status_cache attached to its transport.
+        rate (float): Samples per second, from the [sampler] section of the configuration if None.
+        capacity (int): Rows of the ring buffer, from the configuration if None.
+        max_duty (float): Largest fraction of the time the line is busy with the sampling, from the configuration
+            if None.
+    """
+
+    def __init__(self, driver, rate=None, capacity=None, max_duty=None):
+        self.driver = driver
+        self.rate = config('sampler', 'rate') if rate is None else rate
+        self.max_duty = config('sampler', 'max_duty') if max_duty is None else max_duty
+        if self.rate <= 0 or not 0 < self.max_duty <= 1:
+            raise ValueError('The sampling rate must be positive and the duty between 0 and 1')
+        self.n_axes = len(driver.position)
+        self.buffer = RingBuffer(config('sampler', 'capacity') if capacity is None else capacity,
+                                 1 + 2 * self.n_axes)
+        self.transport = driver.status_cache.transport
+        self.clock = self.transport.clock
+        self.skipped = 0
+        self.busy_time = 0.
+        self._stop = threading.Event()
+        self._thread = None
+
+    def column(self, kind: str, channel=None) -> int:
+        """Index of the column of the time (kind 'time'), or of the position or ready flag of a channel."""
+        if kind == 'time':
+            return 0
+        offset = {'position': 1, 'ready': 1 + self.n_axes}[kind]
+        return offset + channel - 1
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f'optosigma-sampler-{self.driver.rsrc_name}',
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        interval = 1 / self.rate
+        row = np.empty(self.buffer.data.shape[1])
+        while not self._stop.is_set():
+            if not self.transport.try_acquire():
+                # a command is in progress, it goes first
+                self.skipped += 1
+                self._stop.wait(min(interval, 0.005))
+                continue
+            try:
+                time0 = self.clock.time()
+                status = self.driver.read_status()
+                time1 = self.clock.time()
+            except Exception as e:
+                logger.error(f'Sampling of {self.driver.rsrc_name} stopped: {e}')
+                return
+            finally:
+                self.transport.release()
+            busy = time1 - time0
+            self.busy_time += busy
+            row[0] = (time0 + time1) / 2
+            row[1:1 + self.n_axes] = status.positions
+            row[1 + self.n_axes:] = status.ready
+            self.buffer.append(row)
+            # real time pause, even with the virtual clock of a simulator which would otherwise run ahead
+            self._stop.wait(max(interval - busy, busy * (1 / self.max_duty - 1)))
+
+
+def start_sampler(driver, rate=None, capacity=None, max_duty=None) -> PositionSampler:
+    """Start a PositionSampler on the driver, stopping the one it already has, and keep it in driver.sampler."""
+    if getattr(driver, 'sampler', None) is not None:
+        driver.sampler.stop()
+    driver.sampler = PositionSampler(driver, rate, capacity, max_duty).start()
+    return driver.sampler
+
+
+def autostart_sampler(driver):
+    """Start the sampler of a newly connected driver if enabled in the [sampler] section of the configuration."""
+    if config('sampler', 'enabled'):
+        start_sampler(driver)
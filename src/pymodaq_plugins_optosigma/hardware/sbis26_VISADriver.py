@@ -1,96 +1,81 @@
-import time
-import pyvisa
 from pymodaq.utils.logger import set_logger, get_module_name
+from pymodaq_plugins_optosigma.hardware.base import OptoSigmaDriver
+from pymodaq_plugins_optosigma.hardware.codec import SBIS26Codec
+from pymodaq_plugins_optosigma.hardware.health import Condition, summary
+from pymodaq_plugins_optosigma.hardware.status import StatusSnapshot
 
 logger = set_logger(get_module_name(__file__))
 
-class SBIS26VISADriver:
+class SBIS26VISADriver(OptoSigmaDriver):
     """VISA class driver for the OptoSigma stage SBIS26."""
 
+    model = "SBIS26"
+    n_axes = 3
+    # the motion commands of the SBIS26 start the move without any G: command
+    triggers = ("A:", "M:", "H:", "LE:")
+    persisted_attributes = ("speed_ini", "speed_fin", "accel_t")
+
+    ERRORS = {"C": "Stopped by clockwise limit sensor detected.",
+              "W": "Stopped by counterclockwise limit sensor detected.",
+              "E": "Stopped by both of limit sensor.",
+              "K": "Normal"}
+
     def __init__(self, rsrc_name):
-        self._stage = None
-        self.rsrc_name = rsrc_name
+        self.codec = SBIS26Codec()
         self.speed_ini = [-1, -1, -1]
         self.speed_fin = [-1, -1, -1]
         self.accel_t = [-1, -1, -1]
         self.position = [0, 0, 0]
+        super().__init__(rsrc_name)
 
-    def connect(self):
-        """Initializes the stage."""
-        rm = pyvisa.ResourceManager()
-        self._stage = rm.open_resource(self.rsrc_name)
-        self._stage.baud_rate = 38400
-        self._stage.read_termination = '\r\n'
-        self._stage.write("#CONNECT")
+    @property
+    def _stage(self):
+        """Transport of the serial line, see base.OptoSigmaDriver."""
+        return self.transport
 
-    def check_error(self, channel):
-        """Gets the status of the stage.
-        Args:
-            channel (int): Channel of the stage.
-        Returns (str): Status of the stage.
-        """
-        status = {"C": "Stopped by clockwise limit sensor detected.",
-                  "W": "Stopped by counterclockwise limit sensor detected.",
-                  "E": "Stopped by both of limit sensor.",
-                  "K": "Normal"}
-
-        while True:
-            self._stage.query(f"SRQ:D,{channel}")
-            error_str = self._stage.query(f"SRQ:D,{channel}")
-            key = error_str.split(",")[3]
-            if error_str in status.keys():
-                channel_val = int(error_str.split(",")[1])
-                if channel_val == channel:
-                    return error_str[key]
-                else:
-                    continue
-            time.sleep(0.2)
+    @_stage.setter
+    def _stage(self, transport):
+        self.transport = transport
 
-    def status(self, channel):
-        """Gets the status of the stage.
-        Args:
-            channel (int): Channel of the stage.
-        Returns (str): Status of the stage.
-        """
-        self._stage.query(f"SRQ:D,{channel}")
-        status_str = self._stage.query(f"SRQ:D,{channel}")
-        key = status_str.split(",")[-1]
-        return key
+    def connect(self, negotiate=None):
+        """Initializes the stage, probing the baud rate at the first connection if negotiate (see line.open_line).
+        The SBIS26 only answers the status queries after #CONNECT."""
+        self.open_transport(self.codec.status(1), negotiate, handshake="#CONNECT")
 
-    def get_position(self, channel):
-        """Gets the position of the stage.
+    def read_health(self, channel):
+        """Error conditions of the stage, from the error field of the reply to SRQ:.
         Args:
             channel (int): Channel of the stage.
-        Returns (float): Position of the stage.
         """
-        if (self.position[channel -1] is None):
-            return logger.error("Position is None")
-        return self.position[channel - 1]
+        reply = self.codec.parse_status(self.transport.query(self.codec.status(channel)))
+        if reply.error == "K":
+            return []
+        return [Condition("error", reply.error, self.ERRORS.get(reply.error, f"Error code {reply.error}"))]
 
-    def move(self, position, channel):
-        """Moves the stage to the specified position.
+    def check_error(self, channel):
+        """Gets the status of the stage, at most once every health.min_interval.
         Args:
-            position (int): Position to move the stage to.
             channel (int): Channel of the stage.
+        Returns (str): Status of the stage.
+        """
+        conditions = self.health.check(channel)
+        return summary(conditions)
 
-         """
-        if position >= 0:
-            self._stage.write(f"A:D,{channel},+{position}")
-        else:
-            self._stage.write(f"A:D,{channel},{position}")
-        self.wait_for_ready(channel)
-        self.position[channel - 1] = position
-
-    def move_relative(self, position, channel):
-        """Moves the stage to the specified relative position.
+    def status(self, channel):
+        """Gets the status of the stage.
         Args:
-            position (int): Relative position to move the stage to.
             channel (int): Channel of the stage.
+        Returns (str): Status of the stage.
         """
+        reply = self.codec.parse_status(self.transport.query(self.codec.status(channel)))
+        return "R" if reply.ready else "B"
 
-        self._stage.write(f"M:D,{channel},{position}")
-        self.wait_for_ready(channel)
-        self.position[channel - 1] = self.position[channel - 1] + position
+    def axes_ready(self, channels):
+        """Returns True if none of the specified axes is moving, reading all of them in a single transfer."""
+        status = self.read_status()
+        for channel in channels:
+            self.motion.update(channel, status.is_ready(channel))
+        return all(status.is_ready(channel) for channel in channels)
 
     def set_speed(self, speed_ini, speed_fin, accel_t, channel):
         """Sets the speed of the stage.
@@ -104,7 +89,8 @@ class SBIS26VISADriver:
         self.speed_fin[channel - 1] = speed_fin
         self.accel_t[channel - 1] = accel_t
         if 0 < speed_ini <= speed_fin and accel_t > 0:
-            self._stage.write(f"D:D,{channel},{speed_ini},{speed_fin},{accel_t}")
+            self.transport.write(self.codec.speed(channel, speed_ini, speed_fin, accel_t))
+            self.transport.flush()
         else:
             logger.error("Invalid parameters")
 
@@ -114,28 +100,34 @@ class SBIS26VISADriver:
             return logger.error("Parameters are None.")
         return self.speed_ini[channel - 1], self.speed_fin[channel - 1], self.accel_t[channel - 1]
 
-    def stop(self):
-        """Stops the stage."""
-        self._stage.write("LE:A")
-
-    def wait_for_ready(self, channel):
-        """Waits for the stage to be ready."""
-
-        time0 = time.time()
-        while self.status(channel) != "R":
-            logger.debug(self.status(channel))
-            time1 = time.time() - time0
-            if time1 >= 60:
-                logger.error("Timeout")
-                break
-            time.sleep(0.2)
-
-    def home(self, channel):
-        """ Sends the stage to the home position."""
-        self._stage.write(f"H:D,{channel}")
-        self.wait_for_ready(channel)
-        self.position[channel - 1] = 0
-
-    def close(self):
-        """Closes the stage."""
-        pyvisa.ResourceManager().close()
\ No newline at end of file
+    def speeds(self, channel):
+        """Speed settings (pulses/s, pulses/s, ms) of the stage."""
+        return self.speed_ini[channel - 1], self.speed_fin[channel - 1], self.accel_t[channel - 1]
+
+    def read_state(self, channel):
+        """Reads the state of the stage, R: Ready, B: Busy."""
+        return self.status(channel)
+
+    def is_ready(self, channel):
+        """Returns True if the stage is not moving."""
+        ready = self.read_state(channel) == "R"
+        self.motion.update(channel, ready)
+        return ready
+
+    def read_status(self):
+        """Reads the positions and states of the three axes, the SRQ queries being sent in a single transfer.
+        Returns (StatusSnapshot): Status of all the axes.
+        """
+        replies = [self.codec.parse_status(reply)
+                   for reply in self.transport.query_many([self.codec.status(channel) for channel in self.channels])]
+        errors = [reply.error for reply in replies if reply.error != "K"]
+        return StatusSnapshot([reply.position for reply in replies], [reply.ready for reply in replies],
+                              errors[0] if errors else "K")
+
+    def restore(self, state):
+        """Send again the speed settings of a saved state (see state.PersistedState) to the controller, skipping the
+        channels whose speed was never set."""
+        speeds = zip(state.get("speed_ini", []), state.get("speed_fin", []), state.get("accel_t", []))
+        for channel, (speed_ini, speed_fin, accel_t) in enumerate(speeds, start=1):
+            if speed_ini > 0:
+                self.set_speed(speed_ini, speed_fin, accel_t, channel)
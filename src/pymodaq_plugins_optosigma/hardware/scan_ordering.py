@@ -0,0 +1,183 @@
+"""
+Ordering of the points of a scan so that the stages travel as little as possible.
+
+The cost of going from one point to another is the time of the move: the axes move at the same time, each one
+following the trapezoidal speed profile set on its controller (see TravelCost), or the largest axis distance if the
+speeds are unknown. The points of a raster are visited in serpentine order, along the fast axis that costs less,
+and arbitrary point sets are ordered with a nearest neighbour tour improved by 2-opt exchanges.
+
+Example:
+    cost = TravelCost(speed_ini=[500, 500], speed_fin=[5000, 5000], accel_t=[100, 100])
+    order = order_points(points, cost)
+    points = points[order]
+"""
+import numpy as np
+
+from pymodaq.utils.logger import set_logger, get_module_name
+
+logger = set_logger(get_module_name(__file__))
+
+
+def trapezoid_durations(distances, speed_ini, speed_fin, accel_t) -> np.ndarray:
+    """Vectorized version of polling.trapezoid_duration for valid speed settings.
+
+    Args:
+        distances (ndarray): Travels in pulses.
+        speed_ini (float): Starting speed in pulses/s.
+        speed_fin (float): Maximum speed in pulses/s.
+        accel_t (float): Acceleration (and deceleration) time in ms.
+    """
+    distances = np.abs(np.asarray(distances, dtype=float))
+    speed_ini = min(speed_ini, speed_fin)
+    accel_t = accel_t / 1000
+    if accel_t == 0 or speed_fin == speed_ini:
+        return distances / speed_fin
+    ramps_distance = (speed_ini + speed_fin) * accel_t
+    accel = (speed_fin - speed_ini) / accel_t
+    full = 2 * accel_t + (distances - ramps_distance) / speed_fin
+    triangle = 2 * (np.sqrt(speed_ini ** 2 + accel * np.minimum(distances, ramps_distance)) - speed_ini) / accel
+    return np.where(distances >= ramps_distance, full, triangle)
+
+
+class TravelCost:
+    """Duration of the moves between scan points, the axes moving simultaneously.
+
+    Args:
+        speed_ini, speed_fin, accel_t (list of float): Speed settings of each axis as set on the controllers (pulses/s
+            and ms). If the settings of an axis are None or invalid, the cost is the largest axis distance in pulses.
+        pulses_per_unit (list of float): Number of pulses per unit of the scan positions, for each axis.
+    """
+
+    def __init__(self, speed_ini=None, speed_fin=None, accel_t=None, pulses_per_unit=None):
+        n_axes = max(len(values) for values in (speed_ini, speed_fin, accel_t, pulses_per_unit, [None])
+                     if values is not None)
+        self.speed_ini = [None] * n_axes if speed_ini is None else list(speed_ini)
+        self.speed_fin = [None] * n_axes if speed_fin is None else list(speed_fin)
+        self.accel_t = [None] * n_axes if accel_t is None else list(accel_t)
+        self.pulses_per_unit = [1.] * n_axes if pulses_per_unit is None else list(pulses_per_unit)
+
+    @classmethod
+    def distance(cls, n_axes: int):
+        """Cost being the largest axis distance, when nothing is known about the speeds."""
+        return cls(pulses_per_unit=[1.] * n_axes)
+
+    def is_timed(self, axis: int) -> bool:
+        try:
+            return 0 <= float(self.speed_ini[axis]) and 0 < float(self.speed_fin[axis]) and \
+                0 <= float(self.accel_t[axis])
+        except (TypeError, ValueError):
+            return False
+
+    @property
+    def timed(self) -> bool:
+        """True if the cost is a duration, the speed settings of all the axes being known."""
+        return all(self.is_timed(axis) for axis in range(len(self.pulses_per_unit)))
+
+    def axis_cost(self, axis: int, distances) -> np.ndarray:
+        pulses = np.abs(distances) * abs(self.pulses_per_unit[axis])
+        if not self.timed:
+            return pulses
+        return trapezoid_durations(pulses, float(self.speed_ini[axis]), float(self.speed_fin[axis]),
+                                   float(self.accel_t[axis]))
+
+    def __call__(self, origin, targets) -> np.ndarray:
+        """Cost of the moves from origin (n_axes) to each of the targets (N x n_axes, or n_axes)."""
+        deltas = np.atleast_2d(np.asarray(targets, dtype=float)) - np.asarray(origin, dtype=float)
+        return np.max([self.axis_cost(axis, deltas[:, axis]) for axis in range(deltas.shape[1])], axis=0)
+
+    def matrix(self, points) -> np.ndarray:
+        """Cost of the moves between all the points (N x N)."""
+        points = np.asarray(points, dtype=float)
+        deltas = points[:, np.newaxis, :] - points[np.newaxis, :, :]
+        return np.max([self.axis_cost(axis, deltas[..., axis]) for axis in range(points.shape[1])], axis=0)
+
+
+def path_cost(points, order, cost: TravelCost) -> float:
+    """Total cost of visiting the points in the given order."""
+    points = np.asarray(points, dtype=float)[np.asarray(order)]
+    if points.ndim == 1:
+        points = points.reshape((-1, 1))
+    if len(points) < 2:
+        return 0.
+    deltas = np.diff(points, axis=0)
+    return float(np.sum(np.max([cost.axis_cost(axis, deltas[:, axis]) for axis in range(points.shape[1])], axis=0)))
+
+
+def serpentine_order(shape, fast_axis: int = 1) -> np.ndarray:
+    """Order of the points of a 2D raster of shape (n_axis0, n_axis1), flattened in C order, going back and forth
+    along the fast axis."""
+    indexes = np.arange(shape[0] * shape[1]).reshape(shape)
+    if fast_axis == 0:
+        indexes = indexes.T
+    indexes = indexes.copy()
+    indexes[1::2] = indexes[1::2, ::-1]
+    return indexes.ravel()
+
+
+def nearest_neighbour_order(points, cost: TravelCost, start: int = 0) -> np.ndarray:
+    """Visit the points going each time to the closest point (in cost) not visited yet."""
+    points = np.asarray(points, dtype=float)
+    remaining = np.ones(len(points), dtype=bool)
+    order = np.empty(len(points), dtype=int)
+    current = start
+    for index in range(len(points)):
+        order[index] = current
+        remaining[current] = False
+        if index + 1 < len(points):
+            candidates = np.flatnonzero(remaining)
+            current = candidates[np.argmin(cost(points[current], points[candidates]))]
+    return order
+
+
+def two_opt(order, costs: np.ndarray, max_passes: int = 20) -> np.ndarray:
+    """Improve an open path by reversing segments as long as it shortens it, the first point being kept.
+
+    Args:
+        order (ndarray): Initial order of the points.
+        costs (ndarray): N x N cost matrix (see TravelCost.matrix).
+        max_passes (int): Maximum number of passes over the whole path.
+    """
+    order = np.array(order)
+    n_points = len(order)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n_points - 2):
+            a, b = order[i], order[i + 1]
+            c = order[i + 2:]
+            d = np.append(order[i + 3:], -1)
+            # reversing order[i + 1: j + 1] replaces the edges a-b and c-d by a-c and b-d (no d after the last point)
+            gain = costs[a, c] - costs[a, b] + np.where(d >= 0, costs[b, d] - costs[c, d], 0.)
+            best = int(np.argmin(gain))
+            if gain[best] < -1e-12:
+                j = i + 2 + best
+                order[i + 1:j + 1] = order[i + 1:j + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return order
+
+
+def order_points(points, cost: TravelCost = None, method: str = '2-opt', max_points_2opt: int = 2000) -> np.ndarray:
+    """Order arbitrary points (N x n_axes) to minimise the travel, starting from the first one.
+
+    Args:
+        points (ndarray): The points to visit.
+        cost (TravelCost): Cost model, the largest axis distance by default.
+        method (str): 'nearest neighbour' or '2-opt' (nearest neighbour improved by 2-opt).
+        max_points_2opt (int): Above this number of points, the N x N matrix needed by 2-opt is not computed.
+    Returns (ndarray): The order of the points.
+    """
+    points = np.asarray(points, dtype=float)
+    if points.ndim == 1:
+        points = points.reshape((-1, 1))
+    if cost is None:
+        cost = TravelCost.distance(points.shape[1])
+    if len(points) < 3:
+        return np.arange(len(points))
+    order = nearest_neighbour_order(points, cost)
+    if method == '2-opt':
+        if len(points) <= max_points_2opt:
+            order = two_opt(order, cost.matrix(points))
+        else:
+            logger.info(f'{len(points)} points: 2-opt skipped, nearest neighbour order only')
+    return order
@@ -1,119 +1,111 @@
 import numpy as np
-import time
-import pyvisa
 from pymodaq.utils.logger import set_logger, get_module_name
+from pymodaq_plugins_optosigma.hardware.base import OptoSigmaDriver
+from pymodaq_plugins_optosigma.hardware.codec import ProtocolError, SHRC203Codec, SHRC_STATUS_BITS, decode_shrc_status
+from pymodaq_plugins_optosigma.hardware.flyscan import fly_scan
+from pymodaq_plugins_optosigma.hardware.health import Condition, summary
+from pymodaq_plugins_optosigma.hardware.status import StatusSnapshot
+from pymodaq_plugins_optosigma.hardware.units import unit_letter
 
 logger = set_logger(get_module_name(__file__))
 
 class AxisError(Exception):
     """
-    Raised when a particular axis causes an error for OptoSigma SHRC-203.
+    Raised when a particular axis causes an error for OptoSigma SHRC-203. The message lists the conditions of the
+    status bits set (see codec.SHRC_STATUS_BITS).
 
     """
 
-    MESSAGES = {
-        '1': 'Normal (S1 to S10 and emergency stop has not occurred)',
-        '3': 'Command error',
-        '7': 'Scale error (S1)',
-        'F': 'Disconnection error (S2)',
-        '1F': 'Overflow error (S4)',
-        '3F': 'Emergency stop',
-        '7F': 'Hunting error (S3)',
-        'FF': 'Limit error (S5)',
-        '1FF': 'Counter overflow (S6)',
-        '3FF': 'Auto config error',
-        '7FF': '24V IO overload warning (W1)',
-        'FFF': '24V terminal block overload warning (W2)',
-        '1FFF': 'System error (S7)',
-        '3FFF': 'Motor driver overheat warning (W3)',
-        '7FFF': 'Motor driver overheat error (S10)',
-        'FFFF': 'Out of in-position range   (after positioning is completed) (READY)',
-        '1FFFF': 'Out of in-position range (During positioning operation) (BUSY)',
-        '3FFFF': 'Logical origin return is in progress',
-        '7FFFF': 'Mechanical origin return is in progress',
-        'FFFFF': 'CW limit detection',
-        '1FFFFF': 'CCW limit detection',
-        '3FFFFF': 'CW software limit stop',
-        '7FFFFF': 'CCW software limit stop',
-        'FFFFFF': 'NEAR sensor detection',
-        '1FFFFFF': 'ORG sensor detection',
-    }
-
     def __init__(self, code):
-        self.message = self.MESSAGES[code]
+        self.status = decode_shrc_status(code)
+        self.message = self.status.message
 
     def __str__(self):
         return f"OptoSigma SHRC-203 Error: {self.message}"
 
-class SHRC203VISADriver:
+class SHRC203VISADriver(OptoSigmaDriver):
     """
     Class to handle the communication with the Optosigma SHRC203 controller using the VISA protocol.
     """
     default_units = 'um'
+    model = "SHRC203"
+    n_axes = 3
+    persisted_attributes = ("speed_ini", "speed_fin", "accel_t", "unit", "loop")
 
     def __init__(self, rsrc_name):
         """
         Initialize the communication with the controller.
         """
-        self._instr = None
-        self.rsrc_name = rsrc_name
-        self.unit = self.set_unit(self.default_units)
+        self.codec = SHRC203Codec()
         self.loop = [-1, -1, -1]
         self.position = [0, 0, 0]
         self.speed_ini = [-1, -1, -1]
         self.speed_fin = [-1, -1, -1]
         self.accel_t = [-1, -1, -1]
+        super().__init__(rsrc_name)
+        self.set_unit(self.default_units)
+
+    @property
+    def _instr(self):
+        """Transport of the serial line, see base.OptoSigmaDriver."""
+        return self.transport
+
+    @_instr.setter
+    def _instr(self, transport):
+        self.transport = transport
+
+    @property
+    def unit(self):
+        """Unit letter of the move commands, held by the codec. The controller converting the positions itself, the
+        positions of all the axes are given in this unit (see units.UnitConverter)."""
+        return self.codec.unit
+
+    @unit.setter
+    def unit(self, unit):
+        self.codec.unit = unit
+        self.units.set_native(unit)
+        for channel in self.channels:
+            self.units.set_axis(channel, unit)
 
     def set_unit(self, unit: str):
         """
-        Set the unit of the controller.
+        Set the unit of the controller, given by its name (nm, um, mm, deg, pulse) or its letter:
         "N" nanometer designation
         "U" micrometer designation
         "M" mm designation
         "D" degree designation
         "P" Designation without unit (pulse
         """
-        units = ["N", "U", "M", "D", "P"]
-        unit_list = ['nm', 'um', 'mm', 'deg', 'pulse']
-        if unit in unit_list:
-            self.unit = units[unit_list.index(unit)]
-        self.unit = unit
+        self.unit = unit_letter(unit)
 
-    def check_error(self, channel):
+    def read_health(self, channel):
         """
-        Check if there is an error in the specified channel.
+        Error and warning conditions of the specified channel, from all the bits of its status (SRQ:).
         """
-        time0 = time.time()
-        error = self._instr.query(f"SRQ:{channel}S")
-
-        while error[0] not in ["1", "3", "7", "F"]:
-             error = self._instr.query(f"SRQ:{channel}S")
-             if time0 - time.time() >= 10:
-                logger.error("Timeout")
-                break
+        status = decode_shrc_status(self.transport.query(self.codec.status_request(channel)))
+        return [Condition(kind, f"{1 << bit:X}", message) for bit, (message, kind) in enumerate(SHRC_STATUS_BITS)
+                if kind in ("error", "warning") and status.value >> bit & 1]
 
-        error = error.split(",")[0]
+    def check_error(self, channel):
+        """
+        Check if there is an error in the specified channel (at most once every health.min_interval, with a bounded
+        number of attempts) and return the error and warning messages.
+        """
+        conditions = self.health.check(channel)
+        if any(condition.severity == "error" for condition in conditions):
+            logger.error(f"Error on channel {channel}: {summary(conditions)}")
+        return summary(conditions)
 
-        return AxisError.MESSAGES[error]
-    
-    def open_connection(self): 
-                                
-        """
-        Open the connection with the controller.
-        """
-        try:
-            rm = pyvisa.ResourceManager()
-            self._instr = rm.open_resource(self.rsrc_name)
-            self._instr.baud_rate = 9600
-            self._instr.data_bits = 8 
-            self._instr.parity = pyvisa.constants.Parity.none 
-            self._instr.write_termination = "\r\n" 
-            self._instr.read_termination = "\r\n"
-        except Exception as e:
-            logger.error(f"Error connecting to {self.rsrc_name}: {e}")
+    def open_connection(self, negotiate=None):
+        """
+        Open the connection with the controller, with the line settings of the configuration file.
+        If negotiate, the baud rate is probed at the first connection (see line.open_line).
+        """
+        self.connect(negotiate)
     
     def set_mode(self):
-        self._instr.write("MODE:HOST")
+        self.transport.write("MODE:HOST")
+        self.transport.flush()
 
     def set_loop(self, loop : dict, channel : int):
         """
@@ -121,7 +113,8 @@ class SHRC203VISADriver:
         1: Open loop
         0: Close loop
         """
-        self._instr.write(f"F:{channel}{loop}")
+        self.transport.write(self.codec.loop(channel, loop))
+        self.transport.flush()
         self.loop[channel-1] = loop
 
     def get_loop(self, channel):
@@ -129,24 +122,12 @@ class SHRC203VISADriver:
         Get the loop status of the specified channel."""
         return self.loop[channel-1] 
 
-    def move(self, position, channel): 
+    def fly_scan(self, start, stop, velocity, channel, rate=100., run_up=None):
         """
-        Move the specified channel to the position.
+        Sweep the channel over [start, stop] at constant velocity (pulses/s) while its positions are sampled at
+        rate in the background, see flyscan.FlyScan. Returns the running FlyScan.
         """
-        if position >= 0:
-            self._instr.write(f"A:{channel}+{self.unit}{position}")
-        else:
-            self._instr.write(f"A:{channel}-{self.unit}{abs(position)}")
-        self._instr.write("G:")
-        self.wait_for_ready(channel)
-        self.position[channel-1] = position
-
-
-    def get_position(self, channel):
-        if self.position[channel-1] is None:
-            return logger.error("Position is None")
-        return self.position[channel-1]
-
+        return fly_scan(self, start, stop, velocity, channel, rate, run_up)
 
     def set_speed(self, speed_ini, speed_fin, accel_t, channel): 
         """Sets the speed of the stage.
@@ -158,67 +139,72 @@ class SHRC203VISADriver:
         """
 
         if 0 < speed_ini <= speed_fin and accel_t > 0:
-            self._instr.write(f"D:{channel},{speed_ini},{speed_fin},{accel_t}")
+            self.transport.write(self.codec.speed(channel, speed_ini, speed_fin, accel_t))
+            self.transport.flush()
+            self.speed_ini[channel-1] = speed_ini
+            self.speed_fin[channel-1] = speed_fin
+            self.accel_t[channel-1] = accel_t
         else:
             Exception("Invalid parameters")
 
     def get_speed(self, channel):
         """Get the speed of the stage."""
 
-        speed = self._instr.query(f"?:D{channel}")
-
-        time0 = time.time()
-        while speed[0] != "S":
-            speed = self._instr.query(f"?:D{channel}")
-            if time0 - time.time() >= 5:
-                logger.error("Timeout")
-                return self.speed_ini[channel-1], self.speed_fin[channel-1], self.accel_t[channel-1]
+        for attempt in range(self.health.retries):
+            if attempt:
+                self.health.clock.sleep(self.health.retry_delay)
+            try:
+                speed = self.codec.parse_speed(self.transport.query(self.codec.speed_query(channel)))
+                break
+            except ProtocolError as e:
+                error = e
+        else:
+            logger.error(f"No valid reply to the speed query: {error}")
+            return self.speed_ini[channel-1], self.speed_fin[channel-1], self.accel_t[channel-1]
 
-        self.speed_ini[channel-1] = speed.split("S")[1].split("F")[0]
-        self.speed_fin[channel-1] = speed.split("F")[1].split("R")[0]
-        self.accel_t[channel-1]= speed.split("R")[1]
+        self.speed_ini[channel-1], self.speed_fin[channel-1], self.accel_t[channel-1] = speed
         return self.speed_ini[channel-1], self.speed_fin[channel-1], self.accel_t[channel-1]
 
-    def move_relative(self, position, channel):
-        """Move the stage to a relative position."""
-        if position >= 0:
-            self._instr.write(f"M:{channel}+{self.unit}{position}")
-        else:
-            self._instr.write(f"M:{channel}-{self.unit}{abs(position)}")
-        self._instr.write("G:")
-        self.wait_for_ready(channel)
-        self.position[channel - 1] = self.position[channel - 1] + position
-
-    def home(self, channel):
-        """Move the stage to the home position."""
-        self._instr.write(f"H:{channel}")
-        self.wait_for_ready(channel)
-        self.position[channel - 1] = 0
-
-
-    def wait_for_ready(self, channel):
-        """Wait for the stage to stop moving."""
-        time0 = time.time()
-        while self.read_state(channel) != "R":
-            time1 = time.time() - time0
-            if time1 >= 60:
-                logger.error("Timeout")
-                self.check_error(channel)
-                break
-            time.sleep(0.2)
-
-    def stop(self, channel):
-        """Stop the stage"""
-        self._instr.write(f"L:{channel}")
-        self.wait_for_ready(channel)
+    def restore(self, state):
+        """Send again the unit, loop and speed settings of a saved state (see state.PersistedState) to the controller,
+        skipping the channels whose settings were never set."""
+        if "unit" in state:
+            self.set_unit(state["unit"])
+        for channel, loop in enumerate(state.get("loop", []), start=1):
+            if loop >= 0:
+                self.set_loop(loop, channel)
+        speeds = zip(state.get("speed_ini", []), state.get("speed_fin", []), state.get("accel_t", []))
+        for channel, (speed_ini, speed_fin, accel_t) in enumerate(speeds, start=1):
+            if speed_ini > 0:
+                self.set_speed(speed_ini, speed_fin, accel_t, channel)
+
+    def speeds(self, channel):
+        """Speed settings (pulses/s, pulses/s, ms) of the specified channel, None if the unit is not the pulse as
+        they cannot give the duration of a move then."""
+        if self.unit != "P":
+            return None
+        return self.speed_ini[channel-1], self.speed_fin[channel-1], self.accel_t[channel-1]
 
     def read_state(self, channel):
         """Read the state if the stage is moving or not.
         B: Busy
         R: Ready"""
-        state = self._instr.query(f"!:{channel}S")
+        state = self.transport.query(self.codec.ready(channel))
         return state
 
-    def close(self):
-        """Close the connection with the controller."""
-        pyvisa.ResourceManager().close()
\ No newline at end of file
+    def is_ready(self, channel):
+        """Return True if the specified channel is not moving."""
+        ready = self.read_state(channel) == "R"
+        self.motion.update(channel, ready)
+        return ready
+
+    def axes_ready(self, channels):
+        """Return True if none of the specified channels is moving."""
+        return all(self.is_ready(channel) for channel in channels)
+
+    def read_status(self):
+        """Read the positions and states of the three channels in a single transfer (Q: and !:)."""
+        queries = [self.codec.status()] + [self.codec.ready(channel) for channel in self.channels]
+        replies = self.transport.query_many(queries)
+        positions, acks = self.codec.parse_status(replies[0])
+        return StatusSnapshot(positions, [self.codec.parse_ready(state) for state in replies[1:]], acks[0])
@@ -0,0 +1,454 @@
+"""
+Simulated OptoSigma controllers.
+
+The simulators behave like pyvisa resources (write, read, query, close and the serial attributes) and speak the
+ASCII protocol of each controller as the drivers use it. They are selected with a visa_name of the form:
+
+    SIM::<model>[::option=value,option=value...]
+
+where model is one of SHRC203, GSC, RMC or SBIS26 and the options are:
+    baud_rate: baud rate the simulated controller is set to (the host must use the same one)
+    latency: processing time of the controller for each command (s)
+    link_latency: turnaround time of the link (USB-serial adapter) for each transfer (s)
+    clock: 'virtual' (default) to run faster than real time or 'real'
+
+Timing model:
+    * each transferred character costs 10 bits at the baud rate of the link, and each transfer (a write or a read
+      call) costs the turnaround time of the link
+    * each command costs the latency of the controller
+    * each move follows a trapezoidal speed profile defined by speed_ini/speed_fin (pulses/s) and accel_t (ms),
+      one pulse being one unit of the commanded position.
+
+With the virtual clock, the waiting loops of the drivers advance the time instead of sleeping, so a long scan runs
+in a fraction of its real duration while keeping the same timeline.
+"""
+import math
+import re
+import threading
+import time
+from collections import deque
+
+from pymodaq_plugins_optosigma import config
+from pymodaq_plugins_optosigma.hardware.polling import trapezoid_duration
+
+SIM_PREFIX = 'SIM::'
+# recorded sessions played back, see recording
+REPLAY_PREFIX = 'REPLAY::'
+
+
+class SimulatorTimeout(Exception):
+    """Raised when reading a reply that the simulated controller never sent"""
+
+
+class VirtualClock:
+    """Clock whose sleep advances the time immediately."""
+
+    def __init__(self, start=0.):
+        self._now = start
+        self._lock = threading.Lock()
+
+    def time(self):
+        return self._now
+
+    def sleep(self, duration):
+        if duration > 0:
+            with self._lock:
+                self._now += duration
+
+
+def trapezoid_travel(elapsed, distance, speed_ini, speed_fin, accel_t):
+    """Distance travelled after elapsed seconds on the trapezoidal profile of a move of the given distance.
+    The arguments follow polling.trapezoid_duration."""
+    distance = abs(distance)
+    if elapsed <= 0 or distance == 0:
+        return 0.
+    accel_t = accel_t / 1000
+    speed_ini = min(speed_ini, speed_fin)
+    if accel_t == 0 or speed_fin == speed_ini:
+        return min(speed_fin * elapsed, distance)
+    accel = (speed_fin - speed_ini) / accel_t
+    if distance >= (speed_ini + speed_fin) * accel_t:
+        accel_time, speed_peak = accel_t, speed_fin
+    else:
+        speed_peak = math.sqrt(speed_ini ** 2 + accel * distance)
+        accel_time = (speed_peak - speed_ini) / accel
+    accel_distance = (speed_ini + speed_peak) / 2 * accel_time
+    cruise_time = (distance - 2 * accel_distance) / speed_peak
+    total = 2 * accel_time + cruise_time
+    if elapsed < accel_time:
+        return speed_ini * elapsed + accel * elapsed ** 2 / 2
+    elif elapsed < accel_time + cruise_time:
+        return accel_distance + speed_peak * (elapsed - accel_time)
+    elif elapsed < total:
+        remaining = total - elapsed
+        return distance - (speed_ini * remaining + accel * remaining ** 2 / 2)
+    return distance
+
+
+class SimulatedAxis:
+    """One motorized axis following a trapezoidal speed profile."""
+
+    def __init__(self, speed_ini=500, speed_fin=5000, accel_t=100):
+        self.speed_ini = speed_ini
+        self.speed_fin = speed_fin
+        self.accel_t = accel_t
+        self.loop = 0
+        self._origin = 0.
+        self._target = 0.
+        self._time0 = 0.
+        self._duration = 0.
+
+    def start(self, target, now):
+        """Start a move to the absolute target at time now."""
+        self._origin = self.position(now)
+        self._target = target
+        self._time0 = now
+        duration = trapezoid_duration(target - self._origin, self.speed_ini, self.speed_fin, self.accel_t)
+        self._duration = 0. if duration is None else duration
+
+    def position(self, now):
+        elapsed = now - self._time0
+        if elapsed >= self._duration:
+            return self._target
+        travel = trapezoid_travel(elapsed, self._target - self._origin, self.speed_ini, self.speed_fin, self.accel_t)
+        return self._origin + math.copysign(travel, self._target - self._origin)
+
+    def is_busy(self, now):
+        return now - self._time0 < self._duration
+
+    def stop(self, now):
+        """Stop the axis where it is at time now."""
+        position = self.position(now)
+        self._origin = self._target = position
+        self._duration = 0.
+
+
+def format_position(value):
+    """Format a position the way the controllers do: sign first then the right aligned value."""
+    if float(value).is_integer():
+        value = int(value)
+    return f"{'-' if value < 0 else '+'}{abs(value):>9}"
+
+
+class SimulatedController:
+    """Base class of the simulated controllers, mimicking a pyvisa serial resource.
+
+    Subclasses define n_axes, default_baud_rate and implement handle(command) returning the reply (str) or None.
+    """
+
+    n_axes = 2
+    default_baud_rate = 9600
+
+    def __init__(self, resource_name, baud_rate=None, latency=0.001, link_latency=0.001, clock=None):
+        self.resource_name = resource_name
+        self.clock = VirtualClock() if clock is None else clock
+        self.device_baud_rate = self.default_baud_rate if baud_rate is None else baud_rate
+        self.latency = latency
+        self.link_latency = link_latency
+        # host side settings, as on a pyvisa resource
+        self.baud_rate = 9600
+        self.data_bits = 8
+        self.parity = 0
+        self.write_termination = "\r\n"
+        self.read_termination = "\r\n"
+        self.timeout = 2000
+        self.axes = [SimulatedAxis() for _ in range(self.n_axes)]
+        self.pending = {}
+        self.error = 'K'
+        self.commands = []
+        self._replies = deque()
+        self._lock = threading.RLock()
+
+    def now(self):
+        return self.clock.time()
+
+    def _transfer(self, nbytes):
+        """Time spent on the link for a transfer of nbytes at the host baud rate (10 bits per character)."""
+        self.clock.sleep(self.link_latency + nbytes * 10 / self.baud_rate)
+
+    def _link_ok(self):
+        return self.baud_rate == self.device_baud_rate
+
+    def write(self, message):
+        with self._lock:
+            self._transfer(len(message) + len(self.write_termination))
+            if not self._link_ok():
+                return len(message)
+            for command in message.split(self.write_termination):
+                if command:
+                    self.clock.sleep(self.latency)
+                    self.commands.append(command)
+                    reply = self.handle(command)
+                    if reply is not None:
+                        self._replies.append(reply)
+            return len(message)
+
+    def read(self):
+        with self._lock:
+            if not self._replies:
+                self.clock.sleep(self.timeout / 1000)
+                raise SimulatorTimeout(f"{self.resource_name}: no reply to read")
+            reply = self._replies.popleft()
+            self._transfer(len(reply) + len(self.read_termination))
+            return reply
+
+    def query(self, message):
+        with self._lock:
+            self.write(message)
+            return self.read()
+
+    def close(self):
+        pass
+
+    def channels(self, channel: str):
+        """Axis indexes targeted by a channel field, W meaning all the axes."""
+        if channel == 'W':
+            return list(range(self.n_axes))
+        return [int(channel) - 1]
+
+    def is_busy(self):
+        now = self.now()
+        return any(axis.is_busy(now) for axis in self.axes)
+
+    def drive(self):
+        """Start the pending moves (G: command)."""
+        now = self.now()
+        for index, target in self.pending.items():
+            self.axes[index].start(target, now)
+        self.pending = {}
+
+    def load(self, index, value, relative=False):
+        if relative:
+            value = self.axes[index].position(self.now()) + value
+        self.pending[index] = value
+
+    def status_reply(self):
+        """Reply to Q: positions of all the axes then the three acknowledgements."""
+        now = self.now()
+        positions = [format_position(axis.position(now)) for axis in self.axes]
+        return ','.join(positions + [self.error, 'K', 'B' if self.is_busy() else 'R'])
+
+    def handle(self, command):
+        raise NotImplementedError
+
+
+class SHRC203Simulator(SimulatedController):
+    """SHRC-203 in HOST mode"""
+
+    n_axes = 3
+    move_regex = re.compile(r'^([AM]):([1-3W])([+-])([A-Za-z]*)(\d+(?:\.\d*)?)$')
+
+    def handle(self, command):
+        now = self.now()
+        match = self.move_regex.match(command)
+        if match:
+            kind, channel, sign, _, value = match.groups()
+            for index in self.channels(channel):
+                self.load(index, float(sign + value), relative=kind == 'M')
+            return None
+        if command == 'G:':
+            self.drive()
+        elif command.startswith('H:'):
+            for index in self.channels(command[2:]):
+                self.axes[index].start(0., now)
+        elif command.startswith('L:'):
+            channel = command[2:]
+            for index in (range(self.n_axes) if channel in ('E', 'W') else self.channels(channel)):
+                self.axes[index].stop(now)
+        elif command.startswith('D:'):
+            channel, speed_ini, speed_fin, accel_t = command[2:].split(',')
+            axis = self.axes[int(channel) - 1]
+            axis.speed_ini, axis.speed_fin, axis.accel_t = float(speed_ini), float(speed_fin), float(accel_t)
+        elif command.startswith('?:D'):
+            axis = self.axes[int(command[3:]) - 1]
+            return f"S{axis.speed_ini:g}F{axis.speed_fin:g}R{axis.accel_t:g}"
+        elif command.startswith('F:'):
+            self.axes[int(command[2]) - 1].loop = int(command[3:])
+        elif command.startswith('!:'):
+            channel = command[2:].rstrip('S')
+            if channel == '':
+                return 'B' if self.is_busy() else 'R'
+            return 'B' if self.axes[int(channel) - 1].is_busy(now) else 'R'
+        elif command.startswith('SRQ:'):
+            return '1' if self.error == 'K' else '3'
+        elif command == 'Q:':
+            return self.status_reply()
+        elif command != 'MODE:HOST':
+            self.error = 'X'
+        return None
+
+
+class GSCSimulator(SimulatedController):
+    """GSC-02C 2 axis controller"""
+
+    n_axes = 2
+    move_regex = re.compile(r'^([AM]):([12W])([+-])P(\d+)$')
+    speed_regex = re.compile(r'^D:([12])S(\d+)F(\d+)R(\d+)$')
+
+    def handle(self, command):
+        now = self.now()
+        match = self.move_regex.match(command)
+        if match:
+            kind, channel, sign, value = match.groups()
+            for index in self.channels(channel):
+                self.load(index, int(sign + value), relative=kind == 'M')
+            return None
+        match = self.speed_regex.match(command)
+        if match:
+            channel, speed_ini, speed_fin, accel_t = (int(value) for value in match.groups())
+            axis = self.axes[channel - 1]
+            axis.speed_ini, axis.speed_fin, axis.accel_t = speed_ini, speed_fin, accel_t
+        elif command == 'G:':
+            self.drive()
+        elif command.startswith('H:'):
+            for index in self.channels(command[2:]):
+                self.axes[index].start(0, now)
+        elif command.startswith('L:'):
+            for index in (range(self.n_axes) if command[2:] == 'E' else self.channels(command[2:])):
+                self.axes[index].stop(now)
+        elif command == '!:':
+            return 'B' if self.is_busy() else 'R'
+        elif command == 'Q:':
+            return self.status_reply()
+        else:
+            self.error = 'X'
+        return None
+
+
+class RMCSimulator(SimulatedController):
+    """RMC-102 remote micrometer controller. Its speed is a level from 1 to 8."""
+
+    n_axes = 2
+    move_regex = re.compile(r'^([AM]):([12W])([+-])U(\d+(?:\.\d*)?)$')
+    speed_per_level = 250
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for axis in self.axes:
+            self.set_level(axis, 8)
+
+    def set_level(self, axis, level):
+        axis.speed_fin = self.speed_per_level * level
+        axis.speed_ini = axis.speed_fin / 10
+        axis.accel_t = 50
+
+    def handle(self, command):
+        now = self.now()
+        match = self.move_regex.match(command)
+        if match:
+            kind, channel, sign, value = match.groups()
+            for index in self.channels(channel):
+                self.load(index, float(sign + value), relative=kind == 'M')
+            return None
+        if command == 'G:':
+            self.drive()
+        elif command.startswith('D:') and 'J' in command:
+            channel, level = command[2:].split('J')
+            self.set_level(self.axes[int(channel) - 1], int(level))
+        elif command.startswith('H:'):
+            for index in self.channels(command[2:]):
+                self.axes[index].start(0., now)
+        elif command.startswith('L:'):
+            for index in (range(self.n_axes) if command[2:] == 'E' else self.channels(command[2:])):
+                self.axes[index].stop(now)
+        elif command == '!:':
+            return ','.join('B' if axis.is_busy(now) else 'R' for axis in self.axes)
+        elif command == 'Q:':
+            return self.status_reply()
+        elif command != 'P:1':
+            self.error = 'X'
+        return None
+
+
+class SBIS26Simulator(SimulatedController):
+    """SBIS26 driver integrated stages, up to 3 axes on one link.
+    #CONNECT and SRQ are answered, the other commands are silent. SRQ is only answered after #CONNECT."""
+
+    n_axes = 3
+    default_baud_rate = 38400
+    connected = False
+    move_regex = re.compile(r'^([AM]):D,([1-3]),([+-]?\d+(?:\.\d*)?)$')
+
+    def handle(self, command):
+        now = self.now()
+        match = self.move_regex.match(command)
+        if match:
+            kind, channel, value = match.groups()
+            self.load(int(channel) - 1, float(value), relative=kind == 'M')
+            self.drive()
+            return None
+        if command == '#CONNECT':
+            self.connected = True
+            return 'OK'
+        elif command.startswith('D:D,'):
+            channel, speed_ini, speed_fin, accel_t = command[4:].split(',')
+            axis = self.axes[int(channel) - 1]
+            axis.speed_ini, axis.speed_fin, axis.accel_t = float(speed_ini), float(speed_fin), float(accel_t)
+        elif command.startswith('H:D,'):
+            self.axes[int(command[4:]) - 1].start(0, now)
+        elif command.startswith('L:D,'):
+            self.axes[int(command[4:]) - 1].stop(now)
+        elif command.startswith('LE:'):
+            for axis in self.axes:
+                axis.stop(now)
+        elif command.startswith('SRQ:D,'):
+            if not self.connected:
+                return None
+            channel = int(command[6:])
+            axis = self.axes[channel - 1]
+            state = 'B' if axis.is_busy(now) else 'R'
+            return f"D,{channel},{format_position(axis.position(now)).replace(' ', '')},{self.error},{state}"
+        else:
+            self.error = 'X'
+        return None
+
+
+SIMULATORS = {
+    'SHRC203': SHRC203Simulator,
+    'GSC': GSCSimulator,
+    'RMC': RMCSimulator,
+    'SBIS26': SBIS26Simulator,
+}
+
+_devices = {}
+_devices_lock = threading.Lock()
+
+
+def is_simulated(rsrc_name: str):
+    """True if rsrc_name is no physical controller: a simulated one, or a recording played back."""
+    return rsrc_name.upper().startswith((SIM_PREFIX, REPLAY_PREFIX))
+
+
+def parse_simulator_name(rsrc_name: str):
+    """Split SIM::<model>::option=value,... into the simulator class and its keyword arguments."""
+    fields = rsrc_name.split('::')
+    model = fields[1].upper() if len(fields) > 1 else ''
+    if model not in SIMULATORS:
+        raise ValueError(f'Unknown simulated controller {rsrc_name}, available models: {list(SIMULATORS)}')
+    options = dict(latency=config('simulator', 'latency'), link_latency=config('simulator', 'link_latency'),
+                   clock=config('simulator', 'clock'))
+    if len(fields) > 2 and fields[2]:
+        for option in fields[2].split(','):
+            key, value = option.split('=')
+            options[key.strip()] = value.strip()
+    kwargs = dict(latency=float(options['latency']), link_latency=float(options['link_latency']),
+                  clock=time if options['clock'] == 'real' else VirtualClock())
+    if 'baud_rate' in options:
+        kwargs['baud_rate'] = int(options['baud_rate'])
+    return SIMULATORS[model], kwargs
+
+
+def open_simulator(rsrc_name: str):
+    """Return the simulated controller of this name, creating it at the first call.
+    As with a physical controller, all the sessions opened on one name talk to the same device."""
+    with _devices_lock:
+        if rsrc_name not in _devices:
+            klass, kwargs = parse_simulator_name(rsrc_name)
+            _devices[rsrc_name] = klass(rsrc_name, **kwargs)
+        return _devices[rsrc_name]
+
+
+def clear_simulators():
+    """Forget all the simulated controllers (their state is lost)."""
+    with _devices_lock:
+        _devices.clear()
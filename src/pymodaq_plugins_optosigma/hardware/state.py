@@ -0,0 +1,71 @@
+"""
+State of the controllers kept between the sessions, so that the axes are not homed at every start.
+
+When a driver is closed, the last known positions of its axes and its settings (speeds, unit, loop mode depending on
+the controller) are saved in the [state.controllers] section of the configuration file, under its visa_name. At the
+next initialization, warm_start reads the positions from the controller with a single status query: if they all
+agree with the stored ones within the tolerance of the [state] section, the controller kept its origin and the
+stored settings are sent again to the controller through the setters of the driver (driver.restore) without homing,
+otherwise the axes which disagree have to be homed (homing_required).
+
+A controller switched off and on again counts from 0: the disagreement is only detected if an axis was away from
+the origin when the driver was closed.
+"""
+from pymodaq_plugins_optosigma import config
+
+
+class PersistedState:
+    """Saved state of a driver, see the module docstring.
+
+    Args:
+        driver: OptoSigma driver, with a position list and a restore method applying the saved attributes.
+        attributes (tuple of str): Attributes of the driver saved along the positions.
+        persist (bool): False to keep the state only in memory (simulated controllers).
+    """
+
+    def __init__(self, driver, attributes=(), persist=True):
+        self.driver = driver
+        self.attributes = tuple(attributes)
+        self.persist = persist
+        # nothing is trusted before a warm start
+        self.homing_required = list(range(1, len(driver.position) + 1))
+
+    @property
+    def name(self) -> str:
+        return self.driver.rsrc_name
+
+    def to_dict(self) -> dict:
+        state = {'position': list(self.driver.position)}
+        state.update({attribute: getattr(self.driver, attribute) for attribute in self.attributes})
+        return state
+
+    def stored(self):
+        """State saved at the last closing, None if there is none."""
+        return config('state', 'controllers').get(self.name)
+
+    def save(self):
+        if self.persist:
+            config['state', 'controllers', self.name] = self.to_dict()
+            config.save()
+
+    def warm_start(self, status) -> list:
+        """Compare the positions of the StatusSnapshot status with the stored ones and restore the stored state if
+        they agree. Returns the channels to be homed, kept in homing_required (all of them if nothing is stored)."""
+        stored = self.stored()
+        channels = list(range(1, len(status.positions) + 1))
+        if stored is None or len(stored['position']) != len(status.positions):
+            self.homing_required = channels
+            return self.homing_required
+        tolerance = config('state', 'tolerance')
+        self.homing_required = [channel for channel, position, stored_position
+                                in zip(channels, status.positions, stored['position'])
+                                if abs(position - stored_position) > tolerance]
+        if not self.homing_required:
+            self.driver.restore({attribute: stored[attribute] for attribute in self.attributes if attribute in stored})
+            self.driver.position[:] = status.positions
+        return self.homing_required
+
+    def homed(self, channel):
+        """The channel has been homed, its position can be trusted."""
+        if channel in self.homing_required:
+            self.homing_required.remove(channel)
@@ -0,0 +1,101 @@
+"""
+Cached status of all the axes of a controller.
+
+The positions and ready flags of all the axes are read together (Q: and !: for the SHRC203, GSC and RMC, one SRQ per
+axis for the SBIS26, all sent in a single transfer) and the snapshot is reused until it is older than the TTL or a
+motion command has been sent. As the driver is shared by all the plugins using the same controller (see connections),
+the axes polled by PyMoDAQ cost one status query per TTL instead of one per axis and per poll.
+"""
+import threading
+import time
+
+
+class StatusSnapshot:
+    """Positions and ready flags of all the axes of a controller, read at time (clock of the driver).
+
+    Attributes:
+        positions (list of float): Position of each axis, in the unit of the controller.
+        ready (list of bool): False for the axes which are moving.
+        error (str): Error code of the controller, 'K' if normal.
+        time (float): Time of the reading.
+    """
+
+    def __init__(self, positions, ready, error='K', time=0.):
+        self.positions = list(positions)
+        self.ready = list(ready)
+        self.error = error
+        self.time = time
+
+    def position(self, channel):
+        return self.positions[channel - 1]
+
+    def is_ready(self, channel):
+        return self.ready[channel - 1]
+
+    @property
+    def all_ready(self):
+        return all(self.ready)
+
+    def sync_positions(self, positions: list):
+        """Copy the positions of the axes which are not moving into positions, the list of the last targets kept by a
+        driver, so that it follows the stops and the moves made by other means."""
+        for index, ready in enumerate(self.ready):
+            if ready:
+                positions[index] = self.positions[index]
+
+    def __repr__(self):
+        return f"StatusSnapshot(positions={self.positions}, ready={self.ready}, error='{self.error}')"
+
+
+class StatusCache:
+    """Last StatusSnapshot of a controller, read again when older than ttl or after a motion command.
+
+    Args:
+        read (callable): Returns a new StatusSnapshot from the controller.
+        ttl (float): Time (s) during which a snapshot is reused.
+
+    The cache is attached to the transport of the driver (attach), whose counter of motion commands invalidates the
+    snapshot, and whose clock is used to date it.
+    """
+
+    def __init__(self, read, ttl=0.1):
+        self.read = read
+        self.ttl = ttl
+        self.transport = None
+        self.clock = time
+        self.reads = 0
+        self.hits = 0
+        self._snapshot = None
+        self._motions = None
+        self._lock = threading.Lock()
+
+    def attach(self, transport):
+        self.transport = transport
+        self.clock = transport.clock
+        self.invalidate()
+
+    def _motions_sent(self):
+        return None if self.transport is None else self.transport.motions
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def is_valid(self) -> bool:
+        return (self._snapshot is not None and self._motions == self._motions_sent()
+                and self.clock.time() - self._snapshot.time < self.ttl)
+
+    def get(self) -> StatusSnapshot:
+        """Return the cached snapshot if still valid, otherwise read a new one.
+        Concurrent callers wait for the reading in progress instead of sending their own query."""
+        with self._lock:
+            if self.is_valid():
+                self.hits += 1
+                return self._snapshot
+            motions = self._motions_sent()
+            snapshot = self.read()
+            snapshot.time = self.clock.time()
+            self._snapshot = snapshot
+            self._motions = motions
+            self.reads += 1
+            return snapshot
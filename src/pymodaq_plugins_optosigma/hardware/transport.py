@@ -0,0 +1,218 @@
+"""
+Communication link of the OptoSigma controllers.
+
+The drivers talk to the controllers through a PipelinedTransport wrapped around the pyvisa resource:
+
+* the commands without reply (D:, A:, F:...) are queued and sent back-to-back in a single transfer, either with the
+  next command triggering a motion (G:, H:, L:...) or with the next query, instead of one transfer each; the
+  settings of the drivers (set_speed, set_loop, set_mode) flush them so that they reach the controller on return,
+* several queries can be sent at once (query_many) and every reply is matched to the command that produced it, in
+  the order of the serial line, so that no reply is ever dropped or read by the wrong query,
+* the bytes exchanged are counted so that the utilisation of the line can be reported (line_stats),
+* the motion commands (the triggers) are counted, so that a cached status knows when it is outdated (see status),
+* an abort (write_priority) is written at once in its own transfer, without waiting for a query in progress to be
+  read nor for the queued commands to be sent,
+* when an Instrumentation is attached (see instrumentation), the latency of every command is recorded.
+"""
+import threading
+import time
+from collections import deque
+
+import pyvisa
+
+from pymodaq_plugins_optosigma.hardware.recording import RecordingResource, is_replay, open_replay, recording_path
+from pymodaq_plugins_optosigma.hardware.simulator import is_simulated, open_simulator
+
+
+_resource_manager = None
+_resource_manager_lock = threading.Lock()
+
+
+def get_resource_manager():
+    """Return the pyvisa ResourceManager shared by all the controllers of the process."""
+    global _resource_manager
+    with _resource_manager_lock:
+        if _resource_manager is None:
+            _resource_manager = pyvisa.ResourceManager()
+        return _resource_manager
+
+
+def open_resource(rsrc_name: str):
+    """Open a VISA resource, the simulated controller if rsrc_name starts with SIM:: (see simulator) or the recording
+    played back if it starts with REPLAY:: (see recording). The session is recorded if the recording is enabled in
+    the configuration."""
+    if is_replay(rsrc_name):
+        return open_replay(rsrc_name)
+    if is_simulated(rsrc_name):
+        resource = open_simulator(rsrc_name)
+    else:
+        resource = get_resource_manager().open_resource(rsrc_name)
+    path = recording_path(rsrc_name)
+    return resource if path is None else RecordingResource(resource, path, rsrc_name)
+
+
+def resource_clock(resource):
+    """Clock (object with time() and sleep()) driving the timeline of the resource: the virtual clock of a
+    simulated controller, the time module otherwise."""
+    return getattr(resource, 'clock', time)
+
+
+class PendingReply:
+    """Slot for the reply of a command sent through a PipelinedTransport."""
+
+    def __init__(self, transport, command):
+        self.transport = transport
+        self.command = command
+        self.reply = None
+        self.done = False
+        self.sent_at = None
+
+    def result(self):
+        """Block until the reply has been read and return it."""
+        if not self.done:
+            self.transport.read_until(self)
+        return self.reply
+
+
+class PipelinedTransport:
+    """Queue the commands sent to a controller and correlate the replies with the queries.
+
+    Attributes not defined here (baud_rate, timeout...) are those of the wrapped resource.
+
+    Args:
+        resource: pyvisa resource or simulated controller.
+        triggers (tuple of str): Prefixes of the commands that are sent immediately, with the queued ones.
+    """
+
+    def __init__(self, resource, triggers=("G:", "H:", "L:")):
+        self.resource = resource
+        self.triggers = tuple(triggers)
+        self.clock = resource_clock(resource)
+        self._outbox = []
+        self._pending = deque()
+        self._lock = threading.RLock()
+        # only guards the writes to the resource, so that a priority write does not wait for a reply being read
+        self._write_lock = threading.Lock()
+        self.motions = 0
+        self.instrumentation = None
+        self.reset_stats()
+
+    def __getattr__(self, item):
+        return getattr(self.resource, item)
+
+    def reset_stats(self):
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.transfers = 0
+        self.commands = 0
+        self.queries = 0
+        self._stats_time0 = self.clock.time()
+
+    def write(self, command: str):
+        """Queue a command without reply, it is sent at once if it starts with one of the triggers."""
+        with self._lock:
+            self._outbox.append(command)
+            self.commands += 1
+            if command.startswith(self.triggers):
+                self.motions += 1
+                self.flush()
+            return len(command)
+
+    def send(self, command: str) -> PendingReply:
+        """Queue a command whose reply is expected and return the slot of its reply."""
+        with self._lock:
+            pending = PendingReply(self, command)
+            self._outbox.append(command)
+            self._pending.append(pending)
+            self.commands += 1
+            self.queries += 1
+            return pending
+
+    def flush(self):
+        """Send all the queued commands back-to-back in a single transfer."""
+        with self._lock:
+            if not self._outbox:
+                return
+            message = self.resource.write_termination.join(self._outbox)
+            commands, self._outbox = self._outbox, []
+            with self._write_lock:
+                if self.instrumentation is None:
+                    self.resource.write(message)
+                else:
+                    self._timed_write(message, commands)
+                self.bytes_sent += len(message) + len(self.resource.write_termination)
+                self.transfers += 1
+
+    def write_priority(self, command: str) -> float:
+        """Write a command without reply (a stop) at once in its own transfer, ahead of the queued commands and
+        without waiting for the reply of a query in progress. Returns the time taken (s), on the transport clock."""
+        time0 = self.clock.time()
+        with self._write_lock:
+            self.resource.write(command)
+            self.bytes_sent += len(command) + len(self.resource.write_termination)
+            self.transfers += 1
+            self.commands += 1
+            self.motions += command.startswith(self.triggers)
+        latency = self.clock.time() - time0
+        if self.instrumentation is not None:
+            self.instrumentation.record_transfer([command], self.resource.write_termination, latency)
+        return latency
+
+    def _timed_write(self, message, commands):
+        timer = self.instrumentation.timer
+        sent = [pending for pending in self._pending if pending.sent_at is None]
+        time0 = timer()
+        for pending in sent:
+            pending.sent_at = time0
+        self.resource.write(message)
+        self.instrumentation.record_transfer(commands, self.resource.write_termination, timer() - time0,
+                                             [pending.command for pending in sent])
+
+    def read_until(self, pending: PendingReply):
+        """Read the replies in the order of the line until the one of pending, storing each in its slot."""
+        with self._lock:
+            self.flush()
+            while not pending.done:
+                head = self._pending.popleft()
+                try:
+                    head.reply = self.resource.read()
+                finally:
+                    head.done = True
+                nbytes = len(head.reply) + len(self.resource.read_termination)
+                self.bytes_received += nbytes
+                if self.instrumentation is not None and head.sent_at is not None:
+                    self.instrumentation.record_reply(head.command, nbytes,
+                                                      self.instrumentation.timer() - head.sent_at)
+
+    def query(self, command: str) -> str:
+        """Send the command (with the queued ones) and return its reply."""
+        with self._lock:
+            return self.send(command).result()
+
+    def query_many(self, commands) -> list:
+        """Send several queries in a single transfer and return their replies in the same order."""
+        with self._lock:
+            pendings = [self.send(command) for command in commands]
+            return [pending.result() for pending in pendings]
+
+    def try_acquire(self) -> bool:
+        """Take the exclusive use of the line if no one else is using it, without waiting. Used by background
+        readers which would rather skip a reading than delay a command. Returns True if taken, see release."""
+        return self._lock.acquire(blocking=False)
+
+    def release(self):
+        self._lock.release()
+
+    def line_stats(self) -> dict:
+        """Traffic since the last reset_stats: utilisation is the fraction of the elapsed time the line was busy
+        transferring characters (10 bits per character)."""
+        elapsed = self.clock.time() - self._stats_time0
+        wire_time = (self.bytes_sent + self.bytes_received) * 10 / self.resource.baud_rate
+        return dict(bytes_sent=self.bytes_sent, bytes_received=self.bytes_received, transfers=self.transfers,
+                    commands=self.commands, queries=self.queries, wire_time=wire_time, elapsed=elapsed,
+                    utilisation=wire_time / elapsed if elapsed > 0 else 0.)
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self.resource.close()
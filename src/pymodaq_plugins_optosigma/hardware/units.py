@@ -0,0 +1,122 @@
+"""
+Conversion of the positions between the units shown by the plugins and the pulses of the controllers.
+
+The GSC-02C and the SBIS26 only move in pulses, the RMC-102 moves in um and the SHRC-203 converts itself into the
+unit given by a letter in each move command (see unit_letter). A UnitConverter holds, for each axis, the unit the
+positions are given in (nm, um, mm, deg or pulse) and the resolution of the axis in pulses per um (per degree for a
+rotation stage), and the native unit the controller moves in. It converts whole arrays of positions of several axes
+with a single NumPy operation, rounding the targets to integer pulses once, at the end, for the controllers moving in
+pulses.
+
+Every driver has one (driver.units), through which the DAQ_Move plugins convert their moves and waypoints.
+
+Example:
+    converter = UnitConverter(2, unit='um', resolution=2.)
+    converter.to_pulses([[0., 10.5], [100., 200.]], channels=[1, 2])  # array([[0, 21], [200, 400]])
+"""
+import numpy as np
+
+# size of each unit in the base unit of its dimension: um for the lengths, degree for the angles
+UNITS = {'nm': ('length', 1e-3), 'um': ('length', 1.), 'mm': ('length', 1e3), 'deg': ('angle', 1.),
+         'pulse': ('pulse', 1.)}
+# unit letters of the move commands of the SHRC-203
+UNIT_LETTERS = {'nm': 'N', 'um': 'U', 'mm': 'M', 'deg': 'D', 'pulse': 'P'}
+
+
+def unit_name(unit: str) -> str:
+    """Name of a unit given by its name, its SHRC-203 letter or ' ' (pulses, as shown by the GSC plugin)."""
+    if unit in UNITS:
+        return unit
+    if unit == ' ' or unit == '':
+        return 'pulse'
+    for name, letter in UNIT_LETTERS.items():
+        if unit == letter:
+            return name
+    raise ValueError(f'Unknown unit {unit!r}, expected one of {list(UNITS)}')
+
+
+def unit_letter(unit: str) -> str:
+    """SHRC-203 letter of a unit given by its name or its letter."""
+    return UNIT_LETTERS[unit_name(unit)]
+
+
+def display_unit(unit: str) -> str:
+    """Unit of the positions shown by a DAQ_Move plugin, ' ' for the pulses which are no physical unit."""
+    name = unit_name(unit)
+    return ' ' if name == 'pulse' else name
+
+
+class UnitConverter:
+    """Unit and resolution of each axis of a controller, see the module docstring.
+
+    Args:
+        n_axes (int): Number of axes of the controller.
+        unit (str): Unit of the positions of all the axes.
+        resolution (float): Pulses per um (lengths) or per degree (angles) of all the axes.
+        native (str): Unit of the positions sent to the controller.
+    """
+
+    def __init__(self, n_axes: int, unit='pulse', resolution=1., native='pulse'):
+        self.units = [unit_name(unit)] * n_axes
+        self.resolution = np.full(n_axes, float(resolution))
+        self.native = unit_name(native)
+        self._scale = None
+
+    def set_axis(self, channel: int, unit=None, resolution=None):
+        """Change the unit and/or the resolution (pulses per um or per degree) of an axis."""
+        if unit is not None:
+            self.units[channel - 1] = unit_name(unit)
+        if resolution is not None:
+            if resolution <= 0:
+                raise ValueError('The resolution must be positive')
+            self.resolution[channel - 1] = resolution
+        self._scale = None
+
+    def set_native(self, unit: str):
+        """Change the unit the controller moves in."""
+        self.native = unit_name(unit)
+        self._scale = None
+
+    def unit(self, channel: int) -> str:
+        return self.units[channel - 1]
+
+    def scale(self, channels=None) -> np.ndarray:
+        """Native units (pulses for a controller moving in pulses) per unit of the given channels (an int or a
+        sequence), all the axes if None."""
+        if self._scale is None:
+            self._scale = np.array([_pulses(unit, resolution) / _pulses(self.native, resolution)
+                                    for unit, resolution in zip(self.units, self.resolution)])
+        if channels is None:
+            return self._scale
+        return self._scale[np.asarray(channels) - 1]
+
+    def to_pulses(self, values, channels=None):
+        """Integer pulses of positions in the unit of the axes.
+
+        values is a scalar for a single channel, or an array whose last dimension runs along the channels, for
+        instance N waypoints x len(channels). Returns an int for a scalar, an int64 array otherwise.
+        """
+        pulses = np.rint(np.asarray(values, dtype=float) * self.scale(channels)).astype(np.int64)
+        return int(pulses) if pulses.ndim == 0 else pulses
+
+    def from_pulses(self, pulses, channels=None):
+        """Positions in the unit of the axes of pulses, same shapes as to_pulses."""
+        values = np.asarray(pulses, dtype=float) / self.scale(channels)
+        return float(values) if values.ndim == 0 else values
+
+    def to_native(self, values, channels=None):
+        """Positions sent to the controller of positions in the unit of the axes, same shapes as to_pulses: integer
+        pulses for a controller moving in pulses, positions in its native unit otherwise."""
+        if self.native == 'pulse':
+            return self.to_pulses(values, channels)
+        values = np.asarray(values, dtype=float) * self.scale(channels)
+        return float(values) if values.ndim == 0 else values
+
+    def from_native(self, values, channels=None):
+        """Positions in the unit of the axes of positions read from the controller, see to_native."""
+        return self.from_pulses(values, channels)
+
+
+def _pulses(unit: str, resolution: float) -> float:
+    """Pulses per unit for an axis of the given resolution."""
+    return 1. if UNITS[unit][0] == 'pulse' else resolution * UNITS[unit][1]
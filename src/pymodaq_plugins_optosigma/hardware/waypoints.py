@@ -0,0 +1,77 @@
+"""
+Streamed execution of a list of waypoints (raster scans) on one controller.
+
+A scan driven point by point from DAQ_Scan pays, for each point, the plugin checks, the command formatting, the Qt
+signals and a full ready wait. run_waypoints takes all the points at once as a N x n_axes array: the commands of the
+next point are formatted while the current move is running, so that they are sent in a single transfer (with the
+G: trigger) as soon as the axes are ready, and an optional callback is called at each point, from the same thread,
+to interleave an acquisition with the moves.
+
+Example:
+    def acquire(index, point):
+        grab_spectrum(index)
+
+    xs, ys = np.meshgrid(np.arange(0, 1000, 100), np.arange(0, 500, 100))
+    run_waypoints(driver, np.column_stack((xs.ravel(), ys.ravel())), channels=[1, 2], callback=acquire)
+"""
+import numpy as np
+
+from pymodaq.utils.logger import set_logger, get_module_name
+from pymodaq_plugins_optosigma.hardware.polling import MotionCancelled
+
+logger = set_logger(get_module_name(__file__))
+
+
+def as_waypoints(waypoints, n_axes: int) -> np.ndarray:
+    """Return the waypoints as a 2D array of n_axes columns (a 1D array being a list of single axis targets)."""
+    waypoints = np.asarray(waypoints)
+    if waypoints.ndim == 1 and n_axes == 1:
+        waypoints = waypoints.reshape((-1, 1))
+    if waypoints.ndim != 2 or waypoints.shape[1] != n_axes:
+        raise ValueError(f'Waypoints of shape {waypoints.shape} do not match the {n_axes} axes')
+    return waypoints
+
+
+def run_waypoints(driver, waypoints, channels, callback=None) -> int:
+    """Move the channels of the driver through the waypoints, one after the other.
+
+    Args:
+        driver: Driver implementing move_axes_commands, axes_ready and expected_duration, with its position list,
+            its polling strategy, its motion models and its transport in status_cache.transport.
+        waypoints (ndarray): N x len(channels) absolute targets, in the unit of the controller.
+        channels (list of int): Channel of each column.
+        callback (callable): Called as callback(index, waypoint) once the waypoint is reached. The sequence is
+            stopped if it returns False.
+    Returns (int): Number of waypoints reached.
+    """
+    channels = list(channels)
+    waypoints = as_waypoints(waypoints, len(channels))
+    transport = driver.status_cache.transport
+    points = waypoints.tolist()
+    if not points:
+        return 0
+    commands = driver.move_axes_commands(dict(zip(channels, points[0])))
+    for index, point in enumerate(points):
+        durations = [driver.expected_duration(position - driver.position[channel - 1], channel)
+                     for channel, position in zip(channels, point)]
+        for channel, position in zip(channels, point):
+            driver.motion.started(channel, position - driver.position[channel - 1])
+        for command in commands:
+            transport.write(command)
+        if index + 1 < len(points):
+            # the next targets are formatted while the stage is moving
+            commands = driver.move_axes_commands(dict(zip(channels, points[index + 1])))
+        try:
+            ready = driver.polling.wait(lambda: driver.axes_ready(channels),
+                                        None if None in durations else max(durations), channels=channels)
+        except MotionCancelled:
+            logger.info(f'Stopped before waypoint {index}: {point}')
+            return index
+        if not ready:
+            logger.error(f'Timeout at waypoint {index}: {point}')
+            return index
+        for channel, position in zip(channels, point):
+            driver.position[channel - 1] = position
+        if callback is not None and callback(index, waypoints[index]) is False:
+            return index + 1
+    return len(points)
@@ -0,0 +1,117 @@
+"""
+Scan layouts minimising the travel of the OptoSigma stages, added to the DAQ_Scan scanners.
+
+* Scan2D/Serpentine: 2D raster going back and forth along the fast axis, set by the user or chosen automatically
+  as the one taking less time to travel.
+* Tabular/TravelOptimised: the points of the table are reordered (nearest neighbour tour improved by 2-opt) to
+  minimise the travel time, the first point of the table being kept first.
+
+The travel time is computed from the speed settings of the selected actuators (see hardware.scan_ordering).
+"""
+from typing import List, TYPE_CHECKING
+
+import numpy as np
+
+from pymodaq.utils import math_utils as mutils
+from pymodaq.utils.logger import set_logger, get_module_name
+from pymodaq.utils.scanner.scan_factory import ScannerFactory
+from pymodaq.utils.scanner.scanners._2d_scanners import Scan2DLinear
+from pymodaq.utils.scanner.scanners.tabular import TabularScanner
+
+from pymodaq_plugins_optosigma.hardware.scan_ordering import TravelCost, order_points, path_cost, serpentine_order
+
+if TYPE_CHECKING:
+    from pymodaq.control_modules.daq_move import DAQ_Move
+
+logger = set_logger(get_module_name(__file__))
+
+
+def actuator_speeds(actuator: 'DAQ_Move'):
+    """Speed settings (pulses/s, ms) and pulses per unit of the positions read from the settings of a DAQ_Move
+
+    The speeds are None if the plugin has no speed settings (RMC for instance). The number of pulses per unit accounts
+    for the unit coefficient of the GSC plugin and the scaling of the actuator, it is 1 otherwise.
+    """
+    settings = actuator.settings.child('move_settings')
+    names = [child.name() for child in settings.children()]
+
+    def value(*keys):
+        for key in keys:
+            if key in names:
+                return settings[key]
+        return None
+
+    pulses_per_unit = 1.
+    if 'coeff' in names and value('unit') == 'um':
+        pulses_per_unit = settings['coeff']
+    if 'scaling' in names and settings['scaling', 'use_scaling'] and settings['scaling', 'scaling'] != 0:
+        pulses_per_unit /= settings['scaling', 'scaling']
+    return value('speed_ini'), value('speed_fin'), value('accel_t', 'acceleration_time'), pulses_per_unit
+
+
+def travel_cost(actuators: List['DAQ_Move']) -> TravelCost:
+    """Cost model of the moves of the selected actuators"""
+    try:
+        speed_ini, speed_fin, accel_t, pulses_per_unit = zip(*[actuator_speeds(act) for act in actuators])
+    except Exception as e:
+        logger.warning(f'No speed settings for the selected actuators, the travel is the distance: {e}')
+        return TravelCost.distance(len(actuators))
+    return TravelCost(speed_ini, speed_fin, accel_t, pulses_per_unit)
+
+
+travel_param = {'title': 'Travel cost:', 'name': 'travel_cost', 'type': 'float', 'value': 0., 'readonly': True,
+                'tip': 'Time (s) spent moving between the points, or largest axis distance if the speeds are unknown'}
+
+
+@ScannerFactory.register()
+class Scan2DSerpentine(Scan2DLinear):
+    scan_subtype = 'Serpentine'
+    params = Scan2DLinear.params + [
+        {'title': 'Fast axis:', 'name': 'fast_axis', 'type': 'list', 'limits': ['Auto', 'Ax1', 'Ax2'],
+         'value': 'Auto'},
+        travel_param,
+    ]
+
+    def __init__(self, actuators: List['DAQ_Move'] = None, **_ignored):
+        super().__init__(actuators=actuators)
+
+    def set_scan(self):
+        starts, stops, steps = self.get_pos()
+        if np.any(np.abs(steps) < 1e-12) or \
+                np.any(np.sign(stops - starts) != np.sign(steps)) or \
+                np.any(starts == stops):
+
+            return np.array([starts])
+
+        axis_1_unique = mutils.linspace_step(starts[0], stops[0], steps[0])
+        axis_2_unique = mutils.linspace_step(starts[1], stops[1], steps[1])
+        grid_1, grid_2 = np.meshgrid(axis_1_unique, axis_2_unique, indexing='ij')
+        positions = np.column_stack((grid_1.ravel(), grid_2.ravel()))
+
+        cost = travel_cost(self.actuators)
+        fast_axes = {'Auto': (1, 0), 'Ax1': (0,), 'Ax2': (1,)}[self.settings['fast_axis']]
+        orders = [serpentine_order(grid_1.shape, fast_axis) for fast_axis in fast_axes]
+        costs = [path_cost(positions, order, cost) for order in orders]
+        self.settings.child('travel_cost').setValue(min(costs))
+        self.get_info_from_positions(positions[orders[int(np.argmin(costs))]])
+
+
+@ScannerFactory.register()
+class TabularTravelOptimised(TabularScanner):
+    scan_subtype = 'TravelOptimised'
+    params = TabularScanner.params + [
+        {'title': 'Ordering:', 'name': 'ordering', 'type': 'list', 'limits': ['2-opt', 'nearest neighbour', 'none'],
+         'value': '2-opt'},
+        travel_param,
+    ]
+
+    def __init__(self, actuators: List['DAQ_Move']):
+        super().__init__(actuators=actuators)
+
+    def set_scan(self):
+        positions = np.array(self.table_model.get_data_all(), dtype=float)
+        cost = travel_cost(self.actuators)
+        if self.settings['ordering'] != 'none':
+            positions = positions[order_points(positions, cost, self.settings['ordering'])]
+        self.settings.child('travel_cost').setValue(path_cost(positions, np.arange(len(positions)), cost))
+        self.get_info_from_positions(positions)
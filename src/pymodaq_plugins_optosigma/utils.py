@@ -6,6 +6,8 @@ Created the 31/08/2023
 """
 from pathlib import Path
 
+import numpy as np
+
 from pymodaq.utils.config import BaseConfig, USER
 
 
@@ -13,3 +15,166 @@ class Config(BaseConfig):
     """Main class to deal with configuration values for this plugin"""
     config_template_path = Path(__file__).parent.joinpath('resources/config_template.toml')
     config_name = f"config_{__package__.split('pymodaq_plugins_')[1]}"
+
+
+def polling_params():
+    """Parameter group to configure the PollingStrategy of a driver from a DAQ_Move plugin"""
+    from pymodaq_plugins_optosigma.hardware.polling import PollingStrategy
+    default = PollingStrategy()
+    return {'title': 'Status polling:', 'name': 'polling', 'type': 'group', 'expanded': False, 'children': [
+        {'title': 'Min interval (s):', 'name': 'min_interval', 'type': 'float', 'value': default.min_interval,
+         'min': 0.},
+        {'title': 'Max interval (s):', 'name': 'max_interval', 'type': 'float', 'value': default.max_interval,
+         'min': 0.},
+        {'title': 'Backoff factor:', 'name': 'backoff', 'type': 'float', 'value': default.backoff, 'min': 1.},
+        {'title': 'Timeout factor:', 'name': 'timeout_factor', 'type': 'float', 'value': default.timeout_factor,
+         'min': 1.},
+        {'title': 'Timeout margin (s):', 'name': 'timeout_margin', 'type': 'float', 'value': default.timeout_margin,
+         'min': 0.},
+        {'title': 'Default timeout (s):', 'name': 'default_timeout', 'type': 'float',
+         'value': default.default_timeout, 'min': 0.},
+    ]}
+
+
+def polling_settings(settings):
+    """Return the values of the polling group of a plugin settings as a dict"""
+    return {child.name(): child.value() for child in settings.child('polling').children()}
+
+
+def multi_move_params(axis_names):
+    """Parameter group to move several axes of a controller at once with a single drive command"""
+    children = [{'title': f'{name} target:', 'name': name, 'type': 'float', 'value': 0.} for name in axis_names]
+    children.append({'title': 'Move all axes:', 'name': 'move_axes', 'type': 'bool_push', 'label': 'Move',
+                     'value': False})
+    return {'title': 'Multi-axis move:', 'name': 'multi_move', 'type': 'group', 'expanded': False,
+            'children': children}
+
+
+def home_all_params():
+    """Action homing all the axes of the controller at once, the origin returns running in parallel"""
+    return {'title': 'Home all axes:', 'name': 'home_all', 'type': 'bool_push', 'label': 'Home all', 'value': False,
+            'tip': 'Origin return of all the axes of the controller at once, waiting for all of them'}
+
+
+def homing_required_params():
+    """Read-only parameter listing the axes of the controller whose position was not restored at the start (see
+    hardware.state), which have to be homed before their positions can be trusted"""
+    return {'title': 'Axes to home:', 'name': 'homing_required', 'type': 'str', 'value': '', 'readonly': True,
+            'tip': 'Channels whose position was not restored from the last session, cleared once they are homed'}
+
+
+def show_homing_required(settings, driver):
+    """Show the channels of the driver still to be homed in the homing_required parameter of a plugin"""
+    channels = driver.persisted.homing_required
+    settings.child('homing_required').setValue(', '.join(str(channel) for channel in channels) or 'none')
+
+
+def show_driver_settings(settings, values):
+    """Show in the settings of a plugin the values held by its driver, given as {parameter name: value}, for instance
+    after the warm start restored them (see hardware.state). The values never set (negative) are skipped."""
+    for name, value in values.items():
+        if isinstance(value, str) or value >= 0:
+            settings.child(name).setValue(value)
+
+
+def status_params():
+    """Parameter setting the time during which the cached status of the controller is reused (see hardware.status)"""
+    from pymodaq_plugins_optosigma.hardware.status import StatusCache
+    return {'title': 'Status cache TTL (s):', 'name': 'status_ttl', 'type': 'float',
+            'value': StatusCache(None).ttl, 'min': 0.}
+
+
+def scale_waypoints(settings, waypoints):
+    """Apply the bounds and the scaling of a DAQ_Move plugin settings to an array of waypoints at once
+
+    Returns the waypoints in the controller units and True if some of them have been coerced within the bounds
+    """
+    waypoints = np.asarray(waypoints, dtype=float)
+    clipped = False
+    if settings['bounds', 'is_bounds']:
+        coerced = np.clip(waypoints, settings['bounds', 'min_bound'], settings['bounds', 'max_bound'])
+        clipped = bool(np.any(coerced != waypoints))
+        waypoints = coerced
+    if settings['scaling', 'use_scaling']:
+        waypoints = waypoints / settings['scaling', 'scaling'] + settings['scaling', 'offset']
+    return waypoints, clipped
+
+
+def move_mode_params():
+    """Parameter choosing whether move_abs and move_rel return as soon as the command is sent, the end of the motion
+    being then detected by the polling loop of DAQ_Move, or wait for the end of the motion"""
+    return {'title': 'Non-blocking moves:', 'name': 'non_blocking', 'type': 'bool', 'value': False,
+            'tip': 'The plugin thread stays free to stop the motion or to serve other axes while moving'}
+
+
+def stats_params():
+    """Parameter group enabling the timing statistics of the driver (see hardware.instrumentation) and showing them"""
+    return {'title': 'Command statistics:', 'name': 'stats', 'type': 'group', 'expanded': False, 'children': [
+        {'title': 'Enabled:', 'name': 'stats_enabled', 'type': 'bool', 'value': False,
+         'tip': 'Record the latency of every command sent to the controller'},
+        {'title': 'Refresh:', 'name': 'refresh_stats', 'type': 'bool_push', 'label': 'Refresh', 'value': False},
+        {'title': 'Reset:', 'name': 'reset_stats', 'type': 'bool_push', 'label': 'Reset', 'value': False},
+        {'title': 'Commands:', 'name': 'commands', 'type': 'int', 'value': 0, 'readonly': True},
+        {'title': 'Bytes sent:', 'name': 'bytes_sent', 'type': 'int', 'value': 0, 'readonly': True},
+        {'title': 'Bytes received:', 'name': 'bytes_received', 'type': 'int', 'value': 0, 'readonly': True},
+        {'title': 'Waits:', 'name': 'waits', 'type': 'int', 'value': 0, 'readonly': True},
+        {'title': 'Polls per wait:', 'name': 'polls_per_wait', 'type': 'float', 'value': 0., 'readonly': True},
+        {'title': 'Wait time (s):', 'name': 'wait_time', 'type': 'float', 'value': 0., 'readonly': True},
+        {'title': 'Latencies:', 'name': 'latencies', 'type': 'text', 'value': '', 'readonly': True},
+    ]}
+
+
+def update_stats(settings, instrumentation):
+    """Show the statistics of an Instrumentation in the stats group of a plugin settings"""
+    summary = instrumentation.summary()
+    for name in ('commands', 'bytes_sent', 'bytes_received', 'waits', 'polls_per_wait', 'wait_time'):
+        settings.child('stats', name).setValue(summary[name])
+    settings.child('stats', 'latencies').setValue(instrumentation.report())
+
+
+def commit_stats(settings, param, instrumentation):
+    """Apply a change of the stats group of a plugin settings to the Instrumentation of its driver"""
+    if param.name() == 'stats_enabled':
+        instrumentation.enable(param.value())
+    elif param.name() == 'reset_stats' and param.value():
+        instrumentation.reset()
+        param.setValue(False)
+    elif param.name() == 'refresh_stats' and param.value():
+        param.setValue(False)
+    else:
+        return
+    update_stats(settings, instrumentation)
+
+
+def line_params():
+    """Parameter group of the serial line: baud rate negotiation at the first connection (see hardware.line) and
+    baud rate in use"""
+    from pymodaq_plugins_optosigma import config
+    return {'title': 'Serial line:', 'name': 'line', 'type': 'group', 'expanded': False, 'children': [
+        {'title': 'Negotiate baud rate:', 'name': 'negotiate', 'type': 'bool', 'value': config('line', 'negotiate'),
+         'tip': 'Probe the baud rates if none has been stored for this address in the configuration file'},
+        {'title': 'Baud rate:', 'name': 'baud_rate', 'type': 'int', 'value': 0, 'readonly': True},
+    ]}
+
+
+def status_data(name, status, axis_names):
+    """DataToExport of a StatusSnapshot for a 0D viewer: the position of every axis, their ready flags and the error
+    flag of the controller (1 if its error code is not the normal one)"""
+    from pymodaq.utils.data import DataFromPlugins, DataToExport
+    return DataToExport(name, data=[
+        DataFromPlugins(name='Positions', data=[np.array([position], dtype=float) for position in status.positions],
+                        dim='Data0D', labels=list(axis_names)),
+        DataFromPlugins(name='Ready', data=[np.array([float(ready)]) for ready in status.ready], dim='Data0D',
+                        labels=list(axis_names)),
+        DataFromPlugins(name='Error', data=[np.array([float(status.error != 'K')])], dim='Data0D',
+                        labels=['error']),
+    ])
+
+
+def warm_start_message(driver) -> str:
+    """Warm start a driver which has just been connected (see hardware.state) and describe the result for the status
+    bar of the plugin"""
+    channels = driver.warm_start()
+    if not channels:
+        return f'{driver.rsrc_name}: state of the last session restored, no homing needed'
+    return f"{driver.rsrc_name}: axes {', '.join(str(channel) for channel in channels)} to be homed"
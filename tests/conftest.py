@@ -0,0 +1,10 @@
+import pytest
+
+from pymodaq_plugins_optosigma.hardware import simulator
+
+
+@pytest.fixture(autouse=True)
+def fresh_simulators():
+    simulator.clear_simulators()
+    yield
+    simulator.clear_simulators()
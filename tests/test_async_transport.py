@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+import pytest
+
+from pymodaq_plugins_optosigma.hardware.async_transport import AsyncDriver, SyncDriver, run_concurrently
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+
+
+class FakeGSCResource:
+    """Each G: keeps the controller busy for move_time seconds."""
+
+    def __init__(self, move_time=0.1):
+        self.move_time = move_time
+        self.busy_until = 0.
+        self.written = []
+
+    def write(self, cmd):
+        self.written.append(cmd)
+        if cmd in ('G:',) or cmd.startswith('H:'):
+            self.busy_until = time.perf_counter() + self.move_time
+
+    def query(self, cmd):
+        return 'B' if time.perf_counter() < self.busy_until else 'R'
+
+
+def make_driver(name, move_time=0.1):
+    driver = GSC(name)
+    driver._actuator = FakeGSCResource(move_time)
+    return driver
+
+
+def test_async_move_updates_position():
+    adriver = AsyncDriver(make_driver('fake1'))
+    asyncio.run(adriver.move(-1000, 2))
+    assert adriver.driver.position == [0, -1000]
+    assert adriver.driver._actuator.written == ['A:2-P1000', 'G:']
+    asyncio.run(adriver.move_relative(500, 2))
+    assert adriver.driver.position == [0, -500]
+
+
+def test_controllers_move_concurrently():
+    drivers = [SyncDriver(make_driver(f'fake{ind}', 0.2)) for ind in range(3)]
+    for driver in drivers:
+        driver.async_driver.driver.polling.update(min_interval=0.005, max_interval=0.02)
+    time0 = time.perf_counter()
+    run_concurrently(*[driver.async_driver.move(100, 1) for driver in drivers])
+    assert time.perf_counter() - time0 == pytest.approx(0.2, abs=0.15)
+    for driver in drivers:
+        assert driver.read_state(1) == 'R'
+        assert driver.async_driver.driver.position[0] == 100
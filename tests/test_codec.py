@@ -0,0 +1,45 @@
+import pytest
+
+from pymodaq_plugins_optosigma.hardware.codec import GSCCodec, ProtocolError, RMCCodec, SBIS26Codec, \
+    SHRC203Codec, decode_shrc_status, parse_q_reply
+from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import AxisError
+
+
+def test_encoders():
+    assert SHRC203Codec('P').move(1, -300) == 'A:1-P300'
+    assert SHRC203Codec('U').move_axes({1: 10, 3: 20}) == ['A:1+U10', 'A:3+U20', 'G:']
+    assert GSCCodec().move(2, 100, relative=True) == 'M:2+P100'
+    assert GSCCodec().speed(1, 500, 5000, 100) == 'D:1S500F5000R100'
+    assert RMCCodec().speed(2, 8) == 'D:2J8'
+    assert SBIS26Codec().move(1, -50) == 'A:D,1,-50'
+    assert SBIS26Codec().move_axes({2: 50}) == ['A:D,2,+50']
+    assert GSCCodec().encode(['A:1+P1', 'G:']) == b'A:1+P1\r\nG:\r\n'
+
+
+def test_parsers():
+    assert parse_q_reply('+    10000,-      250,K,K,R', 2) == ([10000, -250], ['K', 'K', 'R'])
+    assert SHRC203Codec().parse_speed('S100F1000R50') == (100, 1000, 50)
+    assert RMCCodec().parse_ready('R,B') == [True, False]
+    reply = SBIS26Codec().parse_status('D,2,-1500,K,B')
+    assert (reply.channel, reply.position, reply.error, reply.ready) == (2, -1500, 'K', False)
+    for parse, reply in [(lambda r: parse_q_reply(r, 2), '+10,K,K,R'),
+                         (lambda r: parse_q_reply(r, 2), '+10,abc,K,K,R'),
+                         (SHRC203Codec().parse_speed, 'S100F1000'),
+                         (RMCCodec().parse_ready, 'R'),
+                         (SBIS26Codec().parse_status, 'OK')]:
+        with pytest.raises(ProtocolError):
+            parse(reply)
+
+
+def test_shrc_status_bitfield():
+    assert decode_shrc_status('1').flags == ['Normal (S1 to S10 and emergency stop has not occurred)']
+    assert decode_shrc_status('1').ok
+    # several conditions at once, which an exact lookup of the code cannot report
+    status = decode_shrc_status('80201')
+    assert not status.ok
+    assert status.errors == ['Auto config error']
+    assert status.flags[-1] == 'CW limit detection'
+    assert decode_shrc_status('2001').warnings == ['Motor driver overheat warning (W3)']
+    assert AxisError('3').message.endswith('Command error')
+    with pytest.raises(ProtocolError):
+        decode_shrc_status('R')
@@ -0,0 +1,65 @@
+import pytest
+
+from pymodaq_plugins_optosigma.hardware import connections, transport
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.rmc_VISADriver import RMCVISADriver
+
+
+def test_shared_driver_is_closed_by_the_last_user():
+    first = connections.acquire(GSC, 'SIM::GSC')
+    second = connections.acquire(GSC, 'SIM::GSC')
+    assert first is second
+    connections.retain(first)
+    assert connections.users('SIM::GSC') == 3
+    with pytest.raises(ValueError):
+        connections.acquire(RMCVISADriver, 'SIM::GSC')
+
+    connections.release(second)
+    connections.release(first)
+    assert first._actuator is not None
+    connections.release(first)
+    assert first._actuator is None
+    assert connections.users('SIM::GSC') == 0
+    driver = connections.acquire(GSC, 'SIM::GSC')
+    assert driver is not first
+    connections.release(driver)
+    assert connections.users('SIM::GSC') == 0
+
+
+def test_single_resource_manager(monkeypatch):
+    created = []
+
+    class FakeResourceManager:
+        def __init__(self):
+            created.append(self)
+
+        def open_resource(self, name):
+            return name
+
+    monkeypatch.setattr(transport.pyvisa, 'ResourceManager', FakeResourceManager)
+    monkeypatch.setattr(transport, '_resource_manager', None)
+    assert transport.open_resource('ASRL1::INSTR') == 'ASRL1::INSTR'
+    transport.open_resource('ASRL2::INSTR')
+    assert len(created) == 1
+
+
+def test_failed_open_is_not_registered(monkeypatch):
+    def open_line(*args, **kwargs):
+        raise IOError('no such port')
+
+    monkeypatch.setattr('pymodaq_plugins_optosigma.hardware.base.open_line', open_line)
+    for _ in range(2):
+        with pytest.raises(IOError):
+            connections.acquire(GSC, 'ASRL99::INSTR')
+        assert connections.users('ASRL99::INSTR') == 0
+
+
+def test_plugin_reports_a_failed_connection(monkeypatch):
+    from pymodaq_plugins_optosigma.daq_move_plugins.daq_move_GSC import DAQ_Move_GSC
+    monkeypatch.setattr('pymodaq_plugins_optosigma.hardware.base.open_line',
+                        lambda *args, **kwargs: (_ for _ in ()).throw(IOError('no such port')))
+    plugin = DAQ_Move_GSC(None, None)
+    plugin.settings.child('visa_name').setValue('ASRL99::INSTR')
+    info, initialized = plugin.ini_stage()
+    assert not initialized and 'no such port' in info
+    plugin.close()
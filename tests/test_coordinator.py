@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+from pymodaq_plugins_optosigma.hardware import connections, simulator
+from pymodaq_plugins_optosigma.hardware.coordinator import CoordinatedMoveError, Coordinator
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.rmc_VISADriver import RMCVISADriver
+from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver
+
+
+AXES = {'x': (GSC, 'SIM::GSC::clock=real', 1),
+        'y': (GSC, 'SIM::GSC::clock=real', 2),
+        'focus': (RMCVISADriver, 'SIM::RMC::clock=real', 1),
+        'theta': (SHRC203VISADriver, 'SIM::SHRC203::clock=real', 3)}
+
+
+def test_moves_last_as_long_as_the_longest():
+    stage = Coordinator.open(AXES)
+    try:
+        drivers = {driver.rsrc_name: driver for driver, _ in stage.axes.values()}
+        assert connections.users('SIM::GSC::clock=real') == 1
+        for driver in drivers.values():
+            driver.polling.update(min_interval=0.005, max_interval=0.02)
+        # about 0.3 s for each controller with the default simulated speeds
+        targets = {'x': 1200, 'y': 600, 'focus': 1200, 'theta': 1200}
+        time0 = time.perf_counter()
+        report = stage.move(targets)
+        elapsed = time.perf_counter() - time0
+        assert report.ok
+        assert stage.positions() == targets
+        durations = {result.duration for result in report.results.values()}
+        assert report.duration == max(durations)
+        assert elapsed < 0.8 * sum(durations)
+        report = stage.move_rel({'focus': -200})
+        assert stage.positions()['focus'] == 1000
+    finally:
+        stage.close()
+    assert connections.users('SIM::GSC::clock=real') == 0
+
+
+def test_shared_timeout_and_error_report():
+    gsc = GSC('SIM::GSC')
+    gsc.connect()
+    rmc = RMCVISADriver('SIM::RMC')
+    stage = Coordinator({'x': (gsc, 1), 'focus': (rmc, 1)}, timeout=0.1)
+    try:
+        with pytest.raises(CoordinatedMoveError) as error:
+            stage.move({'x': 50000, 'focus': 1000})
+        report = error.value.report
+        assert report.timeout == 0.1
+        assert report.results['x'].error.startswith('timeout')
+        # the RMC has not been connected
+        assert 'AttributeError' in report.results['focus'].error
+        assert gsc.position[0] == 0
+        assert 'L:1' in simulator.open_simulator('SIM::GSC').commands
+        stage.timeout = None
+        report = stage.move({'x': 100}, raise_errors=False)
+        assert report.ok
+    finally:
+        stage.close()
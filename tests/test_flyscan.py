@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from pymodaq_plugins_optosigma.hardware.flyscan import FlyScan, run_up_distance
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver
+
+
+def test_sweep_at_constant_velocity():
+    driver = GSC('SIM::GSC')
+    driver.connect()
+    driver.set_speed(500, 5000, 100, 1)
+    device = driver._actuator.resource
+    scan = driver.fly_scan(0, 10000, velocity=2000, channel=1, rate=20)
+    assert scan.origin == -run_up_distance(2000, 500, 100)
+    assert scan.wait()
+    assert device.commands.count('G:') == 2
+    times, positions = scan.times, scan.positions
+    assert np.shares_memory(scan.data, scan.buffer)
+    assert np.all(np.diff(times) > 0)
+    assert scan.count > 0.9 * 20 * (scan.target - scan.origin) / 2000
+    # constant velocity through the range
+    inside = (positions >= 0) & (positions <= 10000)
+    velocity = np.polyfit(times[inside], positions[inside], 1)[0]
+    assert velocity == pytest.approx(2000, rel=0.01)
+    middle = times[inside][0] + 2.5
+    assert scan.interpolate([middle])[0] == pytest.approx(positions[inside][0] + 5000, abs=20)
+    # the speed settings are restored after the sweep
+    assert device.axes[0].speed_fin == 5000
+    assert driver.position[0] == scan.target
+
+
+def test_abort():
+    # on the virtual clock the sweep could be over before being aborted
+    driver = SHRC203VISADriver('SIM::SHRC203::clock=real')
+    driver.open_connection()
+    driver.set_speed(500, 5000, 100, 2)
+    scan = driver.fly_scan(0, 100000, velocity=1000, channel=2, rate=50)
+    while scan.count < 10 and not scan.done:
+        pass
+    scan.abort()
+    assert not scan.wait()
+    assert scan.data[-1, 1] < 100000
+    assert driver.position[1] == pytest.approx(scan.data[-1, 1], abs=100)
+
+
+def test_speed_settings_required():
+    driver = GSC('SIM::GSC')
+    driver.connect()
+    # never set: a sweep would leave the axis with a null maximum speed
+    with pytest.raises(ValueError):
+        driver.fly_scan(0, 1000, velocity=500, channel=1)
+    driver.close()
+    driver = SHRC203VISADriver('SIM::SHRC203')
+    driver.open_connection()
+    driver.set_speed(500, 5000, 100, 1)
+    with pytest.raises(ValueError):
+        driver.fly_scan(0, 1000, velocity=500, channel=2)
+    # the speed of the sweep is refused by set_speed: the sweep does not start
+    scan = FlyScan(driver, 1, 0, 1000, velocity=500)
+    scan.sweep_speeds = (500, 400, 100)
+    with pytest.raises(ValueError):
+        scan.run()
+    assert driver.speed_fin[0] == 5000
+    driver.close()
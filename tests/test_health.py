@@ -0,0 +1,80 @@
+import pytest
+
+from pymodaq_plugins_optosigma.hardware import simulator
+from pymodaq_plugins_optosigma.hardware.codec import ProtocolError
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.health import Condition, HealthMonitor
+from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.
+
+    def time(self):
+        return self.now
+
+    def sleep(self, duration):
+        self.now += duration
+
+
+def test_rate_limit_and_events():
+    driver = GSC('SIM::GSC')
+    driver.connect()
+    events = []
+    driver.health.subscribe(events.append)
+    device = simulator.open_simulator('SIM::GSC')
+    assert driver.check_error() == 'Normal'
+    queries = device.commands.count('Q:')
+    device.error = 'X'
+    # within min_interval, the conditions read last are returned without any query
+    assert driver.check_error() == 'Normal'
+    assert device.commands.count('Q:') == queries
+    driver._actuator.clock.sleep(driver.health.min_interval)
+    assert driver.check_error() == 'Command or parameter errors'
+    event, = events
+    assert (event.source, event.severity, event.code) == ('SIM::GSC', 'error', 'X')
+    # no new event while the condition lasts, an info event when it is cleared
+    device.error = 'K'
+    driver.health.check(force=True)
+    assert [event.severity for event in events] == ['error', 'info']
+    assert list(driver.health.events) == events
+    driver.close()
+
+
+def test_shrc_error_bits():
+    driver = SHRC203VISADriver('SIM::SHRC203')
+    driver.open_connection()
+    simulator.open_simulator('SIM::SHRC203').error = 'X'
+    conditions = driver.health.check(2)
+    assert conditions == [Condition('error', '2', 'Command error')]
+    assert driver.check_error(2) == 'Command error'
+    assert driver.health.conditions(1) == []
+
+
+def test_bounded_retries_and_backoff():
+    attempts = []
+
+    def read(channel):
+        attempts.append(channel)
+        if channel == 2:
+            raise ProtocolError('no reply')
+        return []
+
+    clock = FakeClock()
+    monitor = HealthMonitor('SIM::SHRC203', read, min_interval=1., max_interval=4., retries=3, retry_delay=0.1)
+    monitor.clock = clock
+    condition, = monitor.check(2)
+    assert (condition.severity, condition.code) == ('error', 'no_reply')
+    assert attempts == [2, 2, 2]
+    assert clock.now == pytest.approx(0.2)
+    # the other axes are still read, the faulty one less and less often
+    assert monitor.check(1) == [] and attempts[-1] == 1
+    assert monitor.interval(2) == 2.
+    clock.sleep(1.5)
+    monitor.check(2)
+    assert attempts.count(2) == 3
+    for _ in range(4):
+        monitor.check(2, force=True)
+    assert monitor.interval(2) == 4.
+    assert len(monitor.events) == 1
@@ -0,0 +1,54 @@
+from pymodaq_plugins_optosigma.hardware import simulator
+from pymodaq_plugins_optosigma.hardware.codec import SBIS26Codec, SHRC203Codec
+from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver
+
+
+def test_home_axes_commands():
+    assert SHRC203Codec().home_axes([3, 1, 2]) == ['H:W']
+    assert SHRC203Codec().home_axes([1, 3]) == ['H:1', 'H:3']
+    assert SBIS26Codec().home_axes([1, 2]) == ['H:D,1', 'H:D,2']
+
+
+def test_axes_homed_in_parallel():
+    driver = SHRC203VISADriver('SIM::SHRC203')
+    driver.open_connection()
+    clock = driver._instr.clock
+    targets = {1: 1000, 2: 2000, 3: 3000}
+    driver.move_axes(targets)
+    time0 = clock.time()
+    for channel in targets:
+        driver.home(channel)
+    one_by_one = clock.time() - time0
+
+    driver.move_axes(targets)
+    device = simulator.open_simulator('SIM::SHRC203')
+    commands = len(device.commands)
+    time0 = clock.time()
+    driver.home_all()
+    # the longest origin return only, with a single command
+    assert clock.time() - time0 < 0.7 * one_by_one
+    assert [command for command in device.commands[commands:] if command.startswith('H:')] == ['H:W']
+    assert driver.read_status().positions == [0, 0, 0]
+    assert driver.persisted.homing_required == []
+
+    driver.move_axes(targets)
+    driver.home_axes([1, 3])
+    assert driver.read_status().positions == [0, 2000, 0]
+    driver.close()
+
+
+def test_plugin_home_all():
+    from pymodaq_plugins_optosigma.daq_move_plugins.daq_move_RMC import DAQ_Move_RMC
+    plugin = DAQ_Move_RMC(None, None)
+    plugin.settings.child('visa_name').setValue('SIM::RMC')
+    plugin.ini_stage()
+    plugin.controller.move_axes({1: 500, 2: 800})
+    device = simulator.open_simulator('SIM::RMC')
+    commands = len(device.commands)
+    home_all = plugin.settings.child('home_all')
+    home_all.setValue(True)
+    plugin.commit_settings(home_all)
+    assert 'H:W' in device.commands[commands:]
+    assert plugin.controller.read_status().positions == [0, 0]
+    assert not plugin.settings['home_all']
+    plugin.close()
@@ -0,0 +1,70 @@
+import pytest
+
+from pymodaq_plugins_optosigma.hardware.instrumentation import Instrumentation, LatencyHistogram, command_key
+from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver
+
+
+def test_command_key():
+    assert command_key('A:1+P100') == 'A:'
+    assert command_key('SRQ:D,1') == 'SRQ:'
+    assert command_key('#CONNECT') == '#CONNECT'
+
+
+def test_histogram():
+    histogram = LatencyHistogram()
+    for duration in [0.001] * 90 + [0.1] * 10:
+        histogram.add(duration)
+    assert histogram.count == 100
+    assert histogram.mean == pytest.approx(0.0109)
+    assert 0.001 <= histogram.percentile(50) < 0.0014
+    assert histogram.percentile(95) == pytest.approx(0.1)
+    assert histogram.max == 0.1
+
+
+def test_disabled_by_default():
+    driver = SHRC203VISADriver('SIM::SHRC203')
+    driver.open_connection()
+    driver.move(1000, 1)
+    assert driver._instr.instrumentation is None and driver.polling.instrumentation is None
+    assert driver.instrumentation.summary()['commands'] == 0
+
+
+def test_driver_stats():
+    driver = SHRC203VISADriver('SIM::SHRC203')
+    driver.open_connection()
+    driver.instrumentation.enable()
+    driver.move(1000, 1)
+    summary = driver.instrumentation.summary()
+    assert summary['waits'] == 1 and summary['timeouts'] == 0
+    assert summary['polls_per_wait'] == summary['polls'] == summary['max_polls'] >= 1 and summary['wait_time'] > 0
+    assert isinstance(summary['polls'], int)
+    assert summary['bytes_sent'] == driver._instr.bytes_sent
+    assert summary['bytes_received'] == driver._instr.bytes_received
+    assert {'A:', 'G:', '!:'} <= set(summary['latency'])
+    # the round trip of the queries is timed with the clock of the simulator, which advances with the transfers
+    assert summary['latency']['!:']['mean'] > 0
+    assert '!:' in driver.instrumentation.report()
+
+    driver.instrumentation.enable(False)
+    driver.move(0, 1)
+    assert driver.instrumentation.summary()['waits'] == 1
+    driver.instrumentation.reset()
+    assert driver.instrumentation.summary()['commands'] == 0
+
+
+def test_plugin_stats_group():
+    from pymodaq_plugins_optosigma.daq_move_plugins.daq_move_SHRC203 import DAQ_Move_SHRC203
+    plugin = DAQ_Move_SHRC203(None, None)
+    plugin.settings.child('visa_name').setValue('SIM::SHRC203')
+    plugin.ini_stage()
+    enabled = plugin.settings.child('stats', 'stats_enabled')
+    enabled.setValue(True)
+    plugin.commit_settings(enabled)
+    plugin.stage.move(500, 1)
+    refresh = plugin.settings.child('stats', 'refresh_stats')
+    refresh.setValue(True)
+    plugin.commit_settings(refresh)
+    assert plugin.settings['stats', 'commands'] > 0
+    assert plugin.settings['stats', 'waits'] == 1
+    assert 'G:' in plugin.settings['stats', 'latencies']
+    plugin.close()
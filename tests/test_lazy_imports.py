@@ -0,0 +1,35 @@
+import importlib
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+PACKAGE = 'pymodaq_plugins_optosigma'
+MODELS = ('GSC', 'RMC', 'SHRC203', 'SBIS26')
+
+SCRIPT = """
+import importlib, json, sys
+for model in {models!r}:
+    importlib.import_module(f'{package}.daq_move_plugins.daq_move_{{model}}')
+    importlib.import_module(f'{package}.daq_viewer_plugins.plugins_0D.daq_0Dviewer_{{model}}')
+print(json.dumps([name for name in sys.modules if name == 'pyvisa' or name.endswith('VISADriver')]))
+"""
+
+
+def test_plugin_discovery_does_not_load_the_drivers():
+    # fresh interpreter, the test session has already imported the drivers
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(Path(__file__).parents[1] / 'src'),
+                                                       os.environ.get('PYTHONPATH', '')]))
+    output = subprocess.run([sys.executable, '-c', SCRIPT.format(models=MODELS, package=PACKAGE)],
+                            capture_output=True, text=True, check=True, env=env).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == []
+
+
+def test_plugin_modules_as_package_attributes():
+    move_plugins = importlib.import_module(f'{PACKAGE}.daq_move_plugins')
+    assert move_plugins.daq_move_GSC.DAQ_Move_GSC.__name__ == 'DAQ_Move_GSC'
+    with pytest.raises(AttributeError):
+        move_plugins.daq_move_XYZ
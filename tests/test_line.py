@@ -0,0 +1,78 @@
+import pytest
+
+from pymodaq_plugins_optosigma import config
+from pymodaq_plugins_optosigma.hardware import line, simulator
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.sbis26_VISADriver import SBIS26VISADriver
+
+
+@pytest.fixture
+def baud_rates(monkeypatch):
+    """Keep the negotiated rates in memory instead of the configuration file"""
+    monkeypatch.setattr(config, 'save', lambda: None)
+    stored = dict(config('line', 'baud_rates'))
+    config['line', 'baud_rates'] = {}
+    yield config('line', 'baud_rates')
+    config['line', 'baud_rates'] = stored
+
+
+def test_line_settings_from_config():
+    driver = SBIS26VISADriver('SIM::SBIS26')
+    driver.connect(negotiate=False)
+    assert driver._stage.baud_rate == config('line', 'SBIS26', 'baud_rate') == 38400
+    assert driver._stage.data_bits == 8
+
+
+def test_negotiation_is_stored_and_reused(baud_rates):
+    name = 'SIM::GSC::baud_rate=19200'
+    driver = GSC(name)
+    driver.connect(negotiate=True)
+    assert driver._actuator.baud_rate == 19200
+    assert baud_rates[name] == 19200
+    driver.move(1000, 1)
+    assert driver.read_position(1) == 1000
+    driver.close()
+
+    device = simulator.open_simulator(name)
+    probes = len(device.commands)
+    driver = GSC(name)
+    driver.connect(negotiate=True)
+    assert driver._actuator.baud_rate == 19200
+    assert len(device.commands) == probes
+
+
+def test_fastest_rate_answering(baud_rates):
+    driver = SBIS26VISADriver('SIM::SBIS26::baud_rate=115200')
+    driver.connect(negotiate=True)
+    assert driver._stage.baud_rate == 115200
+    # a controller answering at none of the rates is opened at the default one and nothing is stored
+    driver = GSC('SIM::GSC::baud_rate=1200')
+    driver.connect(negotiate=True)
+    assert driver._actuator.baud_rate == 9600
+    assert 'SIM::GSC::baud_rate=1200' not in baud_rates
+
+
+def test_probe_rejects_invalid_replies():
+    device = simulator.open_simulator('SIM::GSC')
+    line.apply_line_settings(device, 'GSC')
+    assert line.probe(device, 'Q:', lambda reply: reply)
+    assert not line.probe(device, '!:', GSC('').codec.parse_status)
+
+
+def test_sbis26_probed_after_connect(baud_rates):
+    name = 'SIM::SBIS26::baud_rate=115200'
+    driver = SBIS26VISADriver(name)
+    driver.connect(negotiate=True)
+    device = simulator.open_simulator(name)
+    commands = device.commands[device.commands.index('#CONNECT'):]
+    assert commands[:2] == ['#CONNECT', driver.codec.status(1)]
+    assert driver.read_status().all_ready
+
+
+def test_baud_rate_saved_only_when_new(monkeypatch, baud_rates):
+    saves = []
+    monkeypatch.setattr(config, 'save', lambda: saves.append(1))
+    assert line.store_baud_rate('ASRL4::INSTR', 19200)
+    assert not line.store_baud_rate('ASRL4::INSTR', 19200)
+    assert line.store_baud_rate('ASRL4::INSTR', 38400)
+    assert len(saves) == 2
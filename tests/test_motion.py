@@ -0,0 +1,62 @@
+import pytest
+
+from pymodaq_plugins_optosigma import config
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.motion import AxisModel, MotionModels
+from pymodaq_plugins_optosigma.hardware.polling import trapezoid_duration
+from pymodaq_plugins_optosigma.hardware.rmc_VISADriver import RMCVISADriver
+
+
+def test_least_squares_fit():
+    model = AxisModel()
+    for base in [0.1, 0.5, 1., 2., 0.3, 1.5] * 5:
+        model.observe(base, 0.05 + 1.2 * base)
+    assert model.offset == pytest.approx(0.05, abs=0.01)
+    assert model.gain == pytest.approx(1.2, abs=0.02)
+    assert model.count == 30
+
+
+def test_driver_learns_the_move_durations():
+    driver = GSC('SIM::GSC')
+    driver.connect()
+    driver.set_speed(500, 5000, 100, 1)
+    clock = driver._actuator.clock
+    for target in [2000, 0, 5000, 1000, 8000, 0]:
+        expected = driver.expected_duration(target - driver.position[0], 1)
+        time0 = clock.time()
+        driver.move(target, 1)
+        duration = clock.time() - time0
+    model = driver.motion.models[(1, 'trapezoid')]
+    assert model.count == 6
+    # the durations measured include the latency of the commands, learned as the offset
+    assert model.offset > 0
+    assert expected == pytest.approx(duration, abs=0.02)
+
+
+def test_average_speed_without_speed_settings():
+    driver = RMCVISADriver('SIM::RMC')
+    driver.connect()
+    assert driver.expected_duration(1000, 1) is None
+    driver.move(1000, 1)
+    driver.move(0, 1)
+    clock = driver._actuator.clock
+    expected = driver.expected_duration(2000, 1)
+    time0 = clock.time()
+    driver.move(2000, 1)
+    assert expected == pytest.approx(clock.time() - time0, rel=0.2)
+    # the timeout follows the length of the move instead of the default one
+    assert driver.polling.timeout(expected) < driver.polling.default_timeout
+
+
+def test_models_persist(monkeypatch):
+    monkeypatch.setattr(config, 'save', lambda: None)
+    stored = dict(config('motion', 'models'))
+    try:
+        models = MotionModels('TEST::INSTR', lambda channel: (500, 5000, 100))
+        models.model(2, 'trapezoid').observe(trapezoid_duration(1000, 500, 5000, 100), 0.5)
+        models.save()
+        loaded = MotionModels('TEST::INSTR', lambda channel: (500, 5000, 100))
+        assert loaded.estimate(2, 1000) == models.estimate(2, 1000) != trapezoid_duration(1000, 500, 5000, 100)
+        assert MotionModels('TEST::INSTR', persist=False).models == {}
+    finally:
+        config['motion', 'models'] = stored
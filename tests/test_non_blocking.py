@@ -0,0 +1,38 @@
+import time
+
+from pymodaq.utils.data import DataActuator
+
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.polling import trapezoid_duration
+
+
+def test_driver_move_without_wait():
+    driver = GSC('SIM::GSC')
+    driver.connect()
+    clock = driver._actuator.clock
+    time0 = clock.time()
+    driver.move(10000, 1, wait=False)
+    assert clock.time() - time0 < 0.1
+    assert not driver.get_status().is_ready(1)
+    clock.sleep(trapezoid_duration(10000, 500, 5000, 100) / 2)
+    driver.stop(1)
+    assert driver.get_status().all_ready
+    # the position kept by the driver follows the actual one once the axis is ready
+    assert driver.position[0] == driver.read_position(1) < 10000
+
+
+def test_plugin_move_is_completed_by_the_polling(qtbot):
+    from pymodaq_plugins_optosigma.daq_move_plugins.daq_move_GSC import DAQ_Move_GSC
+    plugin = DAQ_Move_GSC(None, None)
+    plugin.settings.child('visa_name').setValue('SIM::GSC::clock=real')
+    assert not plugin.settings['non_blocking']
+    plugin.settings.child('non_blocking').setValue(True)
+    plugin.ini_stage()
+    plugin.ispolling = True
+    time0 = time.perf_counter()
+    with qtbot.waitSignal(plugin.move_done_signal, timeout=5000) as blocker:
+        plugin.move_abs(DataActuator(data=3000.))
+        assert time.perf_counter() - time0 < trapezoid_duration(3000, 500, 5000, 100)
+        plugin.poll_moving()
+    assert blocker.args[0].value() == 3000
+    plugin.close()
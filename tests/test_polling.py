@@ -0,0 +1,45 @@
+import pytest
+
+from pymodaq_plugins_optosigma.hardware.polling import PollingStrategy, trapezoid_duration
+
+
+class StepClock:
+    def __init__(self):
+        self.now = 0.
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, duration):
+        self.sleeps.append(duration)
+        self.now += duration
+
+
+def test_trapezoid_duration():
+    assert trapezoid_duration(0, 100, 1000, 100) == 0.
+    assert trapezoid_duration(1000, -1, -1, -1) is None
+    assert trapezoid_duration(1000, 1000, 1000, 100) == pytest.approx(1.)
+    # ramps cover (100 + 1000) * 0.1 = 110 pulses, then 890 pulses at full speed
+    assert trapezoid_duration(-1000, 100, 1000, 100) == pytest.approx(0.2 + 0.89)
+    assert trapezoid_duration(50, 100, 1000, 100) < 0.2
+
+
+def test_polls_sparsely_then_fast_near_the_end():
+    polling = PollingStrategy(min_interval=0.01, max_interval=0.5)
+    clock = StepClock()
+    assert polling.wait(lambda: clock.now >= 2., expected=2., clock=clock)
+    assert clock.sleeps[0] == 0.5
+    assert clock.sleeps[-1] == pytest.approx(0.01)
+    assert clock.now < 2.02
+    assert len(clock.sleeps) < 20
+
+
+def test_backoff_and_timeout_when_duration_is_unknown():
+    polling = PollingStrategy(min_interval=0.01, max_interval=0.2, backoff=2., default_timeout=1.)
+    clock = StepClock()
+    assert not polling.wait(lambda: False, clock=clock)
+    assert clock.sleeps[:3] == pytest.approx([0.01, 0.02, 0.04])
+    assert max(clock.sleeps) == 0.2
+    assert clock.now == pytest.approx(1.)
+    assert polling.timeout(10.) == pytest.approx(3 * 10 + 2)
@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+import pytest
+
+from pymodaq_plugins_optosigma import config
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.recording import ReplayError
+
+
+@pytest.fixture
+def recording(tmp_path):
+    directory = config('recording', 'directory')
+    config['recording', 'directory'] = str(tmp_path)
+    yield tmp_path
+    config['recording', 'directory'] = directory
+
+
+def session(driver, waypoints):
+    driver.connect()
+    driver.set_speed(500, 5000, 100, 1)
+    driver.set_speed(500, 5000, 100, 2)
+    done = driver.run_waypoints(waypoints, [1, 2])
+    positions = driver.read_status().positions
+    driver.close()
+    return done, positions
+
+
+def record(recording, rsrc_name, waypoints):
+    result = session(GSC(rsrc_name), waypoints)
+    path, = recording.glob('*.rec.gz')
+    config['recording', 'directory'] = ''
+    return path, result
+
+
+def test_fast_replay(recording):
+    waypoints = np.array([[x, y] for y in range(0, 3000, 1000) for x in range(0, 4000, 1000)])
+    path, recorded = record(recording, 'SIM::GSC', waypoints)
+    driver = GSC(f'REPLAY::{path}::speed=fast')
+    time0 = time.perf_counter()
+    assert session(driver, waypoints) == recorded
+    # far faster than the recorded session, the time taken is the one of the drivers
+    assert time.perf_counter() - time0 < 1
+    resource = driver.status_cache.transport.resource
+    assert resource.done and resource.clock.time() > 1
+    # a change of the commands sent is caught
+    with pytest.raises(ReplayError):
+        session(GSC(f'REPLAY::{path}::speed=fast'), waypoints[::-1])
+
+
+def test_replay_at_the_original_speed(recording):
+    waypoints = np.array([[0, 0], [500, 0]])
+    path, recorded = record(recording, 'SIM::GSC::clock=real', waypoints)
+    transfers = path.read_bytes()
+    time0 = time.perf_counter()
+    assert session(GSC(f'REPLAY::{path}'), waypoints) == recorded
+    elapsed = time.perf_counter() - time0
+    # the replies come at the recorded times, the move takes about 0.3 s
+    assert 0.25 < elapsed < 1
+    assert path.read_bytes() == transfers
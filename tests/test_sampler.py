@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.sampler import RingBuffer, start_sampler
+
+
+def test_ring_buffer_views():
+    buffer = RingBuffer(4, 2)
+    assert buffer.latest() is None
+    for index in range(3):
+        buffer.append((index, 10 * index))
+    view, = buffer.views()
+    assert np.shares_memory(view, buffer.data)
+    assert view[:, 0].tolist() == [0, 1, 2]
+    written = buffer.written
+    for index in range(3, 6):
+        buffer.append((index, 10 * index))
+    older, newer = buffer.views()
+    assert older[:, 0].tolist() + newer[:, 0].tolist() == [2, 3, 4, 5]
+    assert buffer.to_array(3)[:, 0].tolist() == [3, 4, 5]
+    assert buffer.latest().tolist() == [5, 50]
+    assert len(buffer) == 4
+    # the rows read before the last appends have been overwritten
+    assert buffer.is_valid(written, 1)
+    assert not buffer.is_valid(written, 3)
+
+
+def test_sampling_during_a_move():
+    driver = GSC('SIM::GSC::clock=real')
+    driver.connect()
+    driver.set_speed(500, 5000, 100, 1)
+    sampler = driver.start_sampler(rate=100, capacity=1000)
+    time.sleep(0.05)
+    time0 = time.perf_counter()
+    driver.move(2000, 1)
+    elapsed = time.perf_counter() - time0
+    time.sleep(0.05)
+    driver.stop_sampler()
+    assert not sampler.running
+    # the move is not delayed by the sampling
+    assert elapsed < driver.expected_duration(2000, 1) + 0.15
+    samples = sampler.buffer.to_array()
+    positions = samples[:, sampler.column('position', 1)]
+    ready = samples[:, sampler.column('ready', 1)]
+    # a status query takes about 40 ms at 9600 bauds and max_duty is 0.5: about 12 samples/s
+    assert len(samples) >= 5
+    assert np.all(np.diff(samples[:, 0]) > 0)
+    assert np.all(np.diff(positions) >= 0)
+    assert positions[0] == 0 and positions[-1] == 2000
+    assert 0 in ready and ready[-1] == 1
+    driver.close()
+
+
+def test_duty_limit():
+    driver = GSC('SIM::GSC::clock=real')
+    driver.connect()
+    # the status queries take far longer than the interval asked for
+    sampler = start_sampler(driver, rate=1000, max_duty=0.2)
+    time0 = time.perf_counter()
+    time.sleep(0.5)
+    driver.close()
+    assert sampler.busy_time / (time.perf_counter() - time0) < 0.3
+    assert driver.sampler is sampler and not sampler.running
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from pymodaq_plugins_optosigma.hardware.polling import trapezoid_duration
+from pymodaq_plugins_optosigma.hardware.scan_ordering import TravelCost, order_points, path_cost, serpentine_order, \
+    trapezoid_durations
+
+
+def test_vectorized_trapezoid():
+    distances = np.array([0, 50, 100, 1000, 100000])
+    expected = [trapezoid_duration(distance, 500, 5000, 100) for distance in distances]
+    assert trapezoid_durations(distances, 500, 5000, 100) == pytest.approx(expected)
+
+
+def test_serpentine():
+    assert serpentine_order((3, 2)).tolist() == [0, 1, 3, 2, 4, 5]
+    assert serpentine_order((3, 2), fast_axis=0).tolist() == [0, 2, 4, 5, 3, 1]
+
+
+def test_cost_from_speeds():
+    cost = TravelCost(speed_ini=[500, 500], speed_fin=[5000, 1000], accel_t=[100, 100], pulses_per_unit=[2, 1])
+    assert cost.timed
+    assert cost([0, 0], [[1000, 0]])[0] == pytest.approx(trapezoid_duration(2000, 500, 5000, 100))
+    assert cost([0, 0], [[1000, 1000]])[0] == pytest.approx(trapezoid_duration(1000, 500, 1000, 100))
+    assert not TravelCost(speed_ini=[500, None], speed_fin=[5000, 8], accel_t=[100, None]).timed
+
+
+def test_ordering_reduces_the_travel():
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 10000, (200, 2))
+    cost = TravelCost(speed_ini=[500, 500], speed_fin=[5000, 5000], accel_t=[100, 100])
+    order = order_points(points, cost, 'nearest neighbour')
+    optimised = order_points(points, cost)
+    assert sorted(optimised.tolist()) == list(range(200)) and optimised[0] == 0
+    initial = path_cost(points, np.arange(200), cost)
+    assert path_cost(points, optimised, cost) <= path_cost(points, order, cost) < initial / 3
+
+
+class FakeActuator:
+    def __init__(self, title, speed_fin):
+        from pymodaq.utils.parameter import Parameter
+        from pymodaq_plugins_optosigma.daq_move_plugins.daq_move_GSC import DAQ_Move_GSC
+        self.title = title
+        self.units = ''
+        self.settings = Parameter.create(name='settings', type='group', children=[
+            {'name': 'move_settings', 'type': 'group', 'children': DAQ_Move_GSC.params}])
+        self.settings['move_settings', 'speed_fin'] = speed_fin
+
+
+def test_scanners(qtbot):
+    from pymodaq_plugins_optosigma.scanners.travel_scanners import Scan2DSerpentine, TabularTravelOptimised
+    actuators = [FakeActuator('X', 10000), FakeActuator('Y', 1000)]
+    scanner = Scan2DSerpentine(actuators)
+    scanner.settings['axis1', 'stop_axis1'] = 2000
+    scanner.settings['axis1', 'step_axis1'] = 1000
+    scanner.settings['axis2', 'stop_axis2'] = 1000
+    scanner.settings['axis2', 'step_axis2'] = 1000
+    scanner.set_scan()
+    # X is the fastest stage, hence the fast axis
+    assert scanner.positions.tolist() == [[0, 0], [1000, 0], [2000, 0], [2000, 1000], [1000, 1000], [0, 1000]]
+    assert scanner.get_scan_shape() == (3, 2)
+
+    tabular = TabularTravelOptimised(actuators)
+    tabular.update_model(init_data=np.array([[0., 0.], [3000., 0.], [1000., 0.], [2000., 0.]]))
+    tabular.set_scan()
+    assert tabular.positions[:, 0].tolist() == [0, 1000, 2000, 3000]
+    assert tabular.settings['travel_cost'] == pytest.approx(3 * trapezoid_duration(1000, 10000, 10000, 100))
@@ -0,0 +1,98 @@
+import pytest
+
+from pymodaq_plugins_optosigma.hardware import simulator
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.polling import trapezoid_duration
+from pymodaq_plugins_optosigma.hardware.rmc_VISADriver import RMCVISADriver
+from pymodaq_plugins_optosigma.hardware.sbis26_VISADriver import SBIS26VISADriver
+from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver
+
+
+def test_trapezoid_travel_is_consistent_with_duration():
+    duration = trapezoid_duration(10000, 500, 5000, 100)
+    assert simulator.trapezoid_travel(duration, 10000, 500, 5000, 100) == pytest.approx(10000)
+    assert simulator.trapezoid_travel(duration / 2, 10000, 500, 5000, 100) == pytest.approx(5000)
+    short = trapezoid_duration(100, 500, 5000, 100)
+    assert simulator.trapezoid_travel(short, 100, 500, 5000, 100) == pytest.approx(100)
+
+
+def test_same_name_same_device():
+    assert simulator.open_simulator('SIM::GSC') is simulator.open_simulator('SIM::GSC')
+    with pytest.raises(ValueError):
+        simulator.open_simulator('SIM::UNKNOWN')
+
+
+def test_gsc_move_timing():
+    driver = GSC('SIM::GSC::latency=0.002')
+    driver.connect()
+    device = driver._actuator.resource
+    driver.set_speed(500, 5000, 100, 1)
+    time0 = device.clock.time()
+    driver.move(10000, 1)
+    elapsed = device.clock.time() - time0
+    assert elapsed == pytest.approx(trapezoid_duration(10000, 500, 5000, 100), abs=0.05)
+    assert device.axes[0].position(device.now()) == 10000
+    assert device.query('Q:').split(',')[0].replace(' ', '') == '+10000'
+    driver.move_rel(-500, 1)
+    driver.home(2)
+    assert driver.position == [9500, 0]
+
+
+def test_shrc203_protocol():
+    driver = SHRC203VISADriver('SIM::SHRC203')
+    driver.open_connection()
+    driver.set_mode()
+    driver.set_unit('P')
+    driver.set_speed(100, 1000, 50, 2)
+    assert driver.get_speed(2) == (100, 1000, 50)
+    driver.set_loop(1, 2)
+    driver.move(-300, 2)
+    driver.move_relative(100, 2)
+    assert driver._instr.axes[1].position(driver._instr.now()) == -200
+    assert driver._instr.axes[1].loop == 1
+    assert driver.check_error(2).startswith('Normal')
+
+
+def test_rmc_and_sbis26_protocols():
+    rmc = RMCVISADriver('SIM::RMC')
+    rmc.connect()
+    rmc.set_mode()
+    rmc.set_speed(4, 1)
+    rmc.move(200, 1)
+    rmc.move_relative(-50, 1)
+    assert rmc._actuator.axes[0].position(rmc._actuator.now()) == 150
+
+    sbis = SBIS26VISADriver('SIM::SBIS26')
+    sbis.connect()
+    sbis.set_speed(1000, 5000, 100, 3)
+    sbis.move(-2000, 3)
+    assert sbis.is_ready(3)
+    assert sbis._stage.axes[2].position(sbis._stage.now()) == -2000
+
+
+def test_baud_rate_mismatch_gives_no_reply():
+    device = simulator.open_simulator('SIM::SBIS26')
+    device.baud_rate = 9600
+    device.write('#CONNECT')
+    with pytest.raises(simulator.SimulatorTimeout):
+        device.read()
+
+
+def test_multi_axis_move_waits_once():
+    driver = GSC('SIM::GSC')
+    driver.connect()
+    device = driver._actuator.resource
+    for channel in (1, 2):
+        driver.set_speed(500, 5000, 100, channel)
+    time0 = device.clock.time()
+    driver.move_axes({1: 10000, 2: -8000})
+    elapsed = device.clock.time() - time0
+    assert elapsed == pytest.approx(trapezoid_duration(10000, 500, 5000, 100), abs=0.05)
+    assert device.commands.count('G:') == 1
+    assert driver.position == [10000, -8000]
+    assert [axis.position(device.now()) for axis in device.axes] == [10000, -8000]
+
+    shrc = SHRC203VISADriver('SIM::SHRC203')
+    shrc.open_connection()
+    shrc.move_axes({1: 10, 2: 20, 3: 30})
+    assert [axis.position(shrc._instr.now()) for axis in shrc._instr.axes] == [10, 20, 30]
@@ -0,0 +1,94 @@
+import pytest
+
+from pymodaq_plugins_optosigma import config
+from pymodaq_plugins_optosigma.hardware import simulator
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    controllers = dict(config('state', 'controllers'))
+    monkeypatch.setattr(config, 'save', lambda: None)
+    config['state', 'controllers'] = {}
+    yield
+    config['state', 'controllers'] = controllers
+
+
+def session(driver_class, rsrc_name, connect='connect'):
+    driver = driver_class(rsrc_name)
+    driver.persisted.persist = True  # simulated controllers are not saved by default
+    getattr(driver, connect)()
+    return driver
+
+
+def test_warm_start_with_a_single_query(stored):
+    driver = session(GSC, 'SIM::GSC')
+    # nothing stored yet
+    assert driver.warm_start() == [1, 2]
+    driver.home(1)
+    driver.home(2)
+    assert driver.persisted.homing_required == []
+    driver.set_speed(400, 4000, 50, 2)
+    driver.move(1000, 1)
+    driver.move(-2000, 2)
+    driver.close()
+
+    driver = session(GSC, 'SIM::GSC')
+    device = simulator.open_simulator('SIM::GSC')
+    commands = len(device.commands)
+    assert driver.warm_start() == []
+    # the speed of the channel set in the last session is sent again, the other one was never set
+    assert device.commands[commands:] == ['Q:', driver.codec.speed(2, 400, 4000, 50)]
+    assert driver.position == [1000, -2000]
+    assert driver.speed_ini[1] == 400 and driver.accel_t[1] == 50
+    driver.close()
+
+
+def test_homing_when_the_positions_disagree(stored):
+    driver = session(SHRC203VISADriver, 'SIM::SHRC203', 'open_connection')
+    driver.warm_start()
+    driver.home(1)
+    driver.move(500, 1)
+    driver.close()
+    # controller switched off and on: its counters restarted from 0
+    simulator.clear_simulators()
+    driver = session(SHRC203VISADriver, 'SIM::SHRC203', 'open_connection')
+    assert driver.warm_start() == [1]
+    driver.home(1)
+    assert driver.persisted.homing_required == []
+    driver.close()
+
+
+def test_plugin_shows_the_restored_state(stored):
+    from pymodaq_plugins_optosigma.daq_move_plugins.daq_move_SHRC203 import DAQ_Move_SHRC203
+    driver = session(SHRC203VISADriver, 'SIM::SHRC203', 'open_connection')
+    driver.home_all()
+    driver.set_unit('mm')
+    driver.set_loop(1, 1)
+    driver.set_speed(200, 2000, 30, 1)
+    driver.move(2, 1)
+    driver.close()
+
+    plugin = DAQ_Move_SHRC203(None, None)
+    plugin.settings.child('visa_name').setValue('SIM::SHRC203')
+    plugin.ini_stage()
+    device = simulator.open_simulator('SIM::SHRC203')
+    # warm start in HOST mode, the restored settings being sent again and shown
+    assert device.commands.index('MODE:HOST') < device.commands.index('Q:')
+    assert driver.codec.speed(1, 200, 2000, 30) in device.commands
+    assert plugin.stage.unit == 'M' and plugin.settings['unit'] == 'mm' and plugin.axis_unit == 'mm'
+    assert plugin.settings['loop'] == 1 and plugin.settings['speed_fin'] == 2000
+    assert plugin.settings['homing_required'] == 'none'
+    plugin.close()
+
+
+def test_plugin_shows_the_axes_to_home(stored):
+    from pymodaq_plugins_optosigma.daq_move_plugins.daq_move_RMC import DAQ_Move_RMC
+    plugin = DAQ_Move_RMC(None, None)
+    plugin.settings.child('visa_name').setValue('SIM::RMC')
+    plugin.ini_stage()
+    assert plugin.settings['homing_required'] == '1, 2'
+    plugin.move_home()
+    assert plugin.settings['homing_required'] == '2'
+    plugin.close()
@@ -0,0 +1,53 @@
+import pytest
+
+from pymodaq_plugins_optosigma.hardware import connections
+from pymodaq_plugins_optosigma.hardware.codec import parse_q_reply
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.rmc_VISADriver import RMCVISADriver
+from pymodaq_plugins_optosigma.hardware.sbis26_VISADriver import SBIS26VISADriver
+from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver
+
+
+def test_parse_q_reply():
+    positions, acks = parse_q_reply('+    10000,-      250,K,K,R', 2)
+    assert positions == [10000, -250]
+    assert acks == ['K', 'K', 'R']
+
+
+def test_snapshot_is_shared_until_ttl_or_motion():
+    driver = connections.acquire(GSC, 'SIM::GSC')
+    shared = connections.acquire(GSC, 'SIM::GSC')
+    transport = driver._actuator
+    driver.status_cache.ttl = 0.5
+    driver.move(1000, 1)
+    transport.reset_stats()
+    assert [driver.read_position(1), shared.read_position(2), shared.read_position(1)] == [1000, 0, 1000]
+    assert transport.queries == 1
+    assert driver.status_cache.hits == 2
+
+    driver.start_move(-500, 2)
+    assert not driver.get_status().is_ready(2)
+    assert transport.queries == 2
+    transport.clock.sleep(1)
+    assert driver.get_status().positions == [1000, -500]
+    assert driver.get_status().all_ready
+    assert transport.queries == 3
+    connections.release(shared)
+    connections.release(driver)
+
+
+@pytest.mark.parametrize('driver_class, connect', [(SHRC203VISADriver, 'open_connection'), (RMCVISADriver, 'connect'),
+                                                   (SBIS26VISADriver, 'connect')])
+def test_status_is_read_in_one_transfer(driver_class, connect):
+    driver = driver_class(f'SIM::{driver_class.__name__[:-10].upper()}')
+    getattr(driver, connect)()
+    driver.start_move(200, 2)
+    transport = driver.status_cache.transport
+    transport.reset_stats()
+    status = driver.get_status()
+    assert transport.transfers == 1
+    assert status.ready[1] is False
+    transport.clock.sleep(2)
+    status = driver.get_status()
+    assert status.position(2) == 200 and status.all_ready and status.error == 'K'
+    assert transport.transfers == 2
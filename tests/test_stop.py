@@ -0,0 +1,109 @@
+import threading
+import time
+
+from pymodaq_plugins_optosigma.hardware import simulator
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.polling import MotionCancelled, PollingStrategy
+from pymodaq_plugins_optosigma.hardware.rmc_VISADriver import RMCVISADriver
+from pymodaq_plugins_optosigma.hardware.sbis26_VISADriver import SBIS26VISADriver
+from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver
+
+
+def test_cancel_only_the_waits_of_the_channels():
+    polling = PollingStrategy(max_interval=5.)
+    errors = {}
+
+    def wait(channel):
+        try:
+            polling.wait(lambda: False, channels=[channel])
+        except MotionCancelled as e:
+            errors[channel] = e
+
+    threads = [threading.Thread(target=wait, args=(channel,)) for channel in (1, 2)]
+    for thread in threads:
+        thread.start()
+    while len(polling._waits) < 2:
+        time.sleep(0.001)
+    assert polling.cancel([1]) == 1
+    threads[0].join(0.5)
+    assert not threads[0].is_alive() and list(errors) == [1]
+    polling.cancel()
+    threads[1].join(0.5)
+    assert list(errors) == [1, 2]
+
+
+def test_stop_preempts_a_blocking_move():
+    driver = SHRC203VISADriver('SIM::SHRC203::clock=real')
+    driver.open_connection()
+    driver.instrumentation.enable()
+    driver.set_speed(500, 5000, 100, 1)
+    outcome = []
+
+    def move():
+        outcome.append((driver.move(50000, 1), time.perf_counter()))
+
+    thread = threading.Thread(target=move)
+    thread.start()
+    time.sleep(0.2)
+    # the stop command jumps ahead of a command left in the queue
+    queued = driver.codec.speed(2, 500, 5000, 100)
+    driver._instr.write(queued)
+    time0 = time.perf_counter()
+    latency = driver.stop(1)
+    thread.join(1)
+    assert latency < 0.05
+    assert outcome and outcome[0][0] is False and outcome[0][1] - time0 < driver.polling.max_interval
+    assert driver.wait_stopped(1) >= latency
+    assert driver.get_status().position(1) < 50000 and driver.position[0] < 50000
+    device = simulator.open_simulator('SIM::SHRC203::clock=real')
+    assert device.commands.index('L:1') < device.commands.index(queued)
+    summary = driver.instrumentation.summary()
+    assert summary['stop_latency']['count'] == summary['stop_duration']['count'] == 1
+    assert 'stops' in driver.instrumentation.report()
+    driver.close()
+
+
+def test_stop_a_wait_for_several_axes():
+    driver = RMCVISADriver('SIM::RMC')
+    driver.connect()
+    driver.start_move_axes({1: 2000, 2: 2000})
+    driver.stop(1)
+    driver.stop(2)
+    assert driver.axes_ready([1, 2])
+    driver.close()
+
+
+def test_stop_cancels_only_the_wait_of_its_channel():
+    driver = GSC('SIM::GSC::clock=real')
+    driver.connect()
+    driver.set_speed(500, 5000, 100, 1)
+    outcome = []
+
+    def move():
+        outcome.append(driver.move(50000, 1))
+
+    thread = threading.Thread(target=move)
+    thread.start()
+    time.sleep(0.2)
+    driver.stop(2)
+    thread.join(0.2)
+    assert thread.is_alive() and not outcome
+    driver.stop(1)
+    thread.join(1)
+    assert outcome == [False]
+    driver.close()
+
+
+def test_stop_returns_before_the_standstill():
+    for driver in (RMCVISADriver('SIM::RMC::clock=real'), SBIS26VISADriver('SIM::SBIS26::clock=real')):
+        driver.connect()
+        driver.move(5000, 1, wait=False)
+        driver.move(5000, 2, wait=False)
+        time.sleep(0.1)
+        driver.stop(1)
+        assert not driver.get_status().all_ready
+        assert driver.wait_stopped(1) is not None
+        status = driver.read_status()
+        assert status.is_ready(1) and not status.is_ready(2)
+        driver.stop()
+        driver.close()
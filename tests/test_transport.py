@@ -0,0 +1,56 @@
+from pymodaq_plugins_optosigma.hardware import simulator
+from pymodaq_plugins_optosigma.hardware.sbis26_VISADriver import SBIS26VISADriver
+from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver
+from pymodaq_plugins_optosigma.hardware.transport import PipelinedTransport
+
+
+def test_commands_without_reply_are_batched():
+    driver = SHRC203VISADriver('SIM::SHRC203')
+    driver.open_connection()
+    transport = driver._instr
+    transport.reset_stats()
+    driver.set_unit('P')
+    for channel in (1, 2, 3):
+        transport.write(driver.codec.speed(channel, 100, 1000, 50))
+        transport.write(driver.codec.loop(channel, 0))
+    driver.start_move(100, 1)
+    stats = transport.line_stats()
+    assert stats['commands'] == 8
+    assert stats['transfers'] == 1
+    assert 0 < stats['utilisation'] <= 1
+
+
+def test_settings_are_sent_on_return():
+    driver = SHRC203VISADriver('SIM::SHRC203')
+    driver.open_connection()
+    device = simulator.open_simulator('SIM::SHRC203')
+    driver.set_mode()
+    driver.set_speed(100, 1000, 50, 2)
+    driver.set_loop(0, 3)
+    assert device.commands[-3:] == ['MODE:HOST', driver.codec.speed(2, 100, 1000, 50), driver.codec.loop(3, 0)]
+    assert not driver._instr._outbox
+
+
+def test_replies_are_matched_to_their_query():
+    device = simulator.open_simulator('SIM::SHRC203')
+    transport = PipelinedTransport(device)
+    transport.write('D:2,100,1000,50')
+    transport.write('D:3,200,2000,20')
+    pendings = [transport.send(f'?:D{channel}') for channel in (1, 2, 3)]
+    assert pendings[2].result() == 'S200F2000R20'
+    assert [pending.done for pending in pendings] == [True, True, True]
+    assert pendings[1].result() == 'S100F1000R50'
+    assert transport.query_many(['!:1S', '?:D3']) == ['R', 'S200F2000R20']
+
+
+def test_sbis26_status_needs_a_single_query():
+    driver = SBIS26VISADriver('SIM::SBIS26')
+    driver.connect()
+    device = driver._stage.resource
+    driver.set_speed(1000, 5000, 100, 1)
+    driver.move(1000, 1)
+    assert driver.status(1) == 'R'
+    srq = [command for command in device.commands if command.startswith('SRQ')]
+    assert len(srq) == driver._stage.queries
+    assert device.commands[0] == '#CONNECT'
+    assert not device._replies
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from pymodaq_plugins_optosigma.hardware.rmc_VISADriver import RMCVISADriver
+from pymodaq_plugins_optosigma.hardware.shrc203_VISADriver import SHRC203VISADriver
+from pymodaq_plugins_optosigma.hardware.units import UnitConverter, unit_letter, unit_name
+
+
+def test_unit_names():
+    assert unit_name(' ') == 'pulse'
+    assert unit_name('M') == 'mm'
+    assert unit_letter('deg') == 'D'
+    with pytest.raises(ValueError):
+        unit_name('inch')
+
+
+def test_vectorized_conversion():
+    converter = UnitConverter(3, unit='um', resolution=2.)
+    converter.set_axis(2, unit='mm')
+    converter.set_axis(3, unit='pulse')
+    waypoints = np.array([[0.25, 0.0001, 1.4], [10.3, 1.5, -2.6]])
+    pulses = converter.to_pulses(waypoints, [1, 2, 3])
+    assert pulses.dtype == np.int64
+    # rounded once, after the conversion
+    assert pulses.tolist() == [[0, 0, 1], [21, 3000, -3]]
+    assert converter.to_pulses(0.75, 1) == 2
+    assert converter.to_pulses([[1.], [2.]], [2]).tolist() == [[2000], [4000]]
+    assert converter.from_pulses(pulses, [1, 2, 3])[1].tolist() == [10.5, 1.5, -3.]
+    assert converter.from_pulses(3, 1) == 1.5
+    converter.set_axis(1, resolution=4.)
+    assert converter.to_pulses(1., 1) == 4
+    large = np.random.default_rng(0).uniform(-100, 100, (100000, 3))
+    assert np.array_equal(converter.to_pulses(large, [1, 2, 3]), np.rint(large * [4., 2000., 1.]))
+
+
+def test_gsc_plugin_units():
+    from pymodaq.utils.data import DataActuator
+    from pymodaq_plugins_optosigma.daq_move_plugins.daq_move_GSC import DAQ_Move_GSC
+    actuator = DAQ_Move_GSC(None, None)
+    actuator.settings.child('visa_name').setValue('SIM::GSC')
+    actuator.settings.child('non_blocking').setValue(False)
+    actuator.ini_stage()
+    actuator.settings.child('unit').setValue('um')
+    actuator.commit_settings(actuator.settings.child('unit'))
+    assert actuator.axis_unit == 'um'
+    actuator.move_abs(DataActuator(data=100.3))
+    assert actuator.controller.position[0] == 201
+    assert actuator.get_actuator_value().value() == pytest.approx(100.5)
+    actuator.close()
+
+
+def test_shrc_unit_letter():
+    driver = SHRC203VISADriver('SIM::SHRC203')
+    assert driver.unit == 'U'
+    driver.set_unit('mm')
+    assert driver.unit == 'M'
+    driver.set_unit('P')
+    assert driver.codec.move(1, 100) == 'A:1+P100'
+
+
+def test_native_units():
+    converter = UnitConverter(2, unit='um', native='um')
+    assert converter.to_native(10.25, 1) == 10.25
+    converter.set_axis(2, 'mm')
+    assert converter.to_native([[1.5, 0.002]], [1, 2]).tolist() == [[1.5, 2.]]
+    assert converter.from_native(2., 2) == 0.002
+    assert RMCVISADriver('SIM::RMC').units.to_native(0.5, 1) == 0.5
+    driver = SHRC203VISADriver('SIM::SHRC203')
+    driver.set_unit('mm')
+    assert driver.units.native == driver.units.unit(3) == 'mm'
+    assert driver.units.to_native(1.25, 3) == 1.25
+
+
+def test_sbis26_plugin_units():
+    from pymodaq.utils.data import DataActuator
+    from pymodaq_plugins_optosigma.daq_move_plugins.daq_move_SBIS26 import DAQ_Move_SBIS26
+    actuator = DAQ_Move_SBIS26(None, None)
+    actuator.settings.child('visa_name').setValue('SIM::SBIS26')
+    actuator.settings.child('non_blocking').setValue(False)
+    actuator.ini_stage()
+    actuator.settings.child('coeff').setValue(2.)
+    actuator.settings.child('unit').setValue('um')
+    actuator.commit_settings(actuator.settings.child('unit'))
+    assert actuator.axis_unit == 'um'
+    actuator.move_abs(DataActuator(data=100.3))
+    assert actuator.controller.position[0] == 201
+    assert actuator.get_actuator_value().value() == pytest.approx(100.5)
+    assert actuator.move_waypoints(np.array([[10., 0., 0.], [20., 0., 0.]])) == 2
+    assert actuator.controller.position == [40, 0, 0]
+    actuator.close()
@@ -0,0 +1,48 @@
+import importlib
+
+import pytest
+
+from pymodaq_plugins_optosigma.hardware import connections
+
+
+def grab(qtbot, viewer):
+    with qtbot.waitSignal(viewer.dte_signal, timeout=1000) as blocker:
+        viewer.grab_data()
+    return blocker.args[0]
+
+
+@pytest.mark.parametrize('model', ['GSC', 'RMC', 'SHRC203', 'SBIS26'])
+def test_all_axes_in_one_transfer(qtbot, model):
+    module = importlib.import_module(f'pymodaq_plugins_optosigma.daq_viewer_plugins.plugins_0D.daq_0Dviewer_{model}')
+    viewer = getattr(module, f'DAQ_0DViewer_{model}')(None, None)
+    viewer.settings.child('visa_name').setValue(f'SIM::{model}')
+    viewer.settings.child('status_ttl').setValue(0.)
+    viewer.ini_detector()
+    transport = viewer.controller.status_cache.transport
+    transfers = transport.transfers
+    dte = grab(qtbot, viewer)
+    assert transport.transfers == transfers + 1
+    n_axes = len(viewer.axis_names)
+    assert len(dte.get_data_from_name('Positions')) == n_axes
+    assert [data[0] for data in dte.get_data_from_name('Ready')] == [1.] * n_axes
+    assert dte.get_data_from_name('Error')[0][0] == 0.
+    viewer.close()
+    assert connections.users(f'SIM::{model}') == 0
+
+
+def test_positions_follow_the_actuator(qtbot):
+    from pymodaq_plugins_optosigma.daq_move_plugins.daq_move_GSC import DAQ_Move_GSC
+    from pymodaq_plugins_optosigma.daq_viewer_plugins.plugins_0D.daq_0Dviewer_GSC import DAQ_0DViewer_GSC
+    actuator = DAQ_Move_GSC(None, None)
+    actuator.settings.child('visa_name').setValue('SIM::GSC')
+    actuator.ini_stage()
+    viewer = DAQ_0DViewer_GSC(None, None)
+    viewer.settings.child('visa_name').setValue('SIM::GSC')
+    viewer.ini_detector()
+    # same driver, hence same serial port
+    assert viewer.controller is actuator.controller
+    actuator.controller.move(1500, 2)
+    positions = grab(qtbot, viewer).get_data_from_name('Positions')
+    assert [data[0] for data in positions] == [0, 1500]
+    viewer.close()
+    actuator.close()
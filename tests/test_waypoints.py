@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from pymodaq_plugins_optosigma.hardware.gsc_VISADriver import GSC
+from pymodaq_plugins_optosigma.hardware.sbis26_VISADriver import SBIS26VISADriver
+from pymodaq_plugins_optosigma.hardware.waypoints import as_waypoints
+
+
+def test_raster_is_streamed_with_one_transfer_per_point():
+    driver = GSC('SIM::GSC')
+    driver.connect()
+    device = driver._actuator.resource
+    for channel in (1, 2):
+        driver.set_speed(500, 5000, 100, channel)
+    xs, ys = np.meshgrid(np.arange(0, 3000, 1000), np.arange(0, 2000, 1000))
+    waypoints = np.column_stack((xs.ravel(), ys.ravel()))
+    reached = []
+
+    def acquire(index, point):
+        reached.append([axis.position(device.now()) for axis in device.axes])
+        assert list(point) == reached[-1]
+
+    assert driver.run_waypoints(waypoints, [1, 2], acquire) == len(waypoints)
+    assert reached == waypoints.tolist()
+    assert device.commands.count('G:') == len(waypoints)
+    moves = [message for message in device.commands if message.startswith('A:')]
+    assert len(moves) == 2 * len(waypoints)
+    assert driver.position == [2000, 1000]
+
+
+def test_callback_stops_the_sequence():
+    driver = SBIS26VISADriver('SIM::SBIS26')
+    driver.connect()
+    assert driver.run_waypoints([100, 200, 300], [2], lambda index, point: index < 1) == 2
+    assert driver.read_position(2) == 200
+
+
+def test_waypoints_shape():
+    assert as_waypoints([1, 2, 3], 1).shape == (3, 1)
+    with pytest.raises(ValueError):
+        as_waypoints(np.zeros((4, 3)), 2)